@@ -1,52 +1,180 @@
-from flask import Flask, request, jsonify, send_file
+# Imported first so startup timing covers the imports below
+from startup import Startup, ModelNotReady
+
+from flask import Flask, request, jsonify, send_file, g, Response
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException, UnsupportedMediaType
 import cv2
 import numpy as np
-import sqlite3
 import json
-from datetime import datetime
-import os
+from datetime import datetime, timezone
+import atexit
+import logging
+import time
+import uuid
 from pathlib import Path
-from ultralytics import YOLO
 import base64
+import hmac
+import os
 from PIL import Image
 import io
+import math
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import config
+from batching import MicroBatcher
+from database import open_database
+from persistence import DetectionWriter
+from image_store import ImageStore
+from inference_cache import InferenceCache
+from postprocess import summarize, scale_columns
+from history import CLASS_COUNT_COLUMNS, decode_cursor, history_page
+from settings_store import SettingsStore, VersionConflict, parse_confidence_threshold, parse_detection_mode, validate_changes
+from tiling import MODES as DETECT_MODES, resolve_mode, tile_windows, crop_windows, merge_tiles
+from logging_setup import setup_logging, should_sample
+from telemetry import Telemetry
+from inference_backends import load_backend_with_fallback, warm_up
+from worker_pool import InferencePool
+from model_registry import ModelRegistry
+from model_router import ModelRouter, ServingModel
+from video_ingest import VideoJobManager, check_job_options, check_source
+
+setup_logging(config.LOG_LEVEL, config.LOG_FORMAT)
+logger = logging.getLogger('app')
+telemetry = Telemetry()
 
 app = Flask(__name__)
 CORS(app)
 
+# training_results rows from evaluation runs, which never describe the deployed model
+EVALUATION_RESULT_TYPES = ('sweep_trial', 'int8_ptq')
+
+# Rollup granularities and the strftime bucket of a detection timestamp; 'all' keeps running totals
+ROLLUP_BUCKETS = {
+    'minute': "strftime('%Y-%m-%d %H:%M:00', {ts})",
+    'hour': "strftime('%Y-%m-%d %H:00:00', {ts})",
+    'all': "''"
+}
+
+class InvalidImage(Exception):
+    """The request body is not an image PIL or OpenCV can decode"""
+
 class SpaceStationDetector:
-    def __init__(self, model_path="C:/Users/ManojKumar/Downloads/Hackathon_Dataset/HackByte_Dataset/runs/detect/train2/weights/best.pt"):
-        self.model_path = model_path
-        self.model = None
-        self.load_model()
+    def __init__(self, model_path=None, workers=0):
+        self.model_path = model_path or config.MODEL_PATH
+        self.workers = workers
+        self.registry = ModelRegistry(config.MODEL_REGISTRY_DIR)
+        self.router = ModelRouter(config.MODEL_SHADOW_QUEUE_SIZE, config.MODEL_RETIRE_DELAY_SECONDS)
+        self._deploy_lock = threading.Lock()
+        self.result_cache = InferenceCache(
+            mode=config.RESULT_CACHE_MODE,
+            max_entries=config.RESULT_CACHE_MAX_ENTRIES,
+            max_bytes=config.RESULT_CACHE_MAX_BYTES,
+            ttl_seconds=config.RESULT_CACHE_TTL_SECONDS,
+            min_confidence=config.RESULT_CACHE_MIN_CONFIDENCE
+        )
+        self.db = open_database(
+            config.DATABASE_URL,
+            pool_size=config.DATABASE_POOL_SIZE,
+            busy_timeout_ms=config.DATABASE_BUSY_TIMEOUT_MS,
+            cache_size_kib=config.DATABASE_CACHE_SIZE_KIB,
+            mmap_size_mb=config.DATABASE_MMAP_SIZE_MB
+        )
         self.setup_database()
+        self.settings = SettingsStore(self.db, config.SETTINGS_HISTORY_LIMIT)
+        self.image_store = ImageStore(config.IMAGE_STORE_DIR, config.IMAGE_THUMBNAIL_SIZE)
+        self.writer = DetectionWriter(
+            self.db,
+            max_queue_size=config.PERSIST_MAX_QUEUE_SIZE,
+            max_batch_size=config.PERSIST_MAX_BATCH_SIZE,
+            flush_interval_ms=config.PERSIST_FLUSH_INTERVAL_MS,
+            policy=config.PERSIST_QUEUE_POLICY,
+            block_timeout=config.PERSIST_BLOCK_TIMEOUT
+        )
+    
+    @property
+    def model(self):
+        """The active model, None until the first deployment"""
+        return self.router.active
     
-    def load_model(self):
-        """Load the trained YOLOv8 model"""
+    @property
+    def class_names(self):
+        return self.router.active.class_names if self.router.active else []
+    
+    def weights_path(self, version):
+        """Weights of a registered version; MODEL_VERSION names MODEL_PATH when it is not registered"""
         try:
-            print(f"   Attempting to load model from: {self.model_path}")
-            print(f"📁 File exists: {os.path.exists(self.model_path)}")
-            
-            self.model = YOLO(self.model_path)
-            print(f"✅ Model loaded successfully from {self.model_path}")
-            
-            # Add debug info
-            print(f"📊 Model classes: {self.model.names}")
-            print(f"   Number of classes: {len(self.model.names)}")
-            
-        except Exception as e:
-            print(f"❌ Error loading model: {e}")
-            print(" Using fallback YOLOv8n model for testing...")
-            self.model = YOLO('yolov8n.pt')
+            return self.registry.path(version)
+        except KeyError:
+            if version == config.MODEL_VERSION:
+                return self.model_path
+            raise
+    
+    def load_model(self, version, weights):
+        """Load trained YOLOv8 weights through the configured inference backend"""
+        options = {
+            'imgsz': config.INFERENCE_IMGSZ,
+            'threads': config.INFERENCE_THREADS,
+            'artifact': config.INFERENCE_ARTIFACT or None,
+            'fallback': config.MODEL_FALLBACK_WEIGHTS or None
+        }
+        if self.workers:
+            # Each worker process holds and warms up its own copy of the model
+            backend = InferencePool(
+                self.workers, config.INFERENCE_BACKEND, weights,
+                warmup_runs=config.MODEL_WARMUP_RUNS, warmup_batch_size=config.MODEL_WARMUP_BATCH_SIZE,
+                start_timeout=config.SERVING_WORKER_START_TIMEOUT, **options
+            )
+        else:
+            backend = load_backend_with_fallback(config.INFERENCE_BACKEND, weights, **options)
+        return ServingModel(backend, version)
+    
+    def warm_up(self, model):
+        """Run dummy inferences at the model input size before serving real requests"""
+        if not self.workers:
+            warm_up(model.backend, config.MODEL_WARMUP_RUNS, config.MODEL_WARMUP_BATCH_SIZE)
+    
+    def deploy(self, active, candidate=None, split=0.0, shadow=False):
+        """Load and warm up versions that are not loaded yet, then swap the deployment in one step.
+        
+        Returns the load and warm-up seconds of each newly loaded version.
+        """
+        with self._deploy_lock:
+            loaded = {model.version: model for model in self.router.models()}
+            timings, new_models = {}, []
+            try:
+                for version in (active, candidate):
+                    if version is None or version in loaded:
+                        continue
+                    load_start = time.perf_counter()
+                    model = self.load_model(version, self.weights_path(version))
+                    new_models.append(model)
+                    warmup_start = time.perf_counter()
+                    self.warm_up(model)
+                    loaded[version] = model
+                    timings[version] = {
+                        'load_seconds': round(warmup_start - load_start, 3),
+                        'warmup_seconds': round(time.perf_counter() - warmup_start, 3)
+                    }
+                self.router.deploy(loaded[active], loaded.get(candidate), split, shadow)
+            except Exception:
+                for model in new_models:
+                    model.close()
+                raise
+        logger.info('Models deployed', extra={'fields': {
+            'active': active, 'candidate': candidate, 'split': split, 'shadow': shadow, 'loaded': timings
+        }})
+        return timings
     
     def setup_database(self):
         """Setup SQLite database for detection history"""
-        os.makedirs('database', exist_ok=True)
-        
-        conn = sqlite3.connect('database/space_station.db')
-        cursor = conn.cursor()
-        
+        with self.db.write() as conn:
+            self.create_schema(conn.cursor())
+        logger.info('Database setup completed')
+    
+    def create_schema(self, cursor):
+        """Create missing tables, indexes and triggers and migrate older databases"""
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS detections (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -57,16 +185,69 @@ class SpaceStationDetector:
                 fire_extinguisher_count INTEGER DEFAULT 0,
                 confidence_scores TEXT,
                 processing_time REAL,
-                image_data BLOB
+                image_data BLOB,
+                image_hash TEXT,
+                model_version TEXT
             )
         ''')
         
+        # Older databases predate the image store and keep images inline
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(detections)')]
+        if 'image_hash' not in columns:
+            cursor.execute('ALTER TABLE detections ADD COLUMN image_hash TEXT')
+        if 'model_version' not in columns:
+            cursor.execute('ALTER TABLE detections ADD COLUMN model_version TEXT')
+        
+        # History is read newest first and filtered by time range and class
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_detections_timestamp ON detections (timestamp)')
+        for column in CLASS_COUNT_COLUMNS.values():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_detections_{column} ON detections (timestamp) WHERE {column} > 0')
+        # Per-model comparison of latency and counts
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_detections_model_version ON detections (model_version, timestamp)')
+        
+        self.setup_rollups(cursor)
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_settings (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 confidence_threshold REAL DEFAULT 0.5,
                 detection_mode TEXT DEFAULT 'all',
-                ui_preferences TEXT DEFAULT '{}'
+                ui_preferences TEXT DEFAULT '{}',
+                version INTEGER DEFAULT 0,
+                updated_at DATETIME
+            )
+        ''')
+        
+        # Settings used to be append-only; SettingsStore compacts old rows into history
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(user_settings)')]
+        if 'version' not in columns:
+            cursor.execute('ALTER TABLE user_settings ADD COLUMN version INTEGER DEFAULT 0')
+            cursor.execute('ALTER TABLE user_settings ADD COLUMN updated_at DATETIME')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_settings_history (
+                version INTEGER PRIMARY KEY,
+                confidence_threshold REAL,
+                detection_mode TEXT,
+                ui_preferences TEXT,
+                updated_at DATETIME
+            )
+        ''')
+        
+        # One row per tracked object in ingested video instead of one per frame
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS object_presence (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                source TEXT,
+                track_id INTEGER,
+                class_name TEXT,
+                first_seen REAL,
+                last_seen REAL,
+                duration REAL,
+                hits INTEGER,
+                max_confidence REAL,
+                last_bbox TEXT
             )
         ''')
         
@@ -84,190 +265,677 @@ class SpaceStationDetector:
                 config TEXT
             )
         ''')
+    
+    @staticmethod
+    def setup_rollups(cursor):
+        """Create the per-minute/hour/all-time aggregates, kept current by an insert trigger.
+        
+        Rollups are never decremented, so they keep covering detections that
+        retention later deletes from the detections table.
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'detection_rollups'"
+        ).fetchone()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS detection_rollups (
+                granularity TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                detections INTEGER NOT NULL DEFAULT 0,
+                total_objects INTEGER NOT NULL DEFAULT 0,
+                toolbox_count INTEGER NOT NULL DEFAULT 0,
+                oxygen_tank_count INTEGER NOT NULL DEFAULT 0,
+                fire_extinguisher_count INTEGER NOT NULL DEFAULT 0,
+                processing_time_sum REAL NOT NULL DEFAULT 0,
+                processing_time_max REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (granularity, bucket)
+            ) WITHOUT ROWID
+        ''')
         
-        conn.commit()
-        conn.close()
-        print("✅ Database setup completed")
+        values = '''
+            1, {row}.toolbox_count + {row}.oxygen_tank_count + {row}.fire_extinguisher_count,
+            {row}.toolbox_count, {row}.oxygen_tank_count, {row}.fire_extinguisher_count,
+            COALESCE({row}.processing_time, 0), COALESCE({row}.processing_time, 0)
+        '''
+        upserts = ''.join(f'''
+                INSERT INTO detection_rollups VALUES ('{granularity}', {bucket.format(ts='NEW.timestamp')}, {values.format(row='NEW')})
+                ON CONFLICT (granularity, bucket) DO UPDATE SET
+                    detections = detections + 1,
+                    total_objects = total_objects + excluded.total_objects,
+                    toolbox_count = toolbox_count + excluded.toolbox_count,
+                    oxygen_tank_count = oxygen_tank_count + excluded.oxygen_tank_count,
+                    fire_extinguisher_count = fire_extinguisher_count + excluded.fire_extinguisher_count,
+                    processing_time_sum = processing_time_sum + excluded.processing_time_sum,
+                    processing_time_max = MAX(processing_time_max, excluded.processing_time_max);
+        ''' for granularity, bucket in ROLLUP_BUCKETS.items())
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS detections_rollup AFTER INSERT ON detections
+            BEGIN
+                {upserts}
+            END
+        ''')
+        
+        if not exists:
+            # Backfill from rows written before rollups existed
+            for granularity, bucket in ROLLUP_BUCKETS.items():
+                cursor.execute(f'''
+                    INSERT INTO detection_rollups
+                    SELECT '{granularity}', {bucket.format(ts='timestamp')}, COUNT(*),
+                           SUM(toolbox_count + oxygen_tank_count + fire_extinguisher_count),
+                           SUM(toolbox_count), SUM(oxygen_tank_count), SUM(fire_extinguisher_count),
+                           COALESCE(SUM(processing_time), 0), COALESCE(MAX(processing_time), 0)
+                    FROM detections
+                    GROUP BY 2
+                ''')
+    
+    @staticmethod
+    def decode_image_data(image_data):
+        """Return raw image bytes from a base64 string/data URL or bytes"""
+        if isinstance(image_data, str):
+            if image_data.startswith('data:image'):
+                image_data = image_data.split(',')[1]
+            return base64.b64decode(image_data)
+        return image_data
+    
+    def preprocess_image(self, image_data, mode='full'):
+        """Decode an image for detection; return (RGB array, (x, y) scale back to original pixels)"""
+        with telemetry.timer('preprocess'):
+            return self._preprocess_image(image_data, mode)
     
-    def preprocess_image(self, image_data):
-        """Preprocess image for detection"""
+    def _preprocess_image(self, image_data, mode):
         try:
-            if isinstance(image_data, str):
-                if image_data.startswith('data:image'):
-                    image_data = image_data.split(',')[1]
-                image_bytes = base64.b64decode(image_data)
-            else:
-                image_bytes = image_data
+            image_bytes = self.decode_image_data(image_data)
             
             try:
                 image = Image.open(io.BytesIO(image_bytes))
             except Exception as pil_error:
-                print(f"PIL failed to open image: {pil_error}")
+                logger.debug('PIL failed to open image, trying OpenCV', extra={'fields': {'error': str(pil_error)}})
                 nparr = np.frombuffer(image_bytes, np.uint8)
                 image_array = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
                 if image_array is None:
                     raise Exception("Failed to decode image with both PIL and OpenCV")
                 image_array = cv2.cvtColor(image_array, cv2.COLOR_BGR2RGB)
-                return image_array
+                return image_array, (1.0, 1.0)
+            
+            # Full-frame inference downscales to the model input anyway, so let libjpeg
+            # decode at 1/2, 1/4 or 1/8 scale (never below the input size) instead.
+            # Images that will be tiled need every pixel and are decoded in full.
+            width, height = image.size
+            ratio = config.INFERENCE_IMGSZ / max(width, height)
+            if image.format == 'JPEG' and ratio < 1 and \
+                    resolve_mode(mode, (height, width), config.TILE_AUTO_MIN_SIDE) == 'full':
+                image.draft('RGB', (math.ceil(width * ratio), math.ceil(height * ratio)))
             
             if image.mode != 'RGB':
                 image = image.convert('RGB')
             
-            image_array = np.array(image)
-            return image_array
+            # np.asarray copies the pixels out of PIL once into a read-only array; the
+            # detection pipeline only reads them, so no further writable copy is made
+            image_array = np.asarray(image)
+            return image_array, (width / image_array.shape[1], height / image_array.shape[0])
             
         except Exception as e:
-            print(f"Error preprocessing image: {e}")
-            raise Exception(f"Failed to process image: {str(e)}")
+            logger.info('Error preprocessing image', extra={'fields': {'error': str(e)}})
+            raise InvalidImage(f"Failed to process image: {str(e)}")
     
-    def detect_objects(self, image_data, confidence_threshold=0.5):
+    def detect_objects(self, image_data, confidence_threshold=0.5, mode='full', classes=None):
         """Perform object detection on image"""
-        start_time = datetime.now()
-        
-        print(f"   Starting detection with confidence threshold: {confidence_threshold}")
-        
-        # Preprocess image
-        image = self.preprocess_image(image_data)
-        print(f"🖼️ Image preprocessed, shape: {image.shape}")
-        
-        # Run detection with confidence threshold
-        results = self.model(image, conf=confidence_threshold)
-        print(f"🔍 Detection completed, results: {len(results)}")
-        
-        # Process results
-        detections = []
-        class_counts = {'FireExtinguisher': 0, 'ToolBox': 0, 'OxygenTank': 0}
-        
-        for i, result in enumerate(results):
-            print(f"📊 Processing result {i+1}")
-            boxes = result.boxes
-            if boxes is not None:
-                print(f"   Found {len(boxes)} boxes")
-                for j, box in enumerate(boxes):
-                    # Get coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    
-                    # Get confidence and class
-                    confidence = float(box.conf[0])
-                    class_id = int(box.cls[0])
-                    
-                    print(f"  Box {j+1}: class_id={class_id}, confidence={confidence:.3f}")
-                    
-                    # Only include detections above threshold
-                    if confidence >= confidence_threshold:
-                        # Map class ID to name
-                        class_names = ['FireExtinguisher', 'ToolBox', 'OxygenTank']
-                        class_name = class_names[class_id] if class_id < len(class_names) else f'object_{class_id}'
-                        
-                        print(f"  ✅ Detection: {class_name} (confidence: {confidence:.3f})")
-                        
-                        # Count objects
-                        if class_name not in class_counts:
-                            class_counts[class_name] = 0
-                        class_counts[class_name] += 1
-                        
-                        detections.append({
-                            'bbox': [float(x1), float(y1), float(x2), float(y2)],
-                            'confidence': confidence,
-                            'class': class_name,
-                            'class_id': class_id
-                        })
-                    else:
-                        print(f"  ❌ Below threshold: {confidence:.3f} < {confidence_threshold}")
-            else:
-                print("📦 No boxes found in result")
+        start_time = time.perf_counter()
+        model = self.model
+        
+        image_bytes = self.decode_image_data(image_data)
+        image_hash = ImageStore.hash_bytes(image_bytes)
+        cache_key, result = self.lookup_result(confidence_threshold, image_hash=image_hash, mode=mode, classes=classes, model=model)
+        
+        if result is None:
+            # Preprocess image
+            image, scale = self.preprocess_image(image_bytes, mode)
+            
+            if cache_key is None:
+                cache_key, result = self.lookup_result(confidence_threshold, image=image, mode=mode, classes=classes, model=model,
+                                                       scale=scale)
+            if result is None:
+                result = self.detect_images([image], [confidence_threshold], [cache_key], [mode], [scale], [classes], model)[0]
         
-        processing_time = (datetime.now() - start_time).total_seconds()
-        print(f"⏱️ Processing time: {processing_time:.3f}s")
-        print(f"   Final class counts: {class_counts}")
+        result['processing_time'] = time.perf_counter() - start_time
+        result['image_hash'] = image_hash
         
-        return {
-            'detections': detections,
-            'class_counts': class_counts,
-            'processing_time': processing_time,
-            'total_objects': sum(class_counts.values())
+        return result
+    
+    def detect_batch(self, images_data, confidence_threshold=0.5, max_batch_size=8, mode='full', classes=None, model=None):
+        """Perform object detection on several images with batched model calls"""
+        start_time = time.perf_counter()
+        model = model or self.model
+        
+        results = []
+        pending = []
+        for image_data in images_data:
+            image_start = time.perf_counter()
+            image_bytes = self.decode_image_data(image_data)
+            image_hash = ImageStore.hash_bytes(image_bytes)
+            cache_key, result = self.lookup_result(confidence_threshold, image_hash=image_hash, mode=mode, classes=classes, model=model)
+            if result is None:
+                image, scale = self.preprocess_image(image_bytes, mode)
+                if cache_key is None:
+                    cache_key, result = self.lookup_result(confidence_threshold, image=image, mode=mode, classes=classes, model=model,
+                                                           scale=scale)
+            if result is None:
+                result = {}
+                pending.append((result, image, cache_key, scale))
+            result['image_hash'] = image_hash
+            result['processing_time'] = time.perf_counter() - image_start
+            results.append(result)
+        
+        preprocess_time = time.perf_counter() - start_time
+        logger.debug('Batch preprocessed', extra={'fields': {
+            'images': len(results), 'pending': len(pending), 'preprocess_time': round(preprocess_time, 4)
+        }})
+        
+        for offset in range(0, len(pending), max_batch_size):
+            chunk = pending[offset:offset + max_batch_size]
+            chunk_start = time.perf_counter()
+            chunk_results = self.detect_images(
+                [image for _, image, _, _ in chunk],
+                [confidence_threshold] * len(chunk),
+                [cache_key for _, _, cache_key, _ in chunk],
+                [mode] * len(chunk),
+                [scale for _, _, _, scale in chunk],
+                [classes] * len(chunk),
+                model
+            )
+            chunk_time = time.perf_counter() - chunk_start
+            for (result, _, _, _), chunk_result in zip(chunk, chunk_results):
+                # Inference time is shared evenly within the chunk
+                result.update(chunk_result, processing_time=result['processing_time'] + chunk_time / len(chunk))
+        
+        total_time = time.perf_counter() - start_time
+        
+        return results, {
+            'size': len(results),
+            'inferred': len(pending),
+            'processing_time': total_time,
+            'preprocess_time': preprocess_time,
+            'per_image_time': total_time / len(results) if results else 0
         }
     
-    def save_detection(self, image_data, detection_results):
-        """Save detection results to database"""
-        conn = sqlite3.connect('database/space_station.db')
-        cursor = conn.cursor()
+    def cache_identity(self, mode, classes=None, model=None):
+        """Model identity used in cache keys; tiled and class-filtered results also depend on those settings"""
+        identity = (model or self.model).identity
+        if mode != 'full':
+            identity += (f"|{mode}:{config.TILE_SIZE}/{config.TILE_OVERLAP}/"
+                         f"{config.TILE_AUTO_MIN_SIDE}/{int(config.TILE_INCLUDE_FULL_FRAME)}")
+        if classes is not None:
+            identity += f"|classes:{','.join(map(str, classes))}"
+        return identity
+    
+    def lookup_result(self, confidence_threshold, image_hash=None, image=None, mode='full', classes=None, model=None,
+                      scale=(1.0, 1.0)):
+        """Return the result cache key and the cached result, if any, for an image"""
+        if not self.result_cache.enabled:
+            return None, None
         
-        cursor.execute('''
-            INSERT INTO detections 
-            (image_path, toolbox_count, oxygen_tank_count, fire_extinguisher_count, 
-             confidence_scores, processing_time, image_data)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        model = model or self.model
+        cache_key = self.result_cache.key(self.cache_identity(mode, classes, model), image_hash=image_hash, image=image,
+                                          scale=scale)
+        if cache_key is None:
+            return None, None
+        
+        columns = self.result_cache.get(cache_key, confidence_threshold)
+        if columns is None:
+            return cache_key, None
+        
+        result = summarize(columns, confidence_threshold, model.class_names, classes)
+        result['model_version'] = model.version
+        result['cached'] = True
+        return cache_key, result
+    
+    def detect_images(self, images, confidence_thresholds, cache_keys=None, modes=None, scales=None, class_filters=None,
+                      model=None):
+        """Run one model call over preprocessed images, filtering each by its own threshold.
+        
+        ``scales`` maps boxes of images decoded at reduced size back to original pixels.
+        ``class_filters`` holds each image's class ids, or None for all classes; the
+        model only scores the union of the requested classes. ``model`` defaults to
+        the active model.
+        """
+        model = model or self.model
+        cache_keys = cache_keys or [None] * len(images)
+        scales = scales or [(1.0, 1.0)] * len(images)
+        class_filters = class_filters or [None] * len(images)
+        run_classes = None if any(c is None for c in class_filters) else sorted(set().union(*class_filters))
+        modes = [resolve_mode(mode, image.shape, config.TILE_AUTO_MIN_SIDE)
+                 for image, mode in zip(images, modes or ['full'] * len(images))]
+        
+        # Use the lowest threshold for the shared call, then filter per image.
+        # Results that will be cached are produced at the cache floor so later
+        # requests with any threshold above it can reuse them.
+        run_confidence = min(confidence_thresholds)
+        if any(cache_keys):
+            run_confidence = min(run_confidence, self.result_cache.min_confidence)
+        
+        # Tiled images contribute one model input per window
+        inputs, plans = [], []
+        for image, mode in zip(images, modes):
+            if mode == 'tiled':
+                windows = tile_windows(image.shape[1], image.shape[0], config.TILE_SIZE,
+                                       config.TILE_OVERLAP, config.TILE_INCLUDE_FULL_FRAME)
+                plans.append((len(inputs), windows))
+                inputs.extend(crop_windows(image, windows))
+            else:
+                plans.append((len(inputs), None))
+                inputs.append(image)
+        
+        # Tiled images can contribute dozens of inputs each, so cap the inputs per model call
+        outputs = []
+        max_inputs = max(1, config.INFERENCE_MAX_BATCH_INPUTS)
+        for offset in range(0, len(inputs), max_inputs):
+            chunk = inputs[offset:offset + max_inputs]
+            telemetry.observe_batch_size(len(chunk))
+            with telemetry.timer('inference'):
+                outputs.extend(model.predict(chunk, run_confidence, run_classes))
+        
+        processed = []
+        with telemetry.timer('postprocess'):
+            for (start, windows), mode, confidence_threshold, cache_key, scale, classes in zip(
+                    plans, modes, confidence_thresholds, cache_keys, scales, class_filters):
+                if windows is None:
+                    columns = outputs[start]
+                else:
+                    columns = merge_tiles(outputs[start:start + len(windows)], windows,
+                                          config.TILE_MERGE_THRESHOLD, config.TILE_MERGE_METRIC)
+                if scale != (1.0, 1.0):
+                    columns = scale_columns(columns, scale)
+                # Columns scored over a wider class union than this image asked for are not cached
+                if cache_key is not None and classes == run_classes:
+                    self.result_cache.put(cache_key, columns, run_confidence)
+                summary = summarize(columns, confidence_threshold, model.class_names, classes)
+                summary['model_version'] = model.version
+                summary['mode'] = mode
+                summary['tiles'] = len(windows) if windows else 1
+                if logger.isEnabledFor(logging.DEBUG) and should_sample(config.LOG_BOX_SAMPLE_RATE):
+                    for detection in summary['detections']:
+                        logger.debug('Detection box', extra={'fields': detection})
+                processed.append(summary)
+        return processed
+    
+    def save_detection(self, image_data, detection_results):
+        """Store the image and queue detection results for the background database writer"""
+        image_hash = self.image_store.put(self.decode_image_data(image_data), detection_results.get('image_hash'))
+        return self.writer.submit((
             f"detection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg",
             detection_results['class_counts'].get('ToolBox', 0),
             detection_results['class_counts'].get('OxygenTank', 0),
             detection_results['class_counts'].get('FireExtinguisher', 0),
             json.dumps([d['confidence'] for d in detection_results['detections']]),
             detection_results['processing_time'],
-            image_data if isinstance(image_data, bytes) else base64.b64decode(image_data.split(',')[1])
+            image_hash,
+            detection_results.get('model_version')
         ))
-        
-        conn.commit()
-        conn.close()
 
 # Initialize detector
-detector = SpaceStationDetector()
+# Worker processes re-import the main module when spawned, so the pool is only
+# used when the app is imported by a server entry point such as serve.py
+startup = Startup()
+detector = SpaceStationDetector(workers=config.SERVING_WORKERS if __name__ != '__main__' else 0)
+# atexit runs in reverse order: flush the writer before closing the database
+atexit.register(detector.db.close)
+atexit.register(detector.writer.close)
+
+atexit.register(detector.router.close)
+
+def load_model():
+    """Load and warm up the deployed models; the API reports ready once this returns"""
+    deployment = detector.registry.deployment()
+    if deployment['active'] is None:
+        # Nothing deployed from the registry yet: serve MODEL_PATH
+        deployment = {'active': config.MODEL_VERSION, 'candidate': None, 'split': 0.0, 'shadow': False}
+    timings = detector.deploy(**deployment)
+    startup.phases['model_load'] = round(sum(t['load_seconds'] for t in timings.values()), 3)
+    startup.phases['warmup'] = round(sum(t['warmup_seconds'] for t in timings.values()), 3)
+    logger.info('Model ready', extra={'fields': startup.snapshot()})
+
+def process_detect_batch(items):
+    """Run queued ``(image, confidence, cache_key, mode, scale, classes, model)`` items, one model call per model"""
+    results = [None] * len(items)
+    groups = {}
+    for index, item in enumerate(items):
+        groups.setdefault(item[-1], []).append(index)
+    for model, indices in groups.items():
+        images, confidences, cache_keys, modes, scales, class_filters, _ = (
+            list(column) for column in zip(*(items[i] for i in indices)))
+        outputs = detector.detect_images(images, confidences, cache_keys, modes, scales, class_filters, model)
+        for index, output in zip(indices, outputs):
+            results[index] = output
+    return results
+
+# Merge concurrent /api/detect calls into shared model calls
+batcher = MicroBatcher(
+    process_detect_batch,
+    max_batch_size=config.DETECT_MAX_BATCH_SIZE,
+    max_wait_ms=config.DETECT_MAX_WAIT_MS,
+    concurrency=max(1, detector.workers)
+)
+
+def resolve_request_settings(confidence_threshold=None, detection_mode=None):
+    """Fill options a request omitted from the cached settings; return (threshold, class ids)"""
+    startup.wait(config.MODEL_READY_TIMEOUT)
+    settings = detector.settings.get()
+    if confidence_threshold is None:
+        confidence_threshold = settings['confidence_threshold']
+    if detection_mode is None:
+        detection_mode = settings['detection_mode']
+    return float(confidence_threshold), parse_detection_mode(detection_mode, detector.class_names)
+
+def detect_frame(image, confidence_threshold=None):
+    """Detect objects in an already decoded RGB frame through the micro-batcher"""
+    confidence_threshold, classes = resolve_request_settings(confidence_threshold)
+    model, _ = detector.router.route()
+    start_time = time.perf_counter()
+    result = batcher.submit((image, confidence_threshold, None, config.DETECT_MODE, (1.0, 1.0), classes, model)).result(
+        timeout=config.DETECT_RESULT_TIMEOUT)[0]
+    detector.router.record(model.version, time.perf_counter() - start_time, result['total_objects'])
+    return result
+
+# Video ingestion jobs share the micro-batcher with HTTP and stream requests
+video_jobs = VideoJobManager(
+    detect_frame,
+    detector.db,
+    max_jobs=config.VIDEO_MAX_JOBS
+)
+
+# Serve HTTP right away; detection requests wait for the model to become ready
+startup.mark('imported')
+startup.run(load_model, background=config.MODEL_LOAD_IN_BACKGROUND)
+
+def run_detection(image_bytes, confidence_threshold=None, mode=None, detection_mode=None):
+    """Detect objects in one encoded image through the result cache and the micro-batcher.
+    
+    An omitted threshold or detection_mode falls back to the cached user settings.
+    """
+    start_time = time.perf_counter()
+    mode = mode or config.DETECT_MODE
+    confidence_threshold, classes = resolve_request_settings(confidence_threshold, detection_mode)
+    model, shadow_model = detector.router.route()
+    image_hash = ImageStore.hash_bytes(image_bytes)
+    cache_key, results = detector.lookup_result(confidence_threshold, image_hash=image_hash, mode=mode, classes=classes, model=model)
+    
+    if results is None:
+        # Decode on the calling thread, then share the model call with concurrent requests
+        image, scale = detector.preprocess_image(image_bytes, mode)
+        if cache_key is None:
+            cache_key, results = detector.lookup_result(confidence_threshold, image=image, mode=mode, classes=classes, model=model,
+                                                        scale=scale)
+        if results is None:
+            results, batch_info = batcher.submit((image, confidence_threshold, cache_key, mode, scale, classes, model)).result(
+                timeout=config.DETECT_RESULT_TIMEOUT)
+            results['batch'] = batch_info
+            if shadow_model is not None:
+                detector.router.run_shadow(
+                    lambda: run_shadow(shadow_model, image, confidence_threshold, mode, scale, classes, results))
+    
+    results['processing_time'] = time.perf_counter() - start_time
+    if 'mode' in results:
+        # End-to-end latency per resolved mode, so full-frame and tiled costs can be compared
+        telemetry.observe(f"detect_{results['mode']}", results['processing_time'])
+    if not results.get('cached'):
+        detector.router.record(model.version, results['processing_time'], results['total_objects'])
+    results['image_hash'] = image_hash
+    return results
+
+def run_shadow(model, image, confidence_threshold, mode, scale, classes, served):
+    """Re-run a served request on the shadow model and record the comparison; the result is discarded"""
+    start_time = time.perf_counter()
+    try:
+        result = detector.detect_images([image], [confidence_threshold], None, [mode], [scale], [classes], model)[0]
+    except Exception as e:
+        logger.warning('Shadow inference failed', extra={'fields': {'version': model.version, 'error': str(e)}})
+        return
+    detector.router.record(model.version, time.perf_counter() - start_time, result['total_objects'],
+                           shadow=True, agrees=result['class_counts'] == served['class_counts'])
+
+@app.before_request
+def start_request_log():
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16]
+    g.request_start = time.perf_counter()
+    g.log_fields = {}
+
+@app.after_request
+def finish_request_log(response):
+    """Emit one summary line per request"""
+    duration = time.perf_counter() - g.request_start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    telemetry.observe('request', duration)
+    telemetry.count_request(request.method, route, response.status_code)
+    
+    response.headers['X-Request-ID'] = g.request_id
+    logger.info('Request completed', extra={'fields': {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 2),
+        **g.log_fields
+    }})
+    return response
+
+RAW_IMAGE_TYPES = ('image/jpeg', 'image/png')
+
+def read_detect_options(values):
+    """Read the threshold, mode and detection_mode; an omitted threshold or detection_mode is None"""
+    confidence_threshold = parse_confidence_threshold(values.get('confidence_threshold'))
+    return confidence_threshold, values.get('mode', config.DETECT_MODE), values.get('detection_mode')
+
+def read_detect_request():
+    """Read image bytes and detection options from a JSON, multipart or raw image body"""
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('image')
+        image_bytes = upload.read() if upload else None
+        options = read_detect_options(request.values)
+    elif request.mimetype in RAW_IMAGE_TYPES:
+        image_bytes = request.get_data(cache=False)
+        options = read_detect_options(request.args)
+    elif request.is_json:
+        data = request.get_json()
+        image_data = data.get('image')
+        image_bytes = SpaceStationDetector.decode_image_data(image_data) if image_data else None
+        options = read_detect_options(data)
+    else:
+        raise UnsupportedMediaType(f"Unsupported content type, send JSON, multipart/form-data or {', '.join(RAW_IMAGE_TYPES)}")
+    return (image_bytes, *options)
+
+def read_detect_batch_request():
+    """Read a list of image bytes and detection options from a JSON or multipart body"""
+    if request.mimetype == 'multipart/form-data':
+        uploads = request.files.getlist('images')
+        check_batch_size(uploads)
+        images_bytes = [upload.read() for upload in uploads]
+        options = read_detect_options(request.values)
+    elif request.is_json:
+        data = request.get_json()
+        images = data.get('images') or []
+        check_batch_size(images)
+        images_bytes = [SpaceStationDetector.decode_image_data(image_data) for image_data in images]
+        options = read_detect_options(data)
+    else:
+        raise UnsupportedMediaType('Unsupported content type, send JSON or multipart/form-data')
+    return (images_bytes, *options)
+
+def check_batch_size(images):
+    """Reject oversized batches before any image is decoded or the model is waited on"""
+    if len(images) > config.DETECT_MAX_IMAGES_PER_REQUEST:
+        raise ValueError(f'Too many images, maximum is {config.DETECT_MAX_IMAGES_PER_REQUEST}')
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
-        'status': 'healthy',
+        'status': 'healthy' if startup.ready else startup.state,
+        'live': True,
+        'ready': startup.ready,
+        'startup': startup.snapshot(),
         'model_loaded': detector.model is not None,
+        'model_version': detector.model.version if detector.model is not None else None,
+        'inference_backend': detector.model.backend.kind if detector.model is not None else None,
+        'workers': detector.model.backend.health() if detector.workers and detector.model is not None else None,
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is up and serving HTTP"""
+    return jsonify({'live': True})
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 503 until the model is loaded and warmed up"""
+    snapshot = startup.snapshot()
+    return jsonify(snapshot), 200 if snapshot['ready'] else 503
+
 @app.route('/api/detect', methods=['POST'])
 def detect_objects():
     """Main detection endpoint"""
     try:
-        data = request.get_json()
-        image_data = data.get('image')
-        confidence_threshold = data.get('confidence_threshold', 0.5)
+        try:
+            with telemetry.timer('decode'):
+                image_bytes, confidence_threshold, mode, detection_mode = read_detect_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if not image_data:
+        if not image_bytes:
             return jsonify({'error': 'No image data provided'}), 400
+        if mode not in DETECT_MODES:
+            return jsonify({'error': f"Invalid mode, expected one of {', '.join(DETECT_MODES)}"}), 400
+        startup.wait(config.MODEL_READY_TIMEOUT)
+        try:
+            parse_detection_mode(detection_mode, detector.class_names)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        print(f"   Received detection request with confidence threshold: {confidence_threshold}")
+        results = run_detection(image_bytes, confidence_threshold, mode, detection_mode)
+        g.log_fields.update(
+            objects=results['total_objects'],
+            mode=results.get('mode'),
+            cached=results.get('cached', False),
+            batch_size=results.get('batch', {}).get('size', 0),
+            processing_time=round(results['processing_time'], 4)
+        )
         
-        # Perform detection
-        results = detector.detect_objects(image_data, confidence_threshold)
+        # Save detection, reusing the already decoded bytes
+        with telemetry.timer('persistence'):
+            detector.save_detection(image_bytes, results)
         
-        # Save detection
-        detector.save_detection(image_data, results)
+        with telemetry.timer('serialization'):
+            return jsonify({
+                'success': True,
+                'results': results,
+                'timestamp': datetime.now().isoformat()
+            })
         
-        return jsonify({
-            'success': True,
-            'results': results,
-            'timestamp': datetime.now().isoformat()
-        })
+    except InvalidImage as e:
+        return jsonify({'error': str(e)}), 400
+    except HTTPException as e:
+        # Malformed JSON bodies and unsupported content types
+        return jsonify({'error': e.description}), e.code
+    except ModelNotReady as e:
+        return jsonify({'error': str(e)}), 503
+    except FutureTimeout:
+        return jsonify({'error': 'Detection timed out'}), 504
+    except Exception as e:
+        logger.exception('Error in detection endpoint')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/detect/batch', methods=['POST'])
+def detect_objects_batch():
+    """Batched detection endpoint for several images in one request"""
+    try:
+        try:
+            with telemetry.timer('decode'):
+                images_data, confidence_threshold, mode, detection_mode = read_detect_batch_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not images_data:
+            return jsonify({'error': 'No image data provided'}), 400
+        if mode not in DETECT_MODES:
+            return jsonify({'error': f"Invalid mode, expected one of {', '.join(DETECT_MODES)}"}), 400
+        try:
+            confidence_threshold, classes = resolve_request_settings(confidence_threshold, detection_mode)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # One model serves the whole batch; shadow runs only cover single-image requests
+        model, _ = detector.router.route()
+        results, batch_info = detector.detect_batch(
+            images_data, confidence_threshold, max_batch_size=config.DETECT_MAX_BATCH_SIZE, mode=mode, classes=classes,
+            model=model
+        )
+        for result in results:
+            if 'mode' in result:
+                # Same per-mode latency as single-image requests, one observation per image
+                telemetry.observe(f"detect_{result['mode']}", result['processing_time'])
+            if not result.get('cached'):
+                detector.router.record(model.version, result['processing_time'], result['total_objects'])
+        
+        with telemetry.timer('persistence'):
+            for image_data, result in zip(images_data, results):
+                detector.save_detection(image_data, result)
+        
+        g.log_fields.update(
+            images=batch_info['size'],
+            inferred=batch_info['inferred'],
+            processing_time=round(batch_info['processing_time'], 4)
+        )
         
+        with telemetry.timer('serialization'):
+            return jsonify({
+                'success': True,
+                'results': results,
+                'batch': batch_info,
+                'timestamp': datetime.now().isoformat()
+            })
+        
+    except InvalidImage as e:
+        return jsonify({'error': str(e)}), 400
+    except HTTPException as e:
+        return jsonify({'error': e.description}), e.code
+    except ModelNotReady as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
-        print(f"❌ Error in detection endpoint: {e}")
+        logger.exception('Error in batch detection endpoint')
         return jsonify({'error': str(e)}), 500
 
+def read_time_arg(name):
+    """Parse an ISO 8601 query argument into the UTC 'YYYY-MM-DD HH:MM:SS' form SQLite stores"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
 @app.route('/api/history', methods=['GET'])
 def get_detection_history():
-    """Get detection history"""
+    """Get detection history, newest first.
+    
+    Query arguments: ``limit``, ``cursor`` (``next_cursor`` of the previous
+    page), ``since``/``until`` (ISO 8601) and ``class`` (comma-separated
+    class names; rows with at least one of them).
+    """
     try:
-        conn = sqlite3.connect('database/space_station.db')
-        cursor = conn.cursor()
+        try:
+            limit = max(1, min(request.args.get('limit', 50, type=int), config.HISTORY_MAX_PAGE_SIZE))
+            since, until = read_time_arg('since'), read_time_arg('until')
+            page_cursor = request.args.get('cursor')
+            position = decode_cursor(page_cursor) if page_cursor else None
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid limit, cursor or time range'}), 400
         
-        cursor.execute('''
-            SELECT id, timestamp, toolbox_count, oxygen_tank_count, fire_extinguisher_count,
-                   confidence_scores, processing_time
-            FROM detections
-            ORDER BY timestamp DESC
-            LIMIT 50
-        ''')
+        classes = [c for c in request.args.get('class', '').split(',') if c]
+        unknown = [c for c in classes if c not in CLASS_COUNT_COLUMNS]
+        if unknown:
+            return jsonify({'error': f"Unknown class: {', '.join(unknown)}"}), 400
+        
+        rows, next_cursor = history_page(detector.db, limit, since, until, classes, position)
         
-        rows = cursor.fetchall()
         history = []
         
         for row in rows:
@@ -278,89 +946,86 @@ def get_detection_history():
                 'oxygen_tank_count': row[3],
                 'fire_extinguisher_count': row[4],
                 'confidence_scores': json.loads(row[5]) if row[5] else [],
-                'processing_time': row[6]
+                'processing_time': row[6],
+                'image_hash': row[7]
             })
         
-        conn.close()
-        
         return jsonify({
             'success': True,
-            'history': history
+            'history': history,
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/images/<image_hash>', methods=['GET'])
+def get_image(image_hash):
+    """Stream a stored detection image, or its thumbnail with ?thumbnail=1"""
+    try:
+        if request.args.get('thumbnail', type=int):
+            path = detector.image_store.thumbnail_path(image_hash)
+        else:
+            path = detector.image_store.path(image_hash)
+        
+        if path is None:
+            return jsonify({'error': 'Image not found'}), 404
+        
+        return send_file(path, max_age=31536000)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/settings', methods=['GET', 'POST'])
 def manage_settings():
     """Manage user settings"""
-    conn = sqlite3.connect('database/space_station.db')
-    cursor = conn.cursor()
-    
     if request.method == 'GET':
-        cursor.execute('SELECT confidence_threshold, detection_mode, ui_preferences FROM user_settings ORDER BY id DESC LIMIT 1')
-        row = cursor.fetchone()
-        
-        if row:
-            settings = {
-                'confidence_threshold': row[0],
-                'detection_mode': row[1],
-                'ui_preferences': json.loads(row[2]) if row[2] else {}
-            }
-        else:
-            settings = {
-                'confidence_threshold': 0.5,
-                'detection_mode': 'all',
-                'ui_preferences': {}
-            }
-        
-        conn.close()
-        return jsonify({'success': True, 'settings': settings})
+        return jsonify({'success': True, 'settings': detector.settings.get()})
     
     elif request.method == 'POST':
-        data = request.get_json()
-        
-        cursor.execute('''
-            INSERT INTO user_settings (confidence_threshold, detection_mode, ui_preferences)
-            VALUES (?, ?, ?)
-        ''', (
-            data.get('confidence_threshold', 0.5),
-            data.get('detection_mode', 'all'),
-            json.dumps(data.get('ui_preferences', {}))
-        ))
+        data = request.get_json() or {}
+        changes = {key: data[key] for key in ('confidence_threshold', 'detection_mode', 'ui_preferences') if key in data}
         
-        conn.commit()
-        conn.close()
+        try:
+            changes = validate_changes(changes)
+            if 'detection_mode' in changes:
+                parse_detection_mode(changes['detection_mode'], detector.class_names)
+            settings = detector.settings.update(changes, expected_version=data.get('version'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        except VersionConflict as e:
+            return jsonify({'error': str(e), 'settings': detector.settings.get()}), 409
         
-        return jsonify({'success': True, 'message': 'Settings updated'})
+        return jsonify({'success': True, 'message': 'Settings updated', 'settings': settings})
+
+@app.route('/api/settings/history', methods=['GET'])
+def get_settings_history():
+    """Previous settings versions, newest first"""
+    return jsonify({'success': True, 'version': detector.settings.version, 'history': detector.settings.history()})
 
 @app.route('/api/metrics', methods=['GET'])
 def get_model_metrics():
     """Get model performance metrics"""
     try:
-        conn = sqlite3.connect('database/space_station.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT mAP_50, mAP_50_95, precision, recall, timestamp
-            FROM training_results
-            ORDER BY timestamp DESC
-            LIMIT 1
-        ''')
-        
-        training_row = cursor.fetchone()
-        
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_detections,
-                AVG(processing_time) as avg_processing_time,
-                SUM(toolbox_count + oxygen_tank_count + fire_extinguisher_count) as total_objects
-            FROM detections
-        ''')
-        
-        detection_row = cursor.fetchone()
-        
-        conn.close()
+        with detector.db.read() as conn:
+            training_row = conn.execute(f'''
+                SELECT mAP_50, mAP_50_95, precision, recall, timestamp
+                FROM training_results
+                WHERE COALESCE(CASE WHEN json_valid(config) THEN json_extract(config, '$.type') END, '')
+                      NOT IN ({', '.join('?' * len(EVALUATION_RESULT_TYPES))})
+                ORDER BY timestamp DESC, id DESC
+                LIMIT 1
+            ''', EVALUATION_RESULT_TYPES).fetchone()
+            
+            # All-time totals come from the rollup row instead of scanning detections
+            detection_row = conn.execute('''
+                SELECT 
+                    detections as total_detections,
+                    processing_time_sum / detections as avg_processing_time,
+                    total_objects
+                FROM detection_rollups
+                WHERE granularity = 'all' AND bucket = ''
+            ''').fetchone()
         
         metrics = {
             'model_performance': {
@@ -374,7 +1039,11 @@ def get_model_metrics():
                 'total_detections': detection_row[0] if detection_row else 0,
                 'avg_processing_time': detection_row[1] if detection_row else 0,
                 'total_objects_detected': detection_row[2] if detection_row else 0
-            }
+            },
+            'persistence': detector.writer.stats(),
+            'database': detector.db.stats(),
+            'inference_cache': detector.result_cache.stats(),
+            'latency': telemetry.summary()
         }
         
         return jsonify({'success': True, 'metrics': metrics})
@@ -382,13 +1051,293 @@ def get_model_metrics():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/metrics/timeseries', methods=['GET'])
+def get_metrics_timeseries():
+    """Per-minute or per-hour detection counts and processing time from the rollup table"""
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in ('minute', 'hour'):
+        return jsonify({'error': "Invalid granularity, expected 'minute' or 'hour'"}), 400
+    try:
+        since, until = read_time_arg('since'), read_time_arg('until')
+    except ValueError:
+        return jsonify({'error': 'Invalid time range'}), 400
+    limit = max(1, min(request.args.get('limit', 1440, type=int), 10000))
+    
+    # Newest buckets first so the limit keeps the most recent window, then return them in time order
+    rows = detector.db.fetch_all('''
+        SELECT bucket, detections, total_objects, toolbox_count, oxygen_tank_count,
+               fire_extinguisher_count, processing_time_sum, processing_time_max
+        FROM detection_rollups
+        WHERE granularity = ? AND (? IS NULL OR bucket >= ?) AND (? IS NULL OR bucket < ?)
+        ORDER BY bucket DESC
+        LIMIT ?
+    ''', (granularity, since, since, until, until, limit))
+    
+    series = [{
+        'bucket': row[0],
+        'detections': row[1],
+        'total_objects': row[2],
+        'class_counts': dict(zip(CLASS_COUNT_COLUMNS, row[3:6])),
+        'avg_processing_time': row[6] / row[1] if row[1] else 0,
+        'max_processing_time': row[7]
+    } for row in reversed(rows)]
+    
+    return jsonify({'success': True, 'granularity': granularity, 'series': series})
+
+@app.route('/api/metrics/models', methods=['GET'])
+def get_model_comparison():
+    """Persisted detection counts and processing time per model version, plus live serving and shadow stats"""
+    try:
+        since, until = read_time_arg('since'), read_time_arg('until')
+    except ValueError:
+        return jsonify({'error': 'Invalid time range'}), 400
+    
+    rows = detector.db.fetch_all('''
+        SELECT model_version, COUNT(*), SUM(toolbox_count + oxygen_tank_count + fire_extinguisher_count),
+               SUM(toolbox_count), SUM(oxygen_tank_count), SUM(fire_extinguisher_count),
+               AVG(processing_time), MAX(processing_time)
+        FROM detections
+        WHERE (? IS NULL OR timestamp >= ?) AND (? IS NULL OR timestamp < ?)
+        GROUP BY model_version
+    ''', (since, since, until, until))
+    
+    models = [{
+        'model_version': row[0],
+        'detections': row[1],
+        'total_objects': row[2],
+        'class_counts': dict(zip(CLASS_COUNT_COLUMNS, row[3:6])),
+        'avg_processing_time': row[6],
+        'max_processing_time': row[7]
+    } for row in rows]
+    
+    return jsonify({'success': True, 'models': models, 'live': detector.router.stats()})
+
+def check_admin_token():
+    """Return an error response unless the request carries ADMIN_TOKEN; without one, admin calls are disabled"""
+    if not config.ADMIN_TOKEN:
+        return jsonify({'error': 'Admin endpoints are disabled, set ADMIN_TOKEN to enable them'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), config.ADMIN_TOKEN):
+        return jsonify({'error': 'Admin token required'}), 403
+    return None
+
+def is_within(path, directory):
+    """Whether ``path`` resolves, following symlinks, to a location inside ``directory``"""
+    path, directory = os.path.realpath(path), os.path.realpath(directory)
+    return os.path.commonpath([path, directory]) == directory
+
+def describe_deployment():
+    active, candidate, split, shadow = detector.router.deployment
+    return {
+        'active': active.version if active else None,
+        'candidate': candidate.version if candidate else None,
+        'split': split,
+        'shadow': shadow
+    }
+
+@app.route('/api/admin/models', methods=['GET', 'POST'])
+def manage_models():
+    """List registered model versions, or register new weights from a path on the server"""
+    denied = check_admin_token()
+    if denied:
+        return denied
+    
+    if request.method == 'GET':
+        return jsonify({
+            'success': True,
+            'versions': detector.registry.versions(),
+            'deployment': describe_deployment(),
+            'saved_deployment': detector.registry.deployment()
+        })
+    
+    data = request.get_json() or {}
+    if not data.get('weights'):
+        return jsonify({'error': 'No weights path provided'}), 400
+    # Loading weights unpickles them, so only accept files from the trusted import directory
+    if not isinstance(data['weights'], str) or not is_within(data['weights'], config.MODEL_IMPORT_DIR):
+        return jsonify({'error': f'Weights must be inside {config.MODEL_IMPORT_DIR}'}), 400
+    try:
+        entry = detector.registry.register(data['weights'], data.get('version'), data.get('metrics'))
+    except (FileNotFoundError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True, 'version': entry}), 201
+
+@app.route('/api/admin/models/deploy', methods=['POST'])
+def deploy_models():
+    """Load and warm up the requested versions, then atomically swap what serves traffic.
+    
+    Omitted fields keep their current value; ``candidate: null`` removes the candidate.
+    """
+    denied = check_admin_token()
+    if denied:
+        return denied
+    
+    data = request.get_json() or {}
+    current = describe_deployment()
+    deployment = {key: data.get(key, current[key]) for key in ('active', 'candidate', 'split', 'shadow')}
+    if not deployment['active']:
+        return jsonify({'error': 'No active model version provided'}), 400
+    
+    try:
+        startup.wait(config.MODEL_READY_TIMEOUT)
+        deployment['split'] = float(deployment['split'])
+        timings = detector.deploy(**deployment)
+    except ModelNotReady as e:
+        return jsonify({'error': str(e)}), 503
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception('Model deployment failed')
+        return jsonify({'error': str(e)}), 500
+    
+    # Restarts serve the same deployment, unless it uses the unregistered MODEL_PATH
+    registered = {entry['version'] for entry in detector.registry.versions()}
+    persisted = all(version in registered for version in (deployment['active'], deployment['candidate']) if version)
+    if persisted:
+        detector.registry.set_deployment(**deployment)
+    
+    return jsonify({'success': True, 'deployment': describe_deployment(), 'loaded': timings, 'persisted': persisted})
+
+@app.route('/api/streams', methods=['GET'])
+def get_streams():
+    """Connected live camera streams with their frame rates and drop counts"""
+    from streaming import registry
+    return jsonify({'success': True, 'streams': registry.snapshot()})
+
+@app.route('/api/video/ingest', methods=['POST'])
+def start_video_ingest():
+    """Start a background ingestion job for a video file or live feed URL"""
+    denied = check_admin_token()
+    if denied:
+        return denied
+    
+    data = request.get_json() or {}
+    if not data.get('source'):
+        return jsonify({'error': 'No video source provided'}), 400
+    
+    try:
+        # Checked here so bad options are a 400 instead of failing later in the job thread
+        check_source(data['source'], config.VIDEO_SOURCE_DIR, config.VIDEO_SOURCE_SCHEMES)
+        confidence_threshold = parse_confidence_threshold(data.get('confidence_threshold'))
+        check_job_options(data.get('frame_stride'), data.get('motion_threshold'), data.get('max_skip_seconds'))
+        startup.wait(config.MODEL_READY_TIMEOUT)
+        if confidence_threshold is None:
+            confidence_threshold = detector.settings.get()['confidence_threshold']
+        job = video_jobs.start(
+            data['source'],
+            confidence_threshold=confidence_threshold,
+            frame_stride=data.get('frame_stride'),
+            motion_threshold=data.get('motion_threshold'),
+            max_skip_seconds=data.get('max_skip_seconds')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except ModelNotReady as e:
+        return jsonify({'error': str(e)}), 503
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 429
+    
+    return jsonify({'success': True, 'job': job}), 202
+
+@app.route('/api/video/jobs', methods=['GET'])
+def get_video_jobs():
+    """Video ingestion jobs with frame, skip and inference counters"""
+    return jsonify({'success': True, 'jobs': video_jobs.snapshot()})
+
+@app.route('/api/video/jobs/<int:job_id>/stop', methods=['POST'])
+def stop_video_job(job_id):
+    """Stop a running video ingestion job, storing the timelines of open tracks"""
+    denied = check_admin_token()
+    if denied:
+        return denied
+    
+    job = video_jobs.stop(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/api/video/timelines', methods=['GET'])
+def get_presence_timelines():
+    """Object presence timelines from ingested video, optionally filtered by source and class"""
+    try:
+        query = '''
+            SELECT id, timestamp, source, track_id, class_name, first_seen, last_seen,
+                   duration, hits, max_confidence, last_bbox
+            FROM object_presence
+            WHERE (? IS NULL OR source = ?) AND (? IS NULL OR class_name = ?)
+            ORDER BY id DESC
+            LIMIT ?
+        '''
+        source = request.args.get('source')
+        class_name = request.args.get('class')
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+        
+        rows = detector.db.fetch_all(query, (source, source, class_name, class_name, limit))
+        
+        timelines = [{
+            'id': row[0],
+            'timestamp': row[1],
+            'source': row[2],
+            'track_id': row[3],
+            'class': row[4],
+            'first_seen': row[5],
+            'last_seen': row[6],
+            'duration': row[7],
+            'hits': row[8],
+            'max_confidence': row[9],
+            'last_bbox': json.loads(row[10]) if row[10] else None
+        } for row in rows]
+        
+        return jsonify({'success': True, 'timelines': timelines})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/metrics/prometheus', methods=['GET'])
+def get_prometheus_metrics():
+    """Export in-memory latency, batch and request metrics in Prometheus text format"""
+    persistence = detector.writer.stats()
+    cache = detector.result_cache.stats()
+    gauges = {
+        'persistence_queue_depth': persistence['queue_depth'],
+        'persistence_last_flush_seconds': persistence['last_flush_time'],
+        'inference_cache_entries': cache['entries']
+    }
+    counters = {
+        'persistence_rows_dropped': persistence['rows_dropped'],
+        'inference_cache_hits': cache['hits'],
+        'inference_cache_misses': cache['misses']
+    }
+    return Response(telemetry.render_prometheus(gauges, counters), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     print("🚀 Starting Space Station Detection API...")
     print("📊 API Endpoints:")
-    print("  - GET  /api/health - Health check")
+    print("  - GET  /api/health - Health check with startup phases (/api/health/live, /api/health/ready for probes)")
     print("  - POST /api/detect - Object detection")
-    print("  - GET  /api/history - Detection history")
+    print("  - POST /api/detect/batch - Batched object detection")
+    print("  - GET  /api/history - Detection history (cursor pagination, time and class filters)")
+    print("  - GET  /api/images/<hash> - Stored detection image")
     print("  - GET/POST /api/settings - User settings")
+    print("  - GET  /api/settings/history - Previous settings versions")
     print("  - GET  /api/metrics - Model metrics")
+    print("  - GET  /api/metrics/timeseries - Per-minute/hour detection rollups")
+    print("  - GET  /api/metrics/models - Detection counts and latency per model version")
+    print("  - GET/POST /api/admin/models - Registered model versions / register weights")
+    print("  - POST /api/admin/models/deploy - Hot-swap the active model, A/B split or shadow a candidate")
+    print("  - GET  /api/metrics/prometheus - Latency and request metrics (Prometheus format)")
+    print("  - GET  /api/streams - Live camera streams on the WebSocket server")
+    print("  - POST /api/video/ingest - Start video file or live feed ingestion")
+    print("  - GET  /api/video/jobs - Video ingestion jobs (POST /api/video/jobs/<id>/stop to stop one)")
+    print("  - GET  /api/video/timelines - Object presence timelines from video")
+    
+    if config.SERVING_WORKERS:
+        print("⚠️  SERVING_WORKERS is ignored by the development server, use 'python serve.py'")
+    
+    # The reloader runs this block in a watcher process too, only the serving child binds the stream port
+    if config.STREAM_ENABLED and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from streaming import start_stream_server
+        start_stream_server(run_detection, config.SERVING_HOST, config.STREAM_PORT,
+                            config.STREAM_QUEUE_SIZE, config.STREAM_MAX_FRAME_BYTES)
+        print(f"📡 Streaming detections on ws://{config.SERVING_HOST}:{config.STREAM_PORT}/ws/stream/<camera_id>")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
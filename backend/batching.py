@@ -0,0 +1,96 @@
+"""Dynamic micro-batching of concurrent detection requests"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Merge concurrently submitted items into a single batched call.
+
+    Items are collected until either ``max_batch_size`` items are queued or
+    ``max_wait_ms`` has passed since the first item of the batch arrived.
+    ``process_batch`` receives the list of items and must return one result
+    per item, in order. Each future resolves to ``(result, batch_info)``.
+
+    Up to ``concurrency`` batches are processed at once, e.g. one per
+    inference worker process; the next batch keeps filling meanwhile.
+    """
+
+    def __init__(self, process_batch, max_batch_size=8, max_wait_ms=10, concurrency=1):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.concurrency = max(1, int(concurrency))
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix='detect-batch')
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='detect-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queue an item and return a future for its result"""
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def shutdown(self, timeout=None):
+        """Stop the batching thread after draining queued items"""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return None, True
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if batch:
+                self._slots.acquire()
+                self._executor.submit(self._dispatch, batch)
+        self._executor.shutdown(wait=True)
+
+    def _dispatch(self, batch):
+        items = [entry[0] for entry in batch]
+        start = time.perf_counter()
+        try:
+            results = self.process_batch(items)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        batch_time = time.perf_counter() - start
+
+        if len(results) != len(batch):
+            # Results can no longer be matched to items, so fail every caller instead of leaving some waiting
+            error = RuntimeError(f'process_batch returned {len(results)} results for {len(batch)} items')
+            for _, future, _ in batch:
+                future.set_exception(error)
+            return
+
+        for (_, future, queued_at), result in zip(batch, results):
+            future.set_result((result, {
+                'size': len(batch),
+                'batch_time': batch_time,
+                'queue_time': start - queued_at
+            }))
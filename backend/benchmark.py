@@ -0,0 +1,299 @@
+"""Reproducible offline benchmarks for the detection service.
+
+``run`` generates synthetic JPEG frames (seeded noise plus random boxes) at
+several resolutions and object densities and measures, without any network:
+
+- startup: import time, time-to-ready and peak RSS of a fresh process
+- detector: end-to-end and per-stage p50/p95/p99 of ``SpaceStationDetector``
+- http: latency and throughput of ``POST /api/detect`` at increasing
+  concurrency, through the Flask test client and the micro-batcher
+
+Benchmarks use a throwaway database and image store and turn the result
+cache off, so repeated frames are really inferred. ``compare`` flags metrics
+that got worse by more than a threshold between two JSON reports and exits
+non-zero when any did.
+
+Usage:
+    python benchmark.py run --output bench.json
+    python benchmark.py compare baseline.json bench.json --threshold 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+STARTUP_MARKER = 'BENCHMARK_STARTUP '
+STARTUP_PROBE = '''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+app.startup.wait({timeout})
+from benchmark import peak_rss_mb
+print({marker!r} + json.dumps({{'import_seconds': round(imported, 3), 'peak_rss_mb': peak_rss_mb(),
+                              **app.startup.snapshot()}}))
+'''
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB, None where ``resource`` is unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def synthetic_frame(width, height, objects, seed=0, quality=90):
+    """JPEG bytes of a gradient-and-noise frame with ``objects`` filled boxes, reproducible from ``seed``"""
+    rng = np.random.default_rng(seed)
+    # Gradient plus noise compresses and decodes like a photo rather than a flat colour
+    gradient = np.add.outer(np.linspace(0, 127, height), np.linspace(0, 127, width)).astype(np.int16)
+    frame = gradient[..., None] + rng.integers(-16, 17, (height, width, 3), dtype=np.int16)
+    frame = np.clip(frame, 0, 255).astype(np.uint8)
+    for _ in range(objects):
+        box_w = int(rng.integers(width // 30 + 1, width // 6 + 2))
+        box_h = int(rng.integers(height // 30 + 1, height // 6 + 2))
+        x0, y0 = int(rng.integers(0, width - box_w)), int(rng.integers(0, height - box_h))
+        cv2.rectangle(frame, (x0, y0), (x0 + box_w, y0 + box_h), rng.integers(0, 256, 3).tolist(), -1)
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError('Failed to encode synthetic frame')
+    return buffer.tobytes()
+
+
+def latency_summary(seconds):
+    """p50/p95/p99, mean and max of latency samples, in milliseconds"""
+    if not seconds:
+        return {'p50': 0, 'p95': 0, 'p99': 0, 'mean': 0, 'max': 0}
+    ms = np.asarray(seconds) * 1000
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+    return {'p50': round(float(p50), 2), 'p95': round(float(p95), 2), 'p99': round(float(p99), 2),
+            'mean': round(float(ms.mean()), 2), 'max': round(float(ms.max()), 2)}
+
+
+def parse_resolutions(value):
+    return [tuple(int(side) for side in item.lower().split('x')) for item in value.split(',')]
+
+
+def benchmark_environment(workdir):
+    """Environment overrides that isolate a benchmark from the real database and result cache"""
+    return {
+        'DATABASE_URL': f"sqlite:///{os.path.abspath(os.path.join(workdir, 'benchmark.db'))}",
+        'IMAGE_STORE_DIR': os.path.join(workdir, 'images'),
+        'RESULT_CACHE_MODE': 'off',
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING')
+    }
+
+
+def bench_startup(env, timeout=600):
+    """Import the app in a fresh interpreter and report its startup phases and peak RSS"""
+    completed = subprocess.run(
+        [sys.executable, '-c', STARTUP_PROBE.format(timeout=timeout, marker=STARTUP_MARKER)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, **env},
+        capture_output=True, text=True, timeout=timeout + 60
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith(STARTUP_MARKER):
+            return json.loads(line[len(STARTUP_MARKER):])
+    raise RuntimeError(f'Startup probe failed: {completed.stderr.strip()[-2000:]}')
+
+
+def bench_detector(app_module, frames, iterations, mode, confidence, warmup=3):
+    """Time ``detect_objects`` end to end and per stage over ``frames``"""
+    detector = app_module.detector
+    for i in range(warmup):
+        detector.detect_objects(frames[i % len(frames)], confidence, mode)
+
+    app_module.telemetry.reset()
+    samples, objects = [], 0
+    for i in range(iterations):
+        start = time.perf_counter()
+        result = detector.detect_objects(frames[i % len(frames)], confidence, mode)
+        samples.append(time.perf_counter() - start)
+        objects += result['total_objects']
+
+    stages = {
+        stage: {key: round(stats[key] * 1000, 2) for key in ('p50', 'p95', 'p99')}
+        for stage, stats in app_module.telemetry.summary()['stages'].items()
+    }
+    return {'iterations': iterations, 'latency_ms': latency_summary(samples), 'stages_ms': stages,
+            'objects_per_frame': objects / iterations if iterations else 0}
+
+
+def bench_http(app_module, frames, concurrency, requests_per_worker, confidence):
+    """Throughput and latency of POST /api/detect with ``concurrency`` concurrent clients"""
+    def worker(offset):
+        client = app_module.app.test_client()
+        latencies, errors = [], 0
+        for i in range(requests_per_worker):
+            start = time.perf_counter()
+            response = client.post(f'/api/detect?confidence_threshold={confidence}',
+                                    data=frames[(offset + i) % len(frames)], content_type='image/jpeg')
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code != 200
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for worker_latencies, _ in outcomes for latency in worker_latencies]
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in outcomes),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0,
+        'latency_ms': latency_summary(latencies)
+    }
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='space_station_bench_')
+    env = benchmark_environment(workdir)
+    report = {'meta': {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'args': vars(args)
+    }}
+
+    if not args.skip_startup:
+        print('⏱️  Measuring startup in a fresh process...')
+        report['startup'] = bench_startup(env)
+
+    # The app reads its configuration at import time
+    os.environ.update(env)
+    import app as app_module
+    import config
+    app_module.startup.wait(600)
+    report['meta'].update(
+        inference_backend=config.INFERENCE_BACKEND,
+        imgsz=config.INFERENCE_IMGSZ,
+        serving_workers=app_module.detector.workers,
+        model_version=app_module.detector.model.version
+    )
+
+    report['detector'] = []
+    for width, height in parse_resolutions(args.resolutions):
+        for objects in args.densities:
+            frames = [synthetic_frame(width, height, objects, seed) for seed in range(args.frames)]
+            print(f'🔍 Detector {width}x{height}, {objects} objects')
+            result = bench_detector(app_module, frames, args.iterations, args.mode, args.confidence)
+            report['detector'].append({'case': f'{width}x{height}_o{objects}', 'width': width, 'height': height,
+                                       'objects': objects, 'frame_kib': round(np.mean([len(f) for f in frames]) / 1024, 1),
+                                       **result})
+
+    if not args.skip_http:
+        width, height = parse_resolutions(args.http_resolution)[0]
+        frames = [synthetic_frame(width, height, args.http_objects, seed) for seed in range(args.frames)]
+        report['http'] = []
+        for concurrency in args.concurrency:
+            print(f'🌐 POST /api/detect at concurrency {concurrency}')
+            report['http'].append(bench_http(app_module, frames, concurrency, args.requests, args.confidence))
+
+    report['peak_rss_mb'] = peak_rss_mb()
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'✅ Benchmark report written to {args.output}')
+    for case in report['detector']:
+        latency = case['latency_ms']
+        print(f"  - {case['case']:<16} p50 {latency['p50']:>8.1f} ms  p95 {latency['p95']:>8.1f} ms  "
+              f"p99 {latency['p99']:>8.1f} ms")
+    for level in report.get('http', []):
+        print(f"  - http c={level['concurrency']:<3} {level['throughput_rps']:>7.1f} req/s  "
+              f"p95 {level['latency_ms']['p95']:>8.1f} ms  errors {level['errors']}")
+
+
+def flatten(report):
+    """Map comparable metric names to ``(value, higher_is_better)``"""
+    metrics = {}
+    for key in ('import_seconds', 'time_to_ready_seconds', 'peak_rss_mb'):
+        value = report.get('startup', {}).get(key)
+        if value is not None:
+            metrics[f'startup.{key}'] = (value, False)
+    for case in report.get('detector', []):
+        for quantile, value in case['latency_ms'].items():
+            metrics[f"detector.{case['case']}.latency_ms.{quantile}"] = (value, False)
+        for stage, quantiles in case['stages_ms'].items():
+            metrics[f"detector.{case['case']}.{stage}_ms.p95"] = (quantiles['p95'], False)
+    for level in report.get('http', []):
+        prefix = f"http.c{level['concurrency']}"
+        metrics[f'{prefix}.throughput_rps'] = (level['throughput_rps'], True)
+        metrics[f'{prefix}.latency_ms.p95'] = (level['latency_ms']['p95'], False)
+        metrics[f'{prefix}.errors'] = (level['errors'], False)
+    if report.get('peak_rss_mb') is not None:
+        metrics['peak_rss_mb'] = (report['peak_rss_mb'], False)
+    return metrics
+
+
+def compare(baseline, candidate, threshold=0.1):
+    """Relative change of every metric present in both reports; regressions exceed ``threshold``"""
+    base_metrics, new_metrics = flatten(baseline), flatten(candidate)
+    rows = []
+    for name, (base, higher_is_better) in base_metrics.items():
+        if name not in new_metrics:
+            continue
+        new = new_metrics[name][0]
+        change = (new - base) / base if base else (0.0 if new == base else float('inf'))
+        worse = -change if higher_is_better else change
+        rows.append({'metric': name, 'baseline': base, 'candidate': new, 'change': change,
+                     'regression': worse > threshold})
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline latency, throughput and startup benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmark suite and write a JSON report')
+    run_parser.add_argument('--output', default='benchmark.json')
+    run_parser.add_argument('--resolutions', default='640x480,1280x720,1920x1080,3840x2160')
+    run_parser.add_argument('--densities', type=lambda v: [int(x) for x in v.split(',')], default=[0, 5, 25],
+                            help='Comma-separated object counts per frame')
+    run_parser.add_argument('--frames', type=int, default=4, help='Distinct frames per case')
+    run_parser.add_argument('--iterations', type=int, default=30)
+    run_parser.add_argument('--mode', default='full', choices=('full', 'tiled', 'auto'))
+    run_parser.add_argument('--confidence', type=float, default=0.25)
+    run_parser.add_argument('--http-resolution', default='1920x1080')
+    run_parser.add_argument('--http-objects', type=int, default=5)
+    run_parser.add_argument('--concurrency', type=lambda v: [int(x) for x in v.split(',')], default=[1, 2, 4, 8])
+    run_parser.add_argument('--requests', type=int, default=20, help='Requests per concurrent client')
+    run_parser.add_argument('--skip-startup', action='store_true')
+    run_parser.add_argument('--skip-http', action='store_true')
+
+    compare_parser = subparsers.add_parser('compare', help='Flag regressions between two reports')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='Relative change counted as a regression')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.candidate) as f:
+            candidate = json.load(f)
+        rows = compare(baseline, candidate, args.threshold)
+        regressions = [row for row in rows if row['regression']]
+        for row in rows:
+            marker = '❌' if row['regression'] else '  '
+            print(f"{marker} {row['metric']:<48} {row['baseline']:>10} → {row['candidate']:>10}  ({row['change']:+.1%})")
+        print(f"{'❌' if regressions else '✅'} {len(regressions)} regressions out of {len(rows)} metrics "
+              f"(threshold {args.threshold:.0%})")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,355 @@
+"""Offline bulk detection over directories or globs of images, without the HTTP server.
+
+Images are read and decoded in a thread pool and inferred in batches by
+``SpaceStationDetector``. With ``SERVING_WORKERS`` (``--workers``) several
+batches run at once, one per worker process. Only a bounded number of decoded
+images and batches are in flight, so memory stays flat however many files
+there are. Results are streamed as they finish:
+
+- JSON Lines: one object per image, appended and flushed after every batch
+- Parquet (needs pyarrow): a directory of ``part-NNNNN.parquet`` files, each
+  written atomically once ``--rows-per-file`` rows are buffered
+
+Runs are resumable: files already in the output are skipped, except those
+that failed, which are retried. ``--insert`` also stores every summary in
+``detections``, in one transaction per JSONL batch or Parquet part and only
+once those rows are durable in the output, so a resumed run never inserts an
+image twice.
+
+Usage:
+    python bulk_infer.py /data/archive --output archive.jsonl
+    python bulk_infer.py '/data/archive/**/*.jpg' --format parquet --output archive_parquet --insert
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+
+def iter_image_paths(sources):
+    """Yield absolute paths of images under directories (recursively, sorted) or matching glob patterns"""
+    for source in sources:
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_SUFFIXES):
+                        yield os.path.abspath(os.path.join(root, name))
+        else:
+            for path in sorted(glob.iglob(source, recursive=True)):
+                if os.path.isfile(path) and path.lower().endswith(IMAGE_SUFFIXES):
+                    yield os.path.abspath(path)
+
+
+def bounded_map(executor, fn, items, window):
+    """Like ``executor.map`` but never more than ``window`` items ahead of the consumer"""
+    pending = []
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class JsonLinesOutput:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._drop_torn_line()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _drop_torn_line(self):
+        # A run killed mid-write leaves a partial last line; appending after it would corrupt the next row
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+        with open(self.path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b'\n':
+                return
+            f.seek(0)
+            data = f.read()
+            f.truncate(data.rfind(b'\n') + 1)
+
+    def processed(self):
+        """Paths already written without an error"""
+        done = set()
+        if not self.path.exists():
+            return done
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not row.get('error'):
+                    done.add(row['path'])
+        return done
+
+    def write(self, rows):
+        """Append rows and return them, as they are now recorded for resume"""
+        for row in rows:
+            self._file.write(json.dumps(row) + '\n')
+        self._file.flush()
+        return rows
+
+    def close(self):
+        self._file.close()
+        return []
+
+
+class ParquetOutput:
+    COLUMNS = ('path', 'image_hash', 'model_version', 'mode', 'tiles', 'total_objects',
+               'class_counts', 'detections', 'processing_time', 'error')
+    # Nested fields are stored as JSON text so every part file has the same schema
+    JSON_COLUMNS = ('class_counts', 'detections')
+
+    def __init__(self, path, rows_per_file=10000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError('Parquet output needs pyarrow: pip install pyarrow')
+        self.pa, self.pq = pa, pq
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.rows_per_file = rows_per_file
+        self._rows = []
+        self._parts = len(list(self.path.glob('part-*.parquet')))
+
+    def processed(self):
+        done = set()
+        for part in sorted(self.path.glob('part-*.parquet')):
+            table = self.pq.read_table(part, columns=['path', 'error']).to_pydict()
+            done.update(path for path, error in zip(table['path'], table['error']) if not error)
+        return done
+
+    def write(self, rows):
+        """Buffer rows; return the rows of the part this call wrote, if any"""
+        self._rows.extend(rows)
+        if len(self._rows) >= self.rows_per_file:
+            return self._flush()
+        return []
+
+    def _flush(self):
+        rows, self._rows = self._rows, []
+        if not rows:
+            return rows
+        path = self.path / f'part-{self._parts:05d}.parquet'
+        tmp_path = self.path / f'.{path.name}.tmp'
+        table = [{key: json.dumps(row.get(key)) if key in self.JSON_COLUMNS else row.get(key) for key in self.COLUMNS}
+                 for row in rows]
+        self.pq.write_table(self.pa.Table.from_pylist(table), tmp_path)
+        # Parts appear atomically, so a resumed run never reads a partial file
+        os.replace(tmp_path, path)
+        self._parts += 1
+        return rows
+
+    def close(self):
+        return self._flush()
+
+
+class BulkInference:
+    def __init__(self, detector, output, confidence_threshold, classes=None, mode='full',
+                 batch_size=16, decode_threads=4, concurrency=1, insert=False, store_images=False):
+        self.detector = detector
+        self.output = output
+        self.confidence_threshold = confidence_threshold
+        self.classes = classes
+        self.mode = mode
+        self.batch_size = batch_size
+        self.decode_threads = decode_threads
+        self.concurrency = max(1, concurrency)
+        self.insert = insert
+        self.store_images = store_images
+        # Pin one model for the whole run so every row comes from the same weights
+        self.model = detector.model
+        self.counts = {'processed': 0, 'failed': 0, 'objects': 0, 'inserted': 0}
+
+    def load(self, path):
+        """Read, hash and decode one image on a decode thread"""
+        start = time.perf_counter()
+        try:
+            with open(path, 'rb') as f:
+                image_bytes = f.read()
+            image_hash = self.detector.image_store.hash_bytes(image_bytes)
+            image, scale = self.detector.preprocess_image(image_bytes, self.mode)
+            if self.store_images:
+                self.detector.image_store.put(image_bytes, image_hash)
+        except Exception as e:
+            return {'path': path, 'error': str(e)}
+        return {'path': path, 'image_hash': image_hash, 'image': image, 'scale': scale,
+                'decode_time': time.perf_counter() - start}
+
+    def infer(self, items):
+        """Run one batched model call and return an output row per item"""
+        decoded = [item for item in items if 'error' not in item]
+        rows = [{'path': item['path'], 'error': item['error']} for item in items if 'error' in item]
+        if not decoded:
+            return rows
+
+        start = time.perf_counter()
+        try:
+            results = self.detector.detect_images(
+                [item['image'] for item in decoded],
+                [self.confidence_threshold] * len(decoded),
+                None,
+                [self.mode] * len(decoded),
+                [item['scale'] for item in decoded],
+                [self.classes] * len(decoded),
+                self.model
+            )
+        except Exception as e:
+            return rows + [{'path': item['path'], 'error': f'Inference failed: {e}'} for item in decoded]
+        batch_time = time.perf_counter() - start
+
+        for item, result in zip(decoded, results):
+            rows.append({
+                'path': item['path'],
+                'image_hash': item['image_hash'],
+                'model_version': result['model_version'],
+                'mode': result['mode'],
+                'tiles': result['tiles'],
+                'total_objects': result['total_objects'],
+                'class_counts': result['class_counts'],
+                'detections': result['detections'],
+                # Inference time is shared evenly within the batch
+                'processing_time': item['decode_time'] + batch_time / len(decoded),
+                'error': None
+            })
+        return rows
+
+    def store(self, written):
+        # Only rows the output has recorded are inserted: anything a resumed run
+        # processes again was never inserted
+        if self.insert and written:
+            self.counts['inserted'] += self.insert_rows(written)
+
+    def insert_rows(self, rows):
+        """Store a batch of summaries in ``detections`` in one transaction"""
+        from persistence import DetectionWriter
+
+        values = [(
+            row['path'],
+            row['class_counts'].get('ToolBox', 0),
+            row['class_counts'].get('OxygenTank', 0),
+            row['class_counts'].get('FireExtinguisher', 0),
+            json.dumps([d['confidence'] for d in row['detections']]),
+            row['processing_time'],
+            # Only link the image when /api/images can serve it
+            row['image_hash'] if self.store_images else None,
+            row['model_version']
+        ) for row in rows if not row['error']]
+        if values:
+            with self.detector.db.write() as conn:
+                conn.executemany(DetectionWriter.INSERT_SQL, values)
+        return len(values)
+
+    def finish(self, rows):
+        self.store(self.output.write(rows))
+        for row in rows:
+            self.counts['processed'] += 1
+            self.counts['failed'] += bool(row['error'])
+            self.counts['objects'] += row.get('total_objects', 0)
+
+    def run(self, paths, progress_interval=10.0):
+        start = last_report = time.perf_counter()
+        with ThreadPoolExecutor(self.decode_threads, thread_name_prefix='decode') as decoders, \
+                ThreadPoolExecutor(self.concurrency, thread_name_prefix='infer') as inferers:
+            in_flight = set()
+            # Decode enough ahead to keep every inference slot fed, and no further
+            decoded = bounded_map(decoders, self.load, paths, self.batch_size * (self.concurrency + 1))
+            for batch in chunked(decoded, self.batch_size):
+                in_flight.add(inferers.submit(self.infer, batch))
+                if len(in_flight) >= self.concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.finish(future.result())
+
+                if time.perf_counter() - last_report >= progress_interval:
+                    last_report = time.perf_counter()
+                    elapsed = last_report - start
+                    print(f"⏱️  {self.counts['processed']} images, {self.counts['processed'] / elapsed:.1f} img/s, "
+                          f"{self.counts['failed']} failed")
+            for future in in_flight:
+                self.finish(future.result())
+        self.store(self.output.close())
+        self.counts['seconds'] = time.perf_counter() - start
+        return self.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline bulk detection over image directories or globs')
+    parser.add_argument('sources', nargs='+', help='Directories (scanned recursively) or glob patterns')
+    parser.add_argument('--output', required=True, help='JSONL file, or directory for Parquet parts')
+    parser.add_argument('--format', choices=('jsonl', 'parquet'), default='jsonl')
+    parser.add_argument('--rows-per-file', type=int, default=10000, help='Rows per Parquet part file')
+    parser.add_argument('--confidence', type=float, help='Defaults to the saved settings')
+    parser.add_argument('--detection-mode', help="'all' or comma-separated class names; defaults to the saved settings")
+    parser.add_argument('--mode', choices=('full', 'tiled', 'auto'), help='Defaults to DETECT_MODE')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--decode-threads', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--workers', type=int, help='Inference worker processes (default: SERVING_WORKERS)')
+    parser.add_argument('--insert', action='store_true', help='Also store summaries in the detections table')
+    parser.add_argument('--store-images', action='store_true',
+                        help='Copy images into the image store so inserted rows link to them')
+    args = parser.parse_args()
+
+    import config
+
+    if args.workers is not None:
+        config.SERVING_WORKERS = args.workers
+    # Nothing repeats in a scan, so caching results would only cost memory
+    config.RESULT_CACHE_MODE = 'off'
+    # Imported here so spawned workers, which re-import this module, never load the app
+    import app
+
+    output = ParquetOutput(args.output, args.rows_per_file) if args.format == 'parquet' \
+        else JsonLinesOutput(args.output)
+    done = output.processed()
+    if done:
+        print(f"🔁 Resuming: skipping {len(done)} images already in {args.output}")
+
+    app.startup.wait()
+    confidence_threshold, classes = app.resolve_request_settings(args.confidence, args.detection_mode)
+    bulk = BulkInference(
+        app.detector, output, confidence_threshold, classes,
+        mode=args.mode or config.DETECT_MODE,
+        batch_size=args.batch_size,
+        decode_threads=args.decode_threads,
+        concurrency=max(1, app.detector.workers),
+        insert=args.insert,
+        store_images=args.store_images
+    )
+    print(f"✅ Detecting with model {bulk.model.version} at confidence {confidence_threshold}, "
+          f"{bulk.concurrency} batches of {args.batch_size} in flight")
+
+    paths = (path for path in iter_image_paths(args.sources) if path not in done)
+    counts = bulk.run(paths)
+
+    rate = counts['processed'] / counts['seconds'] if counts['seconds'] else 0
+    print(f"\n📋 {counts['processed']} images in {counts['seconds']:.1f}s ({rate:.1f} img/s), "
+          f"{counts['objects']} objects, {counts['failed']} failed")
+    if args.insert:
+        print(f"💾 {counts['inserted']} summaries stored in detections")
+    print(f"📁 Results saved at: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Runtime configuration for the detection backend.
+
+Every setting can be overridden with an environment variable of the same name.
+"""
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+# Micro-batching of concurrent /api/detect requests
+DETECT_MAX_BATCH_SIZE = _env_int('DETECT_MAX_BATCH_SIZE', 8)
+DETECT_MAX_WAIT_MS = _env_float('DETECT_MAX_WAIT_MS', 10)
+# Seconds a request waits for its micro-batch result before giving up with a 504
+DETECT_RESULT_TIMEOUT = _env_float('DETECT_RESULT_TIMEOUT', 60)
+
+# Upper bound on images accepted by one /api/detect/batch request
+DETECT_MAX_IMAGES_PER_REQUEST = _env_int('DETECT_MAX_IMAGES_PER_REQUEST', 64)
+
+# Detection mode: 'full' runs the whole frame at the model input size, 'tiled' slices it
+# into TILE_SIZE windows with TILE_OVERLAP, 'auto' tiles images whose longest side is at
+# least TILE_AUTO_MIN_SIDE. Tile boxes are merged with class-aware NMS ('ios' or 'iou').
+# Tiling multiplies inference cost by the number of windows, so it is opt-in.
+DETECT_MODE = os.environ.get('DETECT_MODE', 'full')
+TILE_SIZE = _env_int('TILE_SIZE', 640)
+TILE_OVERLAP = _env_float('TILE_OVERLAP', 0.2)
+TILE_AUTO_MIN_SIDE = _env_int('TILE_AUTO_MIN_SIDE', 1600)
+TILE_INCLUDE_FULL_FRAME = os.environ.get('TILE_INCLUDE_FULL_FRAME', '1') == '1'
+TILE_MERGE_THRESHOLD = _env_float('TILE_MERGE_THRESHOLD', 0.5)
+TILE_MERGE_METRIC = os.environ.get('TILE_MERGE_METRIC', 'ios')
+
+# Detection database: 'sqlite:///relative/path.db', 'sqlite:////absolute/path.db' or the URL
+# of another SQLite-compatible backend registered with database.register_backend
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///database/space_station.db')
+# Read connections kept open; writes go through one serialized writer connection
+DATABASE_POOL_SIZE = _env_int('DATABASE_POOL_SIZE', 8)
+DATABASE_BUSY_TIMEOUT_MS = _env_int('DATABASE_BUSY_TIMEOUT_MS', 5000)
+DATABASE_CACHE_SIZE_KIB = _env_int('DATABASE_CACHE_SIZE_KIB', 16384)
+DATABASE_MMAP_SIZE_MB = _env_int('DATABASE_MMAP_SIZE_MB', 256)
+
+# Largest page returned by /api/history
+HISTORY_MAX_PAGE_SIZE = _env_int('HISTORY_MAX_PAGE_SIZE', 500)
+
+# Previous settings versions kept in user_settings_history
+SETTINGS_HISTORY_LIMIT = _env_int('SETTINGS_HISTORY_LIMIT', 20)
+
+# Write-behind persistence of detections
+PERSIST_MAX_QUEUE_SIZE = _env_int('PERSIST_MAX_QUEUE_SIZE', 1000)
+PERSIST_MAX_BATCH_SIZE = _env_int('PERSIST_MAX_BATCH_SIZE', 100)
+PERSIST_FLUSH_INTERVAL_MS = _env_float('PERSIST_FLUSH_INTERVAL_MS', 200)
+# 'block' waits up to PERSIST_BLOCK_TIMEOUT seconds for queue space, 'drop' drops immediately
+PERSIST_QUEUE_POLICY = os.environ.get('PERSIST_QUEUE_POLICY', 'block')
+PERSIST_BLOCK_TIMEOUT = _env_float('PERSIST_BLOCK_TIMEOUT', 1.0)
+
+# Content-addressed image store, thumbnails are disabled when the size is 0
+IMAGE_STORE_DIR = os.environ.get('IMAGE_STORE_DIR', 'database/images')
+IMAGE_THUMBNAIL_SIZE = _env_int('IMAGE_THUMBNAIL_SIZE', 256)
+
+# Inference result cache: RESULT_CACHE_MODE is 'exact', 'perceptual' or 'off'
+RESULT_CACHE_MODE = os.environ.get('RESULT_CACHE_MODE', 'exact')
+RESULT_CACHE_MAX_ENTRIES = _env_int('RESULT_CACHE_MAX_ENTRIES', 1024)
+RESULT_CACHE_MAX_BYTES = _env_int('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+RESULT_CACHE_TTL_SECONDS = _env_float('RESULT_CACHE_TTL_SECONDS', 300)
+# Cached results are produced at this confidence so lower request thresholds still match
+RESULT_CACHE_MIN_CONFIDENCE = _env_float('RESULT_CACHE_MIN_CONFIDENCE', 0.05)
+
+# Logging: LOG_FORMAT is 'text' or 'json', per-box DEBUG lines are emitted for a
+# LOG_BOX_SAMPLE_RATE fraction of results
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+LOG_BOX_SAMPLE_RATE = _env_float('LOG_BOX_SAMPLE_RATE', 0.01)
+
+# Inference backend: 'pytorch', 'onnxruntime' or 'openvino'. Exported backends load
+# INFERENCE_ARTIFACT, or the ultralytics export path next to the .pt weights when unset.
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'pytorch')
+INFERENCE_ARTIFACT = os.environ.get('INFERENCE_ARTIFACT', '')
+INFERENCE_IMGSZ = _env_int('INFERENCE_IMGSZ', 640)
+# 0 lets the runtime pick its own intra-op thread count
+INFERENCE_THREADS = _env_int('INFERENCE_THREADS', 0)
+# Most model inputs (images or tiles) in one model call; larger batches are split
+INFERENCE_MAX_BATCH_INPUTS = _env_int('INFERENCE_MAX_BATCH_INPUTS', 16)
+
+# Model weights: MODEL_PATH is the trained .pt file, exported artifacts sit next to it.
+# MODEL_FALLBACK_WEIGHTS is loaded when MODEL_PATH fails; ultralytics downloads names
+# like 'yolov8n.pt' that are not on disk, so there is no fallback by default.
+MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'runs', 'detect', 'train2', 'weights', 'best.pt'))
+MODEL_FALLBACK_WEIGHTS = os.environ.get('MODEL_FALLBACK_WEIGHTS', '')
+# Version label of detections made with MODEL_PATH
+MODEL_VERSION = os.environ.get('MODEL_VERSION', 'default')
+
+# Model registry (model_registry.py): versioned weights plus the active version and an
+# optional candidate, served instead of MODEL_PATH once a version has been deployed
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+# Swapped-out models are closed after this delay so in-flight batches can finish
+MODEL_RETIRE_DELAY_SECONDS = _env_float('MODEL_RETIRE_DELAY_SECONDS', 30)
+# Shadow inferences waiting beyond this are dropped rather than slowing the server
+MODEL_SHADOW_QUEUE_SIZE = _env_int('MODEL_SHADOW_QUEUE_SIZE', 8)
+# /api/admin endpoints require ADMIN_TOKEN in the X-Admin-Token header and are disabled
+# while it is unset. Weights registered through the API must live under MODEL_IMPORT_DIR.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+MODEL_IMPORT_DIR = os.environ.get('MODEL_IMPORT_DIR', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'runs'))
+
+# Startup: the model loads in a background thread and runs MODEL_WARMUP_RUNS dummy
+# batches of MODEL_WARMUP_BATCH_SIZE images before the API reports ready. Requests
+# arriving earlier wait up to MODEL_READY_TIMEOUT seconds, then get a 503.
+MODEL_LOAD_IN_BACKGROUND = os.environ.get('MODEL_LOAD_IN_BACKGROUND', '1') == '1'
+MODEL_WARMUP_RUNS = _env_int('MODEL_WARMUP_RUNS', 2)
+MODEL_WARMUP_BATCH_SIZE = _env_int('MODEL_WARMUP_BATCH_SIZE', 1)
+MODEL_READY_TIMEOUT = _env_float('MODEL_READY_TIMEOUT', 30)
+
+# Production serving (serve.py): SERVING_WORKERS inference processes behind a
+# SERVING_HTTP_THREADS-thread HTTP front-end. 0 workers runs the model in-process.
+SERVING_WORKERS = _env_int('SERVING_WORKERS', 0)
+SERVING_WORKER_START_TIMEOUT = _env_float('SERVING_WORKER_START_TIMEOUT', 300)
+SERVING_HTTP_THREADS = _env_int('SERVING_HTTP_THREADS', 16)
+SERVING_HOST = os.environ.get('SERVING_HOST', '0.0.0.0')
+SERVING_PORT = _env_int('SERVING_PORT', 5000)
+
+# WebSocket streaming of live camera frames (streaming.py, also started by serve.py)
+STREAM_ENABLED = os.environ.get('STREAM_ENABLED', '1') == '1'
+STREAM_PORT = _env_int('STREAM_PORT', 5001)
+# Frames kept per stream while inference is busy, older frames are dropped
+STREAM_QUEUE_SIZE = _env_int('STREAM_QUEUE_SIZE', 1)
+STREAM_MAX_FRAME_BYTES = _env_int('STREAM_MAX_FRAME_BYTES', 16 * 1024 * 1024)
+
+# Video ingestion (video_ingest.py): every VIDEO_FRAME_STRIDE-th frame is considered and
+# only inferred when more than VIDEO_MOTION_THRESHOLD of its pixels changed, or when
+# VIDEO_MAX_SKIP_SECONDS passed since the last inferred frame
+VIDEO_FRAME_STRIDE = _env_int('VIDEO_FRAME_STRIDE', 5)
+VIDEO_MOTION_THRESHOLD = _env_float('VIDEO_MOTION_THRESHOLD', 0.01)
+VIDEO_MAX_SKIP_SECONDS = _env_float('VIDEO_MAX_SKIP_SECONDS', 2.0)
+VIDEO_QUEUE_SIZE = _env_int('VIDEO_QUEUE_SIZE', 4)
+VIDEO_MAX_JOBS = _env_int('VIDEO_MAX_JOBS', 4)
+# Sources accepted by POST /api/video/ingest: files inside VIDEO_SOURCE_DIR, and URL schemes
+# (e.g. 'rtsp,https') or 'camera' for device indexes listed in VIDEO_SOURCE_SCHEMES
+VIDEO_SOURCE_DIR = os.environ.get('VIDEO_SOURCE_DIR', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'videos'))
+VIDEO_SOURCE_SCHEMES = [scheme.strip().lower() for scheme in os.environ.get('VIDEO_SOURCE_SCHEMES', '').split(',')
+                        if scheme.strip()]
+
+# Object tracking across inferred video frames; a track unseen for TRACK_MAX_AGE_SECONDS
+# is closed into a presence timeline, tracks with fewer than TRACK_MIN_HITS are discarded
+TRACK_IOU_THRESHOLD = _env_float('TRACK_IOU_THRESHOLD', 0.3)
+# Fraction of the frame diagonal within which non-overlapping boxes still match
+TRACK_MAX_CENTROID_DISTANCE = _env_float('TRACK_MAX_CENTROID_DISTANCE', 0.1)
+TRACK_MAX_AGE_SECONDS = _env_float('TRACK_MAX_AGE_SECONDS', 5.0)
+TRACK_MIN_HITS = _env_int('TRACK_MIN_HITS', 2)
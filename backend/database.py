@@ -0,0 +1,189 @@
+"""Data access for the detection database.
+
+``Database`` is the interface the rest of the backend uses: ``read()`` lends a
+pooled read-only connection and ``write()`` runs one transaction on the single
+writer connection. ``open_database(url)`` picks the implementation from the
+URL scheme.
+
+This layer covers connection pooling only. The schema and queries elsewhere
+in the backend are written in SQLite's dialect (``?`` placeholders, PRAGMA,
+triggers, ``strftime``, ``json_extract``, ``INSERT OR REPLACE``), so a backend
+registered with ``register_backend`` must be SQLite-compatible, e.g. a
+differently tuned or in-memory SQLite.
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+BACKENDS = {}
+
+
+def register_backend(scheme, factory):
+    """Make ``factory(location, **options)`` available for ``<scheme>://`` URLs"""
+    BACKENDS[scheme] = factory
+
+
+def open_database(url, **options):
+    """Open a database from a URL such as ``sqlite:///database/space_station.db``"""
+    scheme, separator, location = url.partition('://')
+    if not separator:
+        # A bare path is a SQLite file
+        scheme, location = 'sqlite', '/' + url
+    if scheme not in BACKENDS:
+        raise ValueError(f"Unknown database backend: {scheme}")
+    return BACKENDS[scheme](location, **options)
+
+
+class Database:
+    """Connection management shared by all database backends.
+
+    Connections follow DB-API 2.0; ``Error`` is the driver's base exception.
+    """
+
+    Error = Exception
+
+    @contextmanager
+    def read(self):
+        """Lend a read-only connection for the duration of the block"""
+        raise NotImplementedError
+
+    @contextmanager
+    def write(self):
+        """Run the block in a transaction on the writer connection, committing on success"""
+        raise NotImplementedError
+
+    def fetch_one(self, sql, params=()):
+        with self.read() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def fetch_all(self, sql, params=()):
+        with self.read() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+class SQLiteDatabase(Database):
+    """SQLite in WAL mode with a pool of read connections and one serialized writer.
+
+    WAL lets readers run while the writer commits. Pooled connections stay
+    open, so each keeps its compiled statements in the ``sqlite3`` statement
+    cache across requests instead of re-preparing them on every connect.
+    """
+
+    Error = sqlite3.Error
+
+    def __init__(self, path, pool_size=8, busy_timeout_ms=5000, cache_size_kib=16384,
+                 mmap_size_mb=256, statement_cache_size=256, acquire_timeout=30.0):
+        self.path = path
+        self.pool_size = max(1, int(pool_size))
+        self.acquire_timeout = acquire_timeout
+        self.statement_cache_size = statement_cache_size
+        self.pragmas = {
+            'busy_timeout': int(busy_timeout_ms),
+            'synchronous': 'NORMAL',
+            'temp_store': 'MEMORY',
+            # Negative cache_size is in KiB
+            'cache_size': -int(cache_size_kib),
+            'mmap_size': int(mmap_size_mb) * 1024 * 1024
+        }
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._pool = queue.LifoQueue()
+        self._pool_lock = threading.Lock()
+        self._created = 0
+        self._waits = 0
+        self._closed = False
+
+        self._write_lock = threading.RLock()
+        self._writer = self._connect()
+        self._writer.execute('PRAGMA journal_mode=WAL')
+
+    def _connect(self, read_only=False):
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=self.statement_cache_size)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name}={value}')
+        if read_only:
+            conn.execute('PRAGMA query_only=ON')
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if self._closed:
+                raise RuntimeError('Database is closed')
+            if self._created < self.pool_size:
+                self._created += 1
+                create = True
+            else:
+                self._waits += 1
+                create = False
+        if create:
+            try:
+                return self._connect(read_only=True)
+            except Exception:
+                with self._pool_lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._pool.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError(f'No database connection available within {self.acquire_timeout}s')
+
+    @contextmanager
+    def read(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put(conn)
+
+    @contextmanager
+    def write(self):
+        with self._write_lock:
+            with self._writer:
+                yield self._writer
+
+    def stats(self):
+        with self._pool_lock:
+            return {
+                'backend': 'sqlite',
+                'path': self.path,
+                'pool_size': self.pool_size,
+                'read_connections': self._created,
+                'idle_read_connections': self._pool.qsize(),
+                'pool_waits': self._waits
+            }
+
+    def close(self):
+        with self._pool_lock:
+            self._closed = True
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._write_lock:
+            self._writer.close()
+
+
+def _open_sqlite(location, **options):
+    # sqlite:///relative/path.db and sqlite:////absolute/path.db, as in SQLAlchemy URLs
+    return SQLiteDatabase(location[1:] if location.startswith('/') else location, **options)
+
+
+register_backend('sqlite', _open_sqlite)
@@ -0,0 +1,53 @@
+"""Keyset-paginated reads of the detection history"""
+import base64
+import json
+
+# Columns holding the per-class counts of a detection row
+CLASS_COUNT_COLUMNS = {
+    'ToolBox': 'toolbox_count',
+    'OxygenTank': 'oxygen_tank_count',
+    'FireExtinguisher': 'fire_extinguisher_count'
+}
+
+
+def encode_cursor(timestamp, row_id):
+    return base64.urlsafe_b64encode(json.dumps([timestamp, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return str(timestamp), int(row_id)
+
+
+def history_page(database, limit, since=None, until=None, classes=(), position=None):
+    """Return up to ``limit`` detection rows, newest first, and the cursor of the next page or None.
+
+    ``classes`` keeps rows with at least one of those classes; ``position`` is
+    a decoded cursor.
+    """
+    conditions, params = [], []
+    if since:
+        conditions.append('timestamp >= ?')
+        params.append(since)
+    if until:
+        conditions.append('timestamp < ?')
+        params.append(until)
+    if classes:
+        conditions.append('(' + ' OR '.join(f'{CLASS_COUNT_COLUMNS[c]} > 0' for c in classes) + ')')
+    if position:
+        # Keyset pagination: continue strictly after the last row of the previous page
+        conditions.append('(timestamp, id) < (?, ?)')
+        params.extend(position)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    rows = database.fetch_all(f'''
+        SELECT id, timestamp, toolbox_count, oxygen_tank_count, fire_extinguisher_count,
+               confidence_scores, processing_time, image_hash
+        FROM detections
+        {where}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+    ''', (*params, limit + 1))
+
+    last = rows[limit - 1] if len(rows) > limit else None
+    return rows[:limit], encode_cursor(last[1], last[0]) if last else None
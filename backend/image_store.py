@@ -0,0 +1,199 @@
+"""Content-addressed on-disk store for uploaded detection images"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from PIL import Image
+
+_EXTENSIONS = (
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+)
+
+
+def _write_atomic(path, write):
+    """Write a file through a unique temporary name so readers never see partial files.
+
+    Content-addressed files never change, so a target that another thread or
+    process created first counts as success.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except OSError:
+        if not os.path.exists(path):
+            raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _sniff_extension(image_bytes):
+    for magic, extension in _EXTENSIONS:
+        if image_bytes.startswith(magic):
+            return extension
+    return '.bin'
+
+
+class ImageStore:
+    """Store images once per SHA-256 of their bytes.
+
+    Files live at ``<root>/<hash[:2]>/<hash><ext>``; thumbnails are generated
+    on first request under ``<root>/thumbs`` and cached.
+    """
+
+    def __init__(self, root, thumbnail_size=256):
+        # Absolute, so Flask's send_file does not resolve it against the app root
+        self.root = os.path.abspath(root)
+        self.thumbnail_size = thumbnail_size
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def hash_bytes(image_bytes):
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    @staticmethod
+    def is_valid_hash(image_hash):
+        return len(image_hash) == 64 and all(c in '0123456789abcdef' for c in image_hash)
+
+    def put(self, image_bytes, image_hash=None):
+        """Write the image if it is not stored yet and return its hash"""
+        image_hash = image_hash or self.hash_bytes(image_bytes)
+        if self.path(image_hash) is not None:
+            return image_hash
+
+        directory = os.path.join(self.root, image_hash[:2])
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, image_hash + _sniff_extension(image_bytes))
+
+        _write_atomic(path, lambda f: f.write(image_bytes))
+        return image_hash
+
+    def path(self, image_hash):
+        """Return the stored file path for a hash, or None if it is missing"""
+        if not self.is_valid_hash(image_hash):
+            return None
+        directory = os.path.join(self.root, image_hash[:2])
+        for _, extension in _EXTENSIONS + ((None, '.bin'),):
+            path = os.path.join(directory, image_hash + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def thumbnail_path(self, image_hash):
+        """Return a cached JPEG thumbnail path, creating it on first use"""
+        source = self.path(image_hash)
+        if source is None or not self.thumbnail_size:
+            return None
+
+        directory = os.path.join(self.root, 'thumbs', image_hash[:2])
+        path = os.path.join(directory, f"{image_hash}_{self.thumbnail_size}.jpg")
+        if not os.path.exists(path):
+            os.makedirs(directory, exist_ok=True)
+            with Image.open(source) as image:
+                image.draft('RGB', (self.thumbnail_size, self.thumbnail_size))
+                image = image.convert('RGB')
+                image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+                _write_atomic(path, lambda f: image.save(f, 'JPEG', quality=85))
+        return path
+
+    def iter_hashes(self):
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if prefix == 'thumbs' or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                image_hash, extension = os.path.splitext(name)
+                if extension != '.tmp' and self.is_valid_hash(image_hash):
+                    yield image_hash
+
+    def delete(self, image_hash):
+        """Remove an image and its thumbnails, returning the bytes freed"""
+        freed = 0
+        paths = [self.path(image_hash)]
+        thumbs_dir = os.path.join(self.root, 'thumbs', image_hash[:2])
+        if os.path.isdir(thumbs_dir):
+            paths += [os.path.join(thumbs_dir, name) for name in os.listdir(thumbs_dir) if name.startswith(image_hash)]
+        for path in paths:
+            if path and os.path.exists(path):
+                freed += os.path.getsize(path)
+                os.remove(path)
+        return freed
+
+
+def compact(database, store, retention_days=None, migrate_blobs=True, vacuum=True, chunk_size=200):
+    """Apply retention, migrate legacy BLOBs into the store and remove orphan images"""
+    report = {'migrated_blobs': 0, 'expired_references': 0, 'deleted_images': 0, 'freed_bytes': 0}
+
+    if migrate_blobs:
+        # Page through the BLOBs by id and commit per chunk, so memory stays bounded
+        # and an interrupted run keeps the chunks it finished
+        last_id = 0
+        while True:
+            rows = database.fetch_all('''
+                SELECT id, image_data FROM detections
+                WHERE image_data IS NOT NULL AND id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (last_id, chunk_size))
+            if not rows:
+                break
+            with database.write() as conn:
+                for row_id, image_data in rows:
+                    image_hash = store.put(bytes(image_data))
+                    conn.execute('UPDATE detections SET image_hash = ?, image_data = NULL WHERE id = ?',
+                                 (image_hash, row_id))
+            report['migrated_blobs'] += len(rows)
+            last_id = rows[-1][0]
+
+    if retention_days is not None:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime('%Y-%m-%d %H:%M:%S')
+        with database.write() as conn:
+            cursor = conn.execute('UPDATE detections SET image_hash = NULL WHERE timestamp < ? AND image_hash IS NOT NULL',
+                                  (cutoff,))
+        report['expired_references'] = cursor.rowcount
+
+    referenced = {row[0] for row in database.fetch_all('SELECT DISTINCT image_hash FROM detections WHERE image_hash IS NOT NULL')}
+    # Leave very recent files alone, their rows may still be in the write-behind queue
+    grace_cutoff = time.time() - 300
+    for image_hash in list(store.iter_hashes()):
+        path = store.path(image_hash)
+        if image_hash not in referenced and path and os.path.getmtime(path) < grace_cutoff:
+            report['freed_bytes'] += store.delete(image_hash)
+            report['deleted_images'] += 1
+
+    if vacuum and (report['migrated_blobs'] or report['expired_references']):
+        with database.write() as conn:
+            conn.execute('VACUUM')
+
+    return report
+
+
+if __name__ == '__main__':
+    import config
+    from database import open_database
+
+    parser = argparse.ArgumentParser(description='Compact the detection image store')
+    parser.add_argument('--db', default=config.DATABASE_URL, help='Database URL or SQLite path')
+    parser.add_argument('--store', default=config.IMAGE_STORE_DIR, help='Image store directory')
+    parser.add_argument('--retention-days', type=float, default=None,
+                        help='Drop image references older than this many days')
+    parser.add_argument('--no-migrate', action='store_true', help='Skip moving legacy BLOBs into the store')
+    parser.add_argument('--no-vacuum', action='store_true', help='Skip VACUUM after compaction')
+    args = parser.parse_args()
+
+    database = open_database(args.db)
+    report = compact(
+        database,
+        ImageStore(args.store, config.IMAGE_THUMBNAIL_SIZE),
+        retention_days=args.retention_days,
+        migrate_blobs=not args.no_migrate,
+        vacuum=not args.no_vacuum
+    )
+    database.close()
+    print(f"✅ Image store compacted: {report}")
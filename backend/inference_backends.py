@@ -0,0 +1,419 @@
+"""Pluggable inference backends for the detection model.
+
+``pytorch`` runs the ``.pt`` weights through ``ultralytics.YOLO``. ``onnxruntime``
+and ``openvino`` run an exported artifact directly with NumPy pre/post-processing,
+so serving with them never imports torch or ultralytics.
+
+Every backend exposes ``names`` (class id -> name), ``identity`` (used for cache
+keys) and ``predict(images, conf, classes=None)``, which returns one columnar dict
+per image (see ``postprocess.extract_columns``) in original-image pixel
+coordinates. ``classes`` restricts scoring and NMS to those class ids.
+
+All backends share ``Letterbox``: images are resized straight into a reusable
+NCHW float32 buffer that is handed to the runtime as is (a zero-copy torch
+tensor for ``pytorch``, padded to a stride-aligned rectangle rather than a
+square), and boxes are mapped back from the letterboxed input.
+"""
+import argparse
+import ast
+import logging
+import os
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('pytorch', 'onnxruntime', 'openvino')
+
+
+def _file_identity(path):
+    mtime = os.path.getmtime(path) if os.path.exists(path) else 0
+    return f"{path}@{mtime:.0f}"
+
+
+class Letterbox:
+    """Letterbox images into a preallocated batch buffer and map boxes back.
+
+    The buffer is reused between calls, so a batch returned by ``prepare`` is
+    only valid until the next call; backends serialize ``predict`` with a lock.
+    It grows up to ``max_batch`` square inputs; larger batches get a temporary
+    array so one oversized call does not pin its memory for the life of the
+    process.
+
+    With ``rect``, a batch whose images all share one shape is padded only to
+    the next multiple of ``stride`` instead of to a square, like ultralytics'
+    own ``auto`` letterboxing (384x640 for 16:9 frames). Backends with a fixed
+    input shape, such as exported graphs, leave it off.
+    """
+
+    def __init__(self, imgsz=640, max_batch=16, rect=False, stride=32):
+        self.imgsz = imgsz
+        self.max_batch = max_batch
+        self.rect = rect
+        self.stride = stride
+        self._canvas = np.empty((imgsz, imgsz, 3), dtype=np.uint8)
+        self._buffer = np.empty(0, dtype=np.float32)
+
+    def input_shape(self, images):
+        """Return the (height, width) the batch is padded to"""
+        if not self.rect or any(image.shape[:2] != images[0].shape[:2] for image in images):
+            return self.imgsz, self.imgsz
+        h, w = images[0].shape[:2]
+        ratio = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = round(w * ratio), round(h * ratio)
+        return new_h + (self.imgsz - new_h) % self.stride, new_w + (self.imgsz - new_w) % self.stride
+
+    def letterbox(self, image, out):
+        """Resize ``image`` into ``out`` keeping aspect ratio; return (ratio, pad_x, pad_y)"""
+        h, w = image.shape[:2]
+        out_h, out_w = out.shape[:2]
+        ratio = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = round(w * ratio), round(h * ratio)
+        pad_x = round((out_w - new_w) / 2 - 0.1)
+        pad_y = round((out_h - new_h) / 2 - 0.1)
+
+        out[:] = 114
+        resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR) if (new_w, new_h) != (w, h) else image
+        out[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+        return ratio, pad_x, pad_y
+
+    def prepare(self, images):
+        """Letterbox images into the reusable NCHW float32 batch; return (batch, transforms)"""
+        height, width = self.input_shape(images)
+        size = len(images) * 3 * height * width
+        if len(images) > self.max_batch:
+            buffer = np.empty(size, dtype=np.float32)
+        else:
+            if self._buffer.size < size:
+                # Sized for square inputs so rect batches of the same count fit as well
+                self._buffer = np.empty(len(images) * 3 * self.imgsz * self.imgsz, dtype=np.float32)
+            buffer = self._buffer
+        # A prefix of the flat buffer keeps the batch contiguous whatever its shape
+        batch = buffer[:size].reshape(len(images), 3, height, width)
+        canvas = self._canvas[:height, :width]
+        transforms = []
+        for i, image in enumerate(images):
+            transforms.append(self.letterbox(image, canvas))
+            # The model has always received RGB arrays through ultralytics, which treats
+            # NumPy input as BGR and flips it; keep feeding the same channel order
+            np.multiply(canvas[..., ::-1].transpose(2, 0, 1), 1 / 255.0, out=batch[i], casting='unsafe')
+        return batch, transforms
+
+    @staticmethod
+    def restore(xyxy, transform, shape):
+        """Map letterboxed xyxy boxes back to original-image pixels, clipped to the image"""
+        ratio, pad_x, pad_y = transform
+        xyxy = (xyxy - np.array((pad_x, pad_y, pad_x, pad_y), dtype=np.float32)) / ratio
+        h, w = shape[:2]
+        np.clip(xyxy, 0, (w, h, w, h), out=xyxy)
+        return xyxy.astype(np.float32, copy=False)
+
+
+class UltralyticsBackend:
+    """Run weights (``.pt`` or any format ultralytics can load) through ``YOLO``"""
+
+    kind = 'pytorch'
+
+    def __init__(self, weights, imgsz=640, threads=0, iou=0.7):
+        import torch
+        from ultralytics import YOLO
+        from postprocess import extract_columns
+
+        if threads:
+            torch.set_num_threads(threads)
+
+        self._torch = torch
+        self._extract_columns = extract_columns
+        self._lock = threading.Lock()
+        self.model = YOLO(weights)
+        # A PyTorch model takes any stride-aligned input shape; other formats ultralytics loads may not
+        stride = getattr(self.model.model, 'stride', None)
+        self.letterbox = Letterbox(imgsz, rect=stride is not None, stride=int(max(stride)) if stride is not None else 32)
+        self.iou = iou
+        self.names = self.model.names
+        self.weights = self.model.ckpt_path or weights
+        self.identity = f"{self.kind}:{_file_identity(self.weights)}"
+
+    def predict(self, images, conf, classes=None):
+        with self._lock:
+            batch, transforms = self.letterbox.prepare(images)
+            # A BCHW tensor skips ultralytics' own resize; from_numpy shares the buffer
+            results = self.model(self._torch.from_numpy(batch), conf=conf, iou=self.iou, classes=classes, verbose=False)
+            columns_list = [self._extract_columns(result) for result in results]
+        for columns, image, transform in zip(columns_list, images, transforms):
+            columns['xyxy'] = Letterbox.restore(columns['xyxy'], transform, image.shape)
+        return columns_list
+
+
+class _ExportedBackend:
+    """Shared decoding and NMS for exported YOLOv8 graphs"""
+
+    def __init__(self, imgsz=640, iou=0.7, max_det=300):
+        self.imgsz = imgsz
+        self.iou = iou
+        self.max_det = max_det
+        self.letterbox = Letterbox(imgsz)
+        self._lock = threading.Lock()
+
+    def prepare(self, images):
+        return self.letterbox.prepare(images)
+
+    def decode(self, output, image, transform, conf, classes=None):
+        """Turn one (4 + nc, N) prediction into columns in original-image coordinates"""
+        predictions = output.T
+        scores = predictions[:, 4:]
+        if classes is not None:
+            # Score only the requested classes, so others never reach NMS
+            scores = scores[:, classes]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        if classes is not None:
+            class_ids = np.asarray(classes, dtype=np.int64)[class_ids]
+
+        keep = confidences >= conf
+        boxes, confidences, class_ids = predictions[keep, :4], confidences[keep], class_ids[keep]
+
+        if len(boxes):
+            # xywh centre -> top-left xywh for OpenCV's batched (per-class) NMS
+            tl_boxes = np.column_stack((boxes[:, 0] - boxes[:, 2] / 2, boxes[:, 1] - boxes[:, 3] / 2, boxes[:, 2], boxes[:, 3]))
+            indices = cv2.dnn.NMSBoxesBatched(tl_boxes.tolist(), confidences.tolist(), class_ids.tolist(), conf, self.iou)
+            indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:self.max_det]
+            tl_boxes, confidences, class_ids = tl_boxes[indices], confidences[indices], class_ids[indices]
+            xyxy = np.column_stack((tl_boxes[:, :2], tl_boxes[:, :2] + tl_boxes[:, 2:]))
+        else:
+            xyxy = np.zeros((0, 4), dtype=np.float32)
+
+        return {
+            'xyxy': Letterbox.restore(xyxy.astype(np.float32), transform, image.shape),
+            'confidence': confidences.astype(np.float32),
+            'class_id': class_ids.astype(np.int64)
+        }
+
+    def predict(self, images, conf, classes=None):
+        with self._lock:
+            batch, transforms = self.prepare(images)
+            outputs = self.run(batch)
+            # Runtimes may reuse their output tensors, so decode before releasing the lock
+            return [self.decode(output, image, transform, conf, classes)
+                    for output, image, transform in zip(outputs, images, transforms)]
+
+    def run(self, batch):
+        raise NotImplementedError
+
+
+class OnnxRuntimeBackend(_ExportedBackend):
+    """Run an exported ``.onnx`` model with ONNX Runtime on the CPU"""
+
+    kind = 'onnxruntime'
+
+    def __init__(self, onnx_path, imgsz=640, threads=0, iou=0.7):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(onnx_path), options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        self.static_batch = batch_dim if isinstance(batch_dim, int) else None
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata['names']) if 'names' in metadata else {}
+        if 'imgsz' in metadata:
+            imgsz = ast.literal_eval(metadata['imgsz'])[0]
+        super().__init__(imgsz=imgsz, iou=iou)
+        self.identity = f"{self.kind}:{_file_identity(str(onnx_path))}"
+
+    def run(self, batch):
+        if self.static_batch == 1 and len(batch) > 1:
+            return np.concatenate([self.session.run(None, {self.input_name: batch[i:i + 1]})[0] for i in range(len(batch))])
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoBackend(_ExportedBackend):
+    """Run an ultralytics OpenVINO export directory on the CPU"""
+
+    kind = 'openvino'
+
+    def __init__(self, model_dir, imgsz=640, threads=0, iou=0.7):
+        import yaml
+        from openvino.runtime import Core
+
+        model_dir = Path(model_dir)
+        xml_path = next(model_dir.glob('*.xml'))
+        core = Core()
+        properties = {'PERFORMANCE_HINT': 'THROUGHPUT'}
+        if threads:
+            properties['INFERENCE_NUM_THREADS'] = threads
+        self.compiled = core.compile_model(core.read_model(xml_path), 'CPU', properties)
+        batch_dim = self.compiled.input(0).get_partial_shape()[0]
+        self.static_batch = batch_dim.get_length() if batch_dim.is_static else None
+
+        metadata_path = model_dir / 'metadata.yaml'
+        metadata = yaml.safe_load(metadata_path.read_text()) if metadata_path.exists() else {}
+        self.names = metadata.get('names', {})
+        imgsz = metadata.get('imgsz', [imgsz])[0]
+        super().__init__(imgsz=imgsz, iou=iou)
+        self.identity = f"{self.kind}:{_file_identity(str(xml_path))}"
+
+    def run(self, batch):
+        if self.static_batch == 1 and len(batch) > 1:
+            return np.concatenate([self.compiled(batch[i:i + 1])[0] for i in range(len(batch))])
+        return self.compiled(batch)[0]
+
+
+def exported_path(weights, kind):
+    """Return the path ultralytics writes the ``kind`` export of ``weights`` to"""
+    weights = Path(weights)
+    if kind == 'onnxruntime':
+        return weights.with_suffix('.onnx')
+    if kind == 'openvino':
+        return weights.parent / f"{weights.stem}_openvino_model"
+    return weights
+
+
+def load_backend(kind, weights, imgsz=640, threads=0, artifact=None):
+    """Create the configured backend; exported backends load ``artifact`` or the default export path"""
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {kind}")
+    if kind == 'pytorch':
+        return UltralyticsBackend(weights, imgsz=imgsz, threads=threads)
+
+    artifact = artifact or exported_path(weights, kind)
+    if not os.path.exists(artifact):
+        raise FileNotFoundError(f"{kind} artifact not found at {artifact}, run 'python inference_backends.py export' first")
+    if kind == 'onnxruntime':
+        return OnnxRuntimeBackend(artifact, imgsz=imgsz, threads=threads)
+    return OpenVinoBackend(artifact, imgsz=imgsz, threads=threads)
+
+
+def load_backend_with_fallback(kind, weights, imgsz=640, threads=0, artifact=None, fallback=None):
+    """Load the configured backend, falling back to the PyTorch weights and then to ``fallback``"""
+    try:
+        logger.info('Loading model', extra={'fields': {
+            'path': weights, 'exists': os.path.exists(weights), 'backend': kind
+        }})
+        backend = load_backend(kind, weights, imgsz=imgsz, threads=threads, artifact=artifact)
+        logger.info('Model loaded', extra={'fields': {
+            'path': weights, 'backend': kind, 'classes': len(backend.names)
+        }})
+        logger.debug('Model classes', extra={'fields': {'names': backend.names}})
+        return backend
+    except Exception as e:
+        if kind != 'pytorch' and os.path.exists(weights):
+            logger.error('Error loading exported model, falling back to PyTorch weights',
+                         extra={'fields': {'backend': kind, 'error': str(e)}})
+            return load_backend('pytorch', weights, imgsz=imgsz, threads=threads)
+        if not fallback:
+            raise
+        logger.error('Error loading model, using fallback weights',
+                     extra={'fields': {'path': weights, 'fallback': fallback, 'error': str(e)}})
+        return load_backend('pytorch', fallback, imgsz=imgsz, threads=threads)
+
+
+def warm_up(backend, runs=2, batch_size=1):
+    """Run dummy batches so lazy runtime setup (allocations, kernel selection) happens before real requests"""
+    imgsz = backend.letterbox.imgsz
+    images = [np.zeros((imgsz, imgsz, 3), dtype=np.uint8)] * max(1, batch_size)
+    for _ in range(runs):
+        backend.predict(images, 0.25)
+
+
+def export_model(weights, kind, imgsz=640):
+    """Export ``.pt`` weights for a CPU runtime and return the artifact path"""
+    from ultralytics import YOLO
+
+    fmt = {'onnxruntime': 'onnx', 'openvino': 'openvino'}[kind]
+    options = {'dynamic': True, 'simplify': True} if fmt == 'onnx' else {}
+    return YOLO(weights).export(format=fmt, imgsz=imgsz, **options)
+
+
+def _box_iou(a, b):
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def parity_check(reference, candidate, images, conf=0.25, iou_threshold=0.9):
+    """Compare a candidate backend's boxes against a reference backend.
+
+    Boxes are matched greedily by IoU within the same class. Returns the
+    fraction of reference boxes matched, unmatched candidate boxes, the mean
+    IoU of matches and the largest confidence difference.
+    """
+    matched = reference_total = extra = 0
+    ious = []
+    max_conf_diff = 0.0
+
+    for image in images:
+        ref = reference.predict([image], conf)[0]
+        cand = candidate.predict([image], conf)[0]
+        reference_total += len(ref['confidence'])
+        used = set()
+
+        if len(ref['confidence']) and len(cand['confidence']):
+            overlaps = _box_iou(ref['xyxy'], cand['xyxy'])
+            overlaps[ref['class_id'][:, None] != cand['class_id'][None, :]] = 0
+            for i in np.argsort(-ref['confidence']):
+                j = int(overlaps[i].argmax())
+                if overlaps[i, j] >= iou_threshold and j not in used:
+                    used.add(j)
+                    matched += 1
+                    ious.append(float(overlaps[i, j]))
+                    max_conf_diff = max(max_conf_diff, abs(float(ref['confidence'][i]) - float(cand['confidence'][j])))
+        extra += len(cand['confidence']) - len(used)
+
+    return {
+        'images': len(images),
+        'reference_boxes': reference_total,
+        'match_rate': matched / reference_total if reference_total else 1.0,
+        'unmatched_candidate_boxes': extra,
+        'mean_iou': float(np.mean(ious)) if ious else 1.0,
+        'max_confidence_diff': max_conf_diff
+    }
+
+
+def _load_images(directory, limit):
+    paths = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))[:limit]
+    return [cv2.cvtColor(cv2.imread(str(p)), cv2.COLOR_BGR2RGB) for p in paths]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the detector and check backend parity')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Export .pt weights for a CPU runtime')
+    export_parser.add_argument('--weights', required=True, help='Path to best.pt')
+    export_parser.add_argument('--backend', choices=BACKENDS[1:], default='onnxruntime')
+    export_parser.add_argument('--imgsz', type=int, default=640)
+
+    parity_parser = subparsers.add_parser('parity', help='Compare a backend against the PyTorch weights')
+    parity_parser.add_argument('--weights', required=True, help='Path to best.pt')
+    parity_parser.add_argument('--backend', choices=BACKENDS[1:], default='onnxruntime')
+    parity_parser.add_argument('--artifact', default=None, help='Exported model, defaults to the export path')
+    parity_parser.add_argument('--images', required=True, help='Directory of sample images')
+    parity_parser.add_argument('--limit', type=int, default=50)
+    parity_parser.add_argument('--conf', type=float, default=0.25)
+    parity_parser.add_argument('--min-match-rate', type=float, default=0.95)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'export':
+        print(f"✅ Exported to {export_model(args.weights, args.backend, args.imgsz)}")
+    else:
+        report = parity_check(
+            UltralyticsBackend(args.weights),
+            load_backend(args.backend, args.weights, artifact=args.artifact),
+            _load_images(args.images, args.limit),
+            conf=args.conf
+        )
+        print(f"📊 Parity report: {report}")
+        if report['match_rate'] < args.min_match_rate:
+            raise SystemExit(f"❌ Match rate {report['match_rate']:.3f} is below {args.min_match_rate}")
@@ -0,0 +1,130 @@
+"""LRU/TTL cache of detection results for repeated camera frames"""
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+
+class InferenceCache:
+    """Cache unfiltered columnar detections keyed by image and model identity.
+
+    Detections are stored as produced at ``min_confidence`` so any request with
+    a threshold at or above that floor can be answered by filtering the cached
+    columns. ``mode`` is ``'exact'`` (SHA-256 of the uploaded bytes),
+    ``'perceptual'`` (64-bit difference hash of the decoded frame, so
+    re-encoded or slightly noisy frames still hit) or ``'off'``.
+    """
+
+    MODES = ('off', 'exact', 'perceptual')
+
+    def __init__(self, mode='exact', max_entries=1024, max_bytes=64 * 1024 * 1024,
+                 ttl_seconds=300, min_confidence=0.05):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown inference cache mode: {mode}")
+
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.min_confidence = min_confidence
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    @staticmethod
+    def perceptual_hash(image):
+        """Return the 64-bit difference hash of an RGB image array"""
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        bits = (small[:, 1:] > small[:, :-1]).flatten()
+        return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+    def key(self, model_identity, image_hash=None, image=None, scale=(1.0, 1.0)):
+        """Build a cache key, or None if the inputs for the current mode are missing.
+
+        ``scale`` maps ``image`` back to the original pixels, as for a reduced-size decode.
+        """
+        if self.mode == 'exact' and image_hash is not None:
+            return f"{model_identity}:{image_hash}"
+        if self.mode == 'perceptual' and image is not None:
+            # Cached boxes are in original pixels, so a look-alike at another resolution must miss
+            height, width = round(image.shape[0] * scale[1]), round(image.shape[1] * scale[0])
+            return f"{model_identity}:p{self.perceptual_hash(image):016x}:{width}x{height}"
+        return None
+
+    def get(self, key, confidence_threshold):
+        """Return cached columns usable at ``confidence_threshold``, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            result, floor, size, stored_at = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if confidence_threshold < floor:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result, floor):
+        """Store unfiltered columns produced at confidence ``floor``"""
+        size = self._estimate_size(result)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (result, floor, size, time.monotonic())
+            self._bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'mode': self.mode,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def _remove(self, key):
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    @staticmethod
+    def _estimate_size(columns):
+        return 256 + sum(column.nbytes for column in columns.values())
@@ -0,0 +1,72 @@
+"""Structured, leveled and non-blocking logging for the detection backend"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+from datetime import datetime, timezone
+
+from flask import g, has_request_context
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request id, or '-' outside of a request"""
+
+    def filter(self, record):
+        record.request_id = g.get('request_id', '-') if has_request_context() else '-'
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """Render records as JSON objects or ``key=value`` text lines.
+
+    Structured fields are passed with ``extra={'fields': {...}}``.
+    """
+
+    def __init__(self, fmt='text'):
+        super().__init__()
+        self.fmt = fmt
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'msg': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+
+        if self.fmt == 'json':
+            return json.dumps(entry, default=str)
+
+        head = f"{entry.pop('ts')} {entry.pop('level'):<7} {entry.pop('logger')} [{entry.pop('request_id')}] {entry.pop('msg')}"
+        tail = ' '.join(f"{key}={value}" for key, value in entry.items())
+        return f"{head} {tail}" if tail else head
+
+
+def setup_logging(level='INFO', fmt='text'):
+    """Route all logging through a queue so request threads never block on stdout"""
+    log_queue = queue.SimpleQueue()
+
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(StructuredFormatter(fmt))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
+    return listener
+
+
+def should_sample(rate):
+    """Return True for roughly ``rate`` of the calls"""
+    return rate >= 1 or (rate > 0 and random.random() < rate)
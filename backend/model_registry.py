@@ -0,0 +1,143 @@
+"""Versioned model artifacts and the deployment that serves them.
+
+Every registered version gets its own directory under the registry root with
+a copy of the weights, so a version always names the same bytes. The
+``registry.json`` manifest lists the versions and the deployment: the
+``active`` version, plus an optional ``candidate`` that serves a ``split``
+fraction of requests, or re-runs them in ``shadow`` without affecting
+responses. The manifest is replaced atomically, so readers never see a
+partial write.
+
+Usage:
+    python model_registry.py register --weights runs/train/space_station_model/weights/best.pt
+    python model_registry.py list
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+MANIFEST = 'registry.json'
+DEPLOYMENT_KEYS = ('active', 'candidate', 'split', 'shadow')
+
+
+def _sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    def __init__(self, root):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def _read(self):
+        path = self.root / MANIFEST
+        if not path.exists():
+            return {'versions': {}, 'active': None, 'candidate': None, 'split': 0.0, 'shadow': False}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _write(self, manifest):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.root / f'{MANIFEST}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.root / MANIFEST)
+
+    def versions(self):
+        """Registered versions, oldest first"""
+        return list(self._read()['versions'].values())
+
+    def get(self, version):
+        entry = self._read()['versions'].get(version)
+        if entry is None:
+            raise KeyError(f"Unknown model version: {version}")
+        return entry
+
+    def path(self, version):
+        """Path of a version's weights"""
+        return str(self.root / self.get(version)['path'])
+
+    def register(self, weights, version=None, metrics=None):
+        """Copy ``weights`` into the registry as a new version and return its entry"""
+        weights = Path(weights)
+        if not weights.exists():
+            raise FileNotFoundError(f"Weights not found at {weights}")
+
+        with self._lock:
+            manifest = self._read()
+            version = version or f"v{len(manifest['versions']) + 1}"
+            if version in manifest['versions']:
+                raise ValueError(f"Model version already registered: {version}")
+
+            target = self.root / version / weights.name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(weights, target)
+            entry = {
+                'version': version,
+                'path': str(target.relative_to(self.root)),
+                'sha256': _sha256(target),
+                'source': str(weights),
+                'metrics': metrics or {},
+                'registered_at': datetime.now(timezone.utc).isoformat()
+            }
+            manifest['versions'][version] = entry
+            self._write(manifest)
+        return entry
+
+    def deployment(self):
+        manifest = self._read()
+        return {key: manifest[key] for key in DEPLOYMENT_KEYS}
+
+    def set_deployment(self, active, candidate=None, split=0.0, shadow=False):
+        """Record the deployment the API serves after a restart"""
+        with self._lock:
+            manifest = self._read()
+            for version in (active, candidate):
+                if version is not None and version not in manifest['versions']:
+                    raise KeyError(f"Unknown model version: {version}")
+            manifest.update(active=active, candidate=candidate, split=split, shadow=shadow)
+            self._write(manifest)
+
+
+if __name__ == '__main__':
+    import config
+
+    parser = argparse.ArgumentParser(description='Manage versioned model artifacts')
+    parser.add_argument('--root', default=config.MODEL_REGISTRY_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    register_parser = subparsers.add_parser('register', help='Copy weights into the registry as a new version')
+    register_parser.add_argument('--weights', required=True)
+    register_parser.add_argument('--version')
+    register_parser.add_argument('--activate', action='store_true',
+                                 help='Make it the active version for the next API start')
+
+    subparsers.add_parser('list', help='List registered versions and the deployment')
+
+    args = parser.parse_args()
+    registry = ModelRegistry(args.root)
+
+    if args.command == 'register':
+        entry = registry.register(args.weights, args.version)
+        print(f"✅ Registered {entry['version']} ({entry['sha256'][:12]}) at {registry.path(entry['version'])}")
+        if args.activate:
+            registry.set_deployment(entry['version'])
+            print(f"📌 {entry['version']} is active for the next start")
+        print(f"🔄 Hot-swap a running API with: curl -X POST http://127.0.0.1:5000/api/admin/models/deploy "
+              f"-H 'Content-Type: application/json' -H \"X-Admin-Token: $ADMIN_TOKEN\" -d '{{\"active\": \"{entry['version']}\"}}'")
+    else:
+        deployment = registry.deployment()
+        for entry in registry.versions():
+            marker = '*' if entry['version'] == deployment['active'] else \
+                '+' if entry['version'] == deployment['candidate'] else ' '
+            print(f"{marker} {entry['version']:<10} {entry['sha256'][:12]}  {entry['registered_at']}  {entry['source']}")
+        print(json.dumps(deployment))
@@ -0,0 +1,128 @@
+"""Routing of detection requests between the active model and a candidate.
+
+With a candidate deployed, a ``split`` fraction of requests is served by it
+(A/B). In ``shadow`` mode the active model serves every request and the
+candidate re-runs a ``split`` fraction of them in the background, so its
+results are only compared, never returned. A deployment is swapped as one
+tuple, so a request never sees half of an update.
+"""
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from telemetry import Histogram, LATENCY_BUCKETS
+
+
+class ServingModel:
+    """A loaded, warmed-up backend tagged with its registry version"""
+
+    def __init__(self, backend, version):
+        self.backend = backend
+        self.version = version
+        names = backend.names
+        self.class_names = [names[i] for i in sorted(names)]
+        # Cached results are only valid for the weights that produced them
+        self.identity = f"{version}|{backend.identity}"
+
+    def predict(self, images, conf, classes=None):
+        return self.backend.predict(images, conf, classes)
+
+    def close(self):
+        if hasattr(self.backend, 'close'):
+            self.backend.close()
+
+
+class ModelRouter:
+    def __init__(self, shadow_queue_size=8, retire_delay=30.0):
+        self.deployment = (None, None, 0.0, False)
+        self.retire_delay = retire_delay
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow')
+        self._shadow_slots = threading.BoundedSemaphore(shadow_queue_size)
+        self._shadow_dropped = 0
+
+    @property
+    def active(self):
+        return self.deployment[0]
+
+    @property
+    def candidate(self):
+        return self.deployment[1]
+
+    def models(self):
+        return [model for model in self.deployment[:2] if model is not None]
+
+    def deploy(self, active, candidate=None, split=0.0, shadow=False):
+        """Swap in a new deployment; models no longer deployed are closed after ``retire_delay``"""
+        if not 0 <= split <= 1:
+            raise ValueError('split must be between 0 and 1')
+        with self._lock:
+            previous = self.models()
+            self.deployment = (active, candidate, split if candidate else 0.0, bool(shadow and candidate))
+            retired = [model for model in previous if model not in self.models()]
+        # In-flight batches may still hold a retired model, so close it later
+        for model in retired:
+            timer = threading.Timer(self.retire_delay, model.close)
+            timer.daemon = True
+            timer.start()
+        return retired
+
+    def route(self):
+        """Return ``(serving_model, shadow_model)`` for one request; shadow_model is usually None"""
+        active, candidate, split, shadow = self.deployment
+        if candidate is None or random.random() >= split:
+            return active, None
+        if shadow:
+            return active, candidate
+        return candidate, None
+
+    def run_shadow(self, fn):
+        """Run ``fn`` on the shadow thread, dropping it when the shadow queue is full"""
+        if not self._shadow_slots.acquire(blocking=False):
+            with self._lock:
+                self._shadow_dropped += 1
+            return None
+
+        def task():
+            try:
+                return fn()
+            finally:
+                self._shadow_slots.release()
+        return self._shadow_executor.submit(task)
+
+    def record(self, version, seconds, objects, shadow=False, agrees=None):
+        """Count one inference of ``version`` for the per-model comparison.
+
+        ``agrees`` tells whether a shadow result found the same class counts as the served one.
+        """
+        key = (version, 'shadow' if shadow else 'serving')
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {'latency': Histogram(LATENCY_BUCKETS), 'objects': 0, 'agreed': 0}
+            stats['latency'].observe(seconds)
+            stats['objects'] += objects
+            stats['agreed'] += bool(agrees)
+
+    def stats(self):
+        with self._lock:
+            models = []
+            for (version, role), stats in sorted(self._stats.items()):
+                latency = stats['latency']
+                models.append({
+                    'version': version,
+                    'role': role,
+                    'requests': latency.count,
+                    'objects': stats['objects'],
+                    'objects_per_request': stats['objects'] / latency.count if latency.count else 0,
+                    'latency_mean_ms': round(latency.sum / latency.count * 1000, 2) if latency.count else 0,
+                    'latency_ms': {q: round(v * 1000, 2) for q, v in latency.quantiles().items()},
+                    'agreement': stats['agreed'] / latency.count if role == 'shadow' and latency.count else None
+                })
+            return {'models': models, 'shadow_dropped': self._shadow_dropped}
+
+    def close(self):
+        self._shadow_executor.shutdown(wait=False)
+        for model in self.models():
+            model.close()
@@ -0,0 +1,159 @@
+"""Write-behind persistence of detection rows, and the training_results insert shared by the ML scripts"""
+import json
+import logging
+import queue
+import threading
+import time
+
+_STOP = object()
+
+TRAINING_RESULT_SQL = '''
+    INSERT INTO training_results
+    (model_path, epochs, mAP_50, mAP_50_95, precision, recall, training_time, config)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionWriter:
+    """Background writer that batches detection inserts into single transactions.
+
+    Rows are queued by request threads and written by one writer thread
+    through ``database.write()``, so the request never waits on the database
+    or fsync. The queue is bounded; when it
+    is full ``policy`` decides what happens to a new row:
+
+    - ``'block'``: wait up to ``block_timeout`` seconds for space, then drop it
+    - ``'drop'``: drop it immediately
+
+    Dropped rows are counted and reported in ``stats()``.
+    """
+
+    INSERT_SQL = '''
+        INSERT INTO detections
+        (image_path, toolbox_count, oxygen_tank_count, fire_extinguisher_count,
+         confidence_scores, processing_time, image_hash, model_version)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
+    def __init__(self, database, max_queue_size=1000, max_batch_size=100,
+                 flush_interval_ms=200, policy='block', block_timeout=1.0):
+        if policy not in ('block', 'drop'):
+            raise ValueError(f"Unknown persistence backpressure policy: {policy}")
+
+        self.database = database
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000.0
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._flushes = 0
+        self._last_flush_time = 0.0
+        self._total_flush_time = 0.0
+        self._max_flush_time = 0.0
+
+        self._thread = threading.Thread(target=self._run, name='detection-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """Queue a row for insertion, returning False if it was dropped"""
+        try:
+            if self.policy == 'block':
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+
+    def close(self, timeout=None):
+        """Flush queued rows and stop the writer thread"""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        """Return queue depth and flush latency counters"""
+        with self._lock:
+            return {
+                'policy': self.policy,
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'rows_written': self._written,
+                'rows_dropped': self._dropped,
+                'rows_failed': self._failed,
+                'flushes': self._flushes,
+                'last_flush_time': self._last_flush_time,
+                'avg_flush_time': self._total_flush_time / self._flushes if self._flushes else 0,
+                'max_flush_time': self._max_flush_time
+            }
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        rows = [first]
+        deadline = time.perf_counter() + self.flush_interval
+        while len(rows) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                row = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is _STOP:
+                return rows, True
+            rows.append(row)
+        return rows, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            rows, stopping = self._collect()
+            if rows:
+                self._flush(rows)
+
+    def _flush(self, rows):
+        start = time.perf_counter()
+        try:
+            with self.database.write() as conn:
+                conn.executemany(self.INSERT_SQL, rows)
+        except Exception as e:
+            # Anything else, such as a row that cannot be bound, must not kill the writer
+            # thread: drop this batch and keep serving the queue
+            logger.error('Failed to persist detections', extra={'fields': {
+                'rows': len(rows), 'error': repr(e), 'database_error': isinstance(e, self.database.Error)
+            }})
+            with self._lock:
+                self._failed += len(rows)
+            return
+        flush_time = time.perf_counter() - start
+
+        with self._lock:
+            self._written += len(rows)
+            self._flushes += 1
+            self._last_flush_time = flush_time
+            self._total_flush_time += flush_time
+            self._max_flush_time = max(self._max_flush_time, flush_time)
+
+
+def record_training_result(database, model_path, epochs, metrics, training_time, config):
+    """Insert one training_results row; missing metrics are stored as NULL.
+
+    ``config['type']`` tells what produced the row. /api/metrics only reports
+    rows of deployed models, not evaluation runs such as sweep trials.
+    """
+    with database.write() as conn:
+        conn.execute(TRAINING_RESULT_SQL, (
+            model_path, epochs,
+            metrics.get('mAP_50'), metrics.get('mAP_50_95'), metrics.get('precision'), metrics.get('recall'),
+            training_time,
+            json.dumps(config)
+        ))
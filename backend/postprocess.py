@@ -0,0 +1,57 @@
+"""Vectorized post-processing of YOLO results"""
+import numpy as np
+
+_EMPTY_XYXY = np.zeros((0, 4), dtype=np.float32)
+_EMPTY_CONF = np.zeros(0, dtype=np.float32)
+_EMPTY_CLS = np.zeros(0, dtype=np.int64)
+
+
+def extract_columns(result):
+    """Move the boxes of a single YOLO result to NumPy, one transfer per column"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return {'xyxy': _EMPTY_XYXY, 'confidence': _EMPTY_CONF, 'class_id': _EMPTY_CLS}
+
+    return {
+        'xyxy': boxes.xyxy.cpu().numpy(),
+        'confidence': boxes.conf.cpu().numpy(),
+        'class_id': boxes.cls.cpu().numpy().astype(np.int64)
+    }
+
+
+def scale_columns(columns, scale):
+    """Map boxes from an image decoded at reduced size back to original-image pixels"""
+    sx, sy = scale
+    return {**columns, 'xyxy': columns['xyxy'] * np.array((sx, sy, sx, sy), dtype=np.float32)}
+
+
+def summarize(columns, confidence_threshold, class_names, classes=None):
+    """Threshold columnar detections and build the API result.
+
+    ``class_names`` is the list of model class names indexed by class id;
+    ``classes``, when given, keeps only those class ids.
+    """
+    mask = columns['confidence'] >= confidence_threshold
+    if classes is not None:
+        mask &= np.isin(columns['class_id'], classes)
+    class_ids = columns['class_id'][mask]
+    counts = np.bincount(class_ids, minlength=len(class_names))
+
+    names = list(class_names) + [f'object_{i}' for i in range(len(class_names), len(counts))]
+    class_counts = dict(zip(names, counts.tolist()))
+
+    # Convert each column to Python objects once, then zip them together
+    detections = [
+        {'bbox': bbox, 'confidence': confidence, 'class': names[class_id], 'class_id': class_id}
+        for bbox, confidence, class_id in zip(
+            columns['xyxy'][mask].tolist(),
+            columns['confidence'][mask].tolist(),
+            class_ids.tolist()
+        )
+    ]
+
+    return {
+        'detections': detections,
+        'class_counts': class_counts,
+        'total_objects': len(detections)
+    }
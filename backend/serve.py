@@ -0,0 +1,37 @@
+"""Production entry point: N inference worker processes behind a threaded WSGI server.
+
+Usage: SERVING_WORKERS=4 python serve.py
+"""
+import os
+
+
+def main():
+    import config
+
+    # Default to one worker per two cores, each pinned to its share of threads
+    if not config.SERVING_WORKERS:
+        config.SERVING_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
+    # Imported here so spawned workers, which re-import this module, never load the app
+    from app import app, detector, run_detection
+
+    if config.STREAM_ENABLED:
+        from streaming import start_stream_server
+        start_stream_server(run_detection, config.SERVING_HOST, config.STREAM_PORT,
+                            config.STREAM_QUEUE_SIZE, config.STREAM_MAX_FRAME_BYTES)
+        print(f"📡 Streaming detections on ws://{config.SERVING_HOST}:{config.STREAM_PORT}/ws/stream/<camera_id>")
+
+    print(f"🚀 Starting Space Station Detection API with {detector.workers} inference workers "
+          f"on {config.SERVING_HOST}:{config.SERVING_PORT}")
+    try:
+        from waitress import serve
+    except ImportError:
+        print("⚠️  waitress is not installed, falling back to the threaded Werkzeug server")
+        app.run(host=config.SERVING_HOST, port=config.SERVING_PORT, threaded=True, debug=False)
+        return
+
+    serve(app, host=config.SERVING_HOST, port=config.SERVING_PORT, threads=config.SERVING_HTTP_THREADS)
+
+
+if __name__ == '__main__':
+    main()
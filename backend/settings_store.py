@@ -0,0 +1,196 @@
+"""Versioned, write-through cache of the user settings.
+
+The current settings live in a single ``user_settings`` row (``id = 1``) and
+in memory, so reading them never touches the database. Every update bumps
+``version``, writes the new row and moves the previous one into
+``user_settings_history``, which is pruned to ``history_limit`` versions.
+"""
+import json
+import threading
+from datetime import datetime, timezone
+
+DEFAULTS = {
+    'confidence_threshold': 0.5,
+    'detection_mode': 'all',
+    'ui_preferences': {}
+}
+
+
+class VersionConflict(Exception):
+    """Raised when an update was based on a settings version that is no longer current"""
+
+
+def parse_detection_mode(detection_mode, class_names):
+    """Return the class ids selected by ``detection_mode``, or None for all classes.
+
+    ``detection_mode`` is ``'all'`` or a comma-separated list of class names.
+    """
+    if not detection_mode or detection_mode == 'all':
+        return None
+    if not isinstance(detection_mode, str):
+        raise ValueError("detection_mode must be 'all' or a comma-separated list of class names")
+    selected = [name.strip() for name in detection_mode.split(',') if name.strip()]
+    if not selected:
+        return None
+    unknown = [name for name in selected if name not in class_names]
+    if unknown:
+        raise ValueError(f"Unknown class in detection_mode: {', '.join(unknown)}")
+    return sorted({class_names.index(name) for name in selected})
+
+
+def parse_confidence_threshold(value):
+    """Return a request's threshold as a float in [0, 1], or None when it was omitted; raise ValueError otherwise"""
+    if value is None:
+        return None
+    # Form, query and stream values arrive as strings, JSON ones as numbers
+    if isinstance(value, bool):
+        raise ValueError('confidence_threshold must be a number')
+    try:
+        threshold = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('confidence_threshold must be a number')
+    # Also rejects nan, which compares false to everything
+    if not 0 <= threshold <= 1:
+        raise ValueError('confidence_threshold must be between 0 and 1')
+    return threshold
+
+
+def validate_changes(changes):
+    """Check the types and ranges of a settings update; return it normalized or raise ValueError"""
+    validated = {}
+    if 'confidence_threshold' in changes:
+        threshold = changes['confidence_threshold']
+        # bool is an int subclass, but True is not a threshold
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)):
+            raise ValueError('confidence_threshold must be a number')
+        if not 0 <= threshold <= 1:
+            raise ValueError('confidence_threshold must be between 0 and 1')
+        validated['confidence_threshold'] = float(threshold)
+    if 'detection_mode' in changes:
+        if not isinstance(changes['detection_mode'], str):
+            raise ValueError("detection_mode must be 'all' or a comma-separated list of class names")
+        validated['detection_mode'] = changes['detection_mode']
+    if 'ui_preferences' in changes:
+        if not isinstance(changes['ui_preferences'], dict):
+            raise ValueError('ui_preferences must be an object')
+        validated['ui_preferences'] = changes['ui_preferences']
+    return validated
+
+
+class SettingsStore:
+    def __init__(self, database, history_limit=20):
+        self.database = database
+        self.history_limit = max(0, int(history_limit))
+        self._lock = threading.Lock()
+        self._current = None
+        self.load()
+
+    def load(self):
+        """Read the current settings, compacting legacy append-only rows into history"""
+        with self._lock, self.database.write() as conn:
+            rows = conn.execute('''
+                SELECT id, confidence_threshold, detection_mode, ui_preferences, version, updated_at
+                FROM user_settings
+                ORDER BY id
+            ''').fetchall()
+
+            if len(rows) > 1 or (rows and rows[0][0] != 1):
+                # Older versions appended a row per change: the newest is current
+                for version, row in enumerate(rows[:-1], 1):
+                    self._archive(conn, version, *row[1:4], row[5])
+                conn.execute('DELETE FROM user_settings')
+                latest = rows[-1]
+                conn.execute('''
+                    INSERT INTO user_settings (id, confidence_threshold, detection_mode, ui_preferences, version, updated_at)
+                    VALUES (1, ?, ?, ?, ?, ?)
+                ''', (*latest[1:4], len(rows), latest[5]))
+                self._prune(conn, len(rows))
+                rows = [(1, *latest[1:4], len(rows), latest[5])]
+
+            if rows:
+                _, threshold, mode, preferences, version, updated_at = rows[0]
+                preferences = json.loads(preferences) if preferences else {}
+                self._current = {
+                    'confidence_threshold': threshold,
+                    'detection_mode': mode,
+                    # Rows written before updates were validated may hold a non-object
+                    'ui_preferences': preferences if isinstance(preferences, dict) else {},
+                    'version': version or 0,
+                    'updated_at': updated_at
+                }
+            else:
+                self._current = {**DEFAULTS, 'version': 0, 'updated_at': None}
+        return self.get()
+
+    def get(self):
+        """Return a copy of the cached settings"""
+        current = self._current
+        return {**current, 'ui_preferences': dict(current['ui_preferences'])}
+
+    @property
+    def version(self):
+        return self._current['version']
+
+    def update(self, changes, expected_version=None):
+        """Apply ``changes`` on top of the current settings and persist them as a new version.
+
+        Raises ValueError for an invalid field before anything is written.
+        """
+        changes = validate_changes(changes)
+        with self._lock:
+            current = self._current
+            if expected_version is not None and expected_version != current['version']:
+                raise VersionConflict(f"Settings changed, current version is {current['version']}")
+
+            updated = {
+                'confidence_threshold': changes.get('confidence_threshold', current['confidence_threshold']),
+                'detection_mode': changes.get('detection_mode', current['detection_mode']),
+                'ui_preferences': changes.get('ui_preferences', current['ui_preferences']),
+                'version': current['version'] + 1,
+                'updated_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+            }
+            with self.database.write() as conn:
+                if current['version']:
+                    self._archive(conn, current['version'], current['confidence_threshold'], current['detection_mode'],
+                                  json.dumps(current['ui_preferences']), current['updated_at'])
+                conn.execute('''
+                    INSERT INTO user_settings (id, confidence_threshold, detection_mode, ui_preferences, version, updated_at)
+                    VALUES (1, ?, ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        confidence_threshold = excluded.confidence_threshold,
+                        detection_mode = excluded.detection_mode,
+                        ui_preferences = excluded.ui_preferences,
+                        version = excluded.version,
+                        updated_at = excluded.updated_at
+                ''', (updated['confidence_threshold'], updated['detection_mode'],
+                      json.dumps(updated['ui_preferences']), updated['version'], updated['updated_at']))
+                self._prune(conn, updated['version'])
+            # Swap the cache only after the write committed
+            self._current = updated
+        return self.get()
+
+    def history(self):
+        """Previous versions, newest first"""
+        rows = self.database.fetch_all('''
+            SELECT version, confidence_threshold, detection_mode, ui_preferences, updated_at
+            FROM user_settings_history
+            ORDER BY version DESC
+        ''')
+        return [{
+            'version': row[0],
+            'confidence_threshold': row[1],
+            'detection_mode': row[2],
+            'ui_preferences': json.loads(row[3]) if row[3] else {},
+            'updated_at': row[4]
+        } for row in rows]
+
+    @staticmethod
+    def _archive(conn, version, threshold, mode, preferences, updated_at):
+        conn.execute('''
+            INSERT OR REPLACE INTO user_settings_history
+            (version, confidence_threshold, detection_mode, ui_preferences, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (version, threshold, mode, preferences, updated_at))
+
+    def _prune(self, conn, current_version):
+        conn.execute('DELETE FROM user_settings_history WHERE version <= ?', (current_version - self.history_limit - 1,))
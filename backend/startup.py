@@ -0,0 +1,87 @@
+"""Startup tracking for the API process: liveness, readiness and time-to-ready.
+
+The process is live as soon as it can answer HTTP requests and ready once the
+model is loaded and warmed up. Loading runs in a background thread so the
+server starts listening immediately; requests that need the model wait for it
+up to a timeout. Phase durations are measured from the first import of this
+module, which ``app`` imports before anything heavy.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+_STARTED = time.perf_counter()
+
+
+class ModelNotReady(Exception):
+    """Raised when a request needs the model before it finished loading"""
+
+
+class Startup:
+    def __init__(self, started=_STARTED):
+        self.started = started
+        self.state = 'starting'
+        self.error = None
+        self.phases = {}
+        self.time_to_ready = None
+        self._done = threading.Event()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def mark(self, name):
+        """Record the time since process start at which ``name`` happened"""
+        self.phases[name] = round(self.elapsed(), 3)
+
+    @contextmanager
+    def phase(self, name):
+        """Record how long the block took"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - start, 3)
+
+    def run(self, load, background=True):
+        """Run ``load`` and then mark the process ready, or failed if it raised"""
+        def target():
+            try:
+                load()
+            except Exception as e:
+                self.error = repr(e)
+                self.state = 'failed'
+            else:
+                self.time_to_ready = round(self.elapsed(), 3)
+                self.state = 'ready'
+            finally:
+                self._done.set()
+
+        if background:
+            threading.Thread(target=target, name='model-loader', daemon=True).start()
+        else:
+            target()
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def wait(self, timeout=None):
+        """Block until the model is ready; raise ModelNotReady on failure or timeout"""
+        if self.ready:
+            return
+        self._done.wait(timeout)
+        if self.state == 'failed':
+            raise ModelNotReady(f'Model failed to load: {self.error}')
+        if not self.ready:
+            raise ModelNotReady('Model is still loading')
+
+    def snapshot(self):
+        return {
+            'state': self.state,
+            'live': True,
+            'ready': self.ready,
+            'uptime_seconds': round(self.elapsed(), 3),
+            'time_to_ready_seconds': self.time_to_ready,
+            'phases': dict(self.phases),
+            'error': self.error
+        }
@@ -0,0 +1,210 @@
+"""WebSocket streaming detection for live camera feeds.
+
+Clients connect to ``ws://<host>:<STREAM_PORT>/ws/stream/<camera_id>`` and send
+encoded frames (JPEG/PNG) as binary messages; each processed frame is answered
+with a JSON result. Text messages are JSON settings updates, e.g.
+``{"confidence_threshold": 0.3}``; without a threshold the stored user
+setting applies.
+
+Each stream has a bounded frame queue. When inference falls behind, the oldest
+queued frame is dropped, so results always describe the most recent frames.
+
+The server normally runs inside the API process (serve.py or app.py), which is
+what lets /api/streams read the registry below. Running this module on its own
+serves streams without that endpoint seeing them.
+
+Usage: python streaming.py
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+
+import config
+from settings_store import parse_confidence_threshold
+
+logger = logging.getLogger(__name__)
+
+
+class _Rate:
+    """Exponentially smoothed event rate in events per second"""
+
+    def __init__(self, smoothing=0.2):
+        self.smoothing = smoothing
+        self.interval = None
+        self.last = None
+
+    def tick(self, now):
+        if self.last is not None:
+            delta = now - self.last
+            self.interval = delta if self.interval is None else \
+                self.smoothing * delta + (1 - self.smoothing) * self.interval
+        self.last = now
+
+    @property
+    def fps(self):
+        return 1.0 / self.interval if self.interval else 0.0
+
+
+class StreamStats:
+    def __init__(self, stream_id):
+        self.stream_id = stream_id
+        self.connected_at = time.time()
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_latency = 0.0
+        self.input_rate = _Rate()
+        self.output_rate = _Rate()
+
+    def snapshot(self):
+        return {
+            'stream_id': self.stream_id,
+            'connected_at': self.connected_at,
+            'frames_received': self.received,
+            'frames_processed': self.processed,
+            'frames_dropped': self.dropped,
+            'errors': self.errors,
+            'input_fps': round(self.input_rate.fps, 2),
+            'output_fps': round(self.output_rate.fps, 2),
+            'last_latency': self.last_latency
+        }
+
+
+class StreamRegistry:
+    """Connected streams, shared with the HTTP API for /api/streams"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = {}
+
+    def add(self, stats):
+        with self._lock:
+            self._streams[id(stats)] = stats
+
+    def remove(self, stats):
+        with self._lock:
+            self._streams.pop(id(stats), None)
+
+    def snapshot(self):
+        with self._lock:
+            return [stats.snapshot() for stats in self._streams.values()]
+
+
+registry = StreamRegistry()
+
+
+def _offer(frames, item, stats):
+    """Queue a frame, dropping the oldest one when the queue is full"""
+    if frames.full():
+        frames.get_nowait()
+        stats.dropped += 1
+    frames.put_nowait(item)
+
+
+async def _receive_frames(websocket, frames, stats, settings):
+    async for message in websocket:
+        if isinstance(message, str):
+            try:
+                update = json.loads(message)
+                if 'confidence_threshold' in update:
+                    settings['confidence_threshold'] = parse_confidence_threshold(update['confidence_threshold'])
+            except ValueError as e:
+                await websocket.send(json.dumps({'success': False, 'error': f'Invalid settings message: {e}'}))
+            except TypeError:
+                await websocket.send(json.dumps({'success': False, 'error': 'Invalid settings message'}))
+            continue
+
+        now = time.perf_counter()
+        stats.received += 1
+        stats.input_rate.tick(now)
+        _offer(frames, (message, now), stats)
+
+
+async def _process_frames(websocket, frames, stats, settings, detect):
+    loop = asyncio.get_running_loop()
+    while True:
+        frame, received_at = await frames.get()
+        try:
+            results = await loop.run_in_executor(None, detect, frame, settings['confidence_threshold'])
+        except Exception as e:
+            stats.errors += 1
+            await websocket.send(json.dumps({'success': False, 'error': str(e)}))
+            continue
+
+        now = time.perf_counter()
+        stats.processed += 1
+        stats.output_rate.tick(now)
+        stats.last_latency = now - received_at
+        await websocket.send(json.dumps({
+            'success': True,
+            'results': results,
+            'stream': stats.snapshot()
+        }))
+
+
+def make_handler(detect, queue_size=1):
+    """Build a websocket handler running ``detect(frame_bytes, confidence_threshold)`` per frame"""
+
+    async def handler(websocket):
+        url = urlparse(websocket.path)
+        if not url.path.startswith('/ws/stream/'):
+            await websocket.close(code=1008, reason='Unknown path')
+            return
+
+        query = parse_qs(url.query)
+        try:
+            # None lets detection apply the stored user settings
+            settings = {'confidence_threshold': parse_confidence_threshold(query.get('confidence_threshold', [None])[0])}
+        except ValueError as e:
+            await websocket.send(json.dumps({'success': False, 'error': str(e)}))
+            await websocket.close(code=1008, reason='Invalid confidence_threshold')
+            return
+        stats = StreamStats(url.path[len('/ws/stream/'):] or 'default')
+        frames = asyncio.Queue(maxsize=max(1, queue_size))
+        registry.add(stats)
+        logger.info('Stream connected', extra={'fields': {'stream_id': stats.stream_id}})
+
+        processor = asyncio.create_task(_process_frames(websocket, frames, stats, settings, detect))
+        try:
+            await _receive_frames(websocket, frames, stats, settings)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            processor.cancel()
+            registry.remove(stats)
+            logger.info('Stream disconnected', extra={'fields': stats.snapshot()})
+
+    return handler
+
+
+async def serve_streams(detect, host, port, queue_size=1, max_frame_bytes=16 * 1024 * 1024):
+    async with websockets.serve(make_handler(detect, queue_size), host, port, max_size=max_frame_bytes):
+        await asyncio.Future()
+
+
+def start_stream_server(detect, host, port, queue_size=1, max_frame_bytes=16 * 1024 * 1024):
+    """Run the streaming server on its own event loop in a daemon thread"""
+    thread = threading.Thread(
+        target=asyncio.run,
+        args=(serve_streams(detect, host, port, queue_size, max_frame_bytes),),
+        name='stream-server',
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    from app import run_detection
+
+    print(f"🚀 Starting stream server on ws://{config.SERVING_HOST}:{config.STREAM_PORT}/ws/stream/<camera_id>")
+    asyncio.run(serve_streams(
+        run_detection, config.SERVING_HOST, config.STREAM_PORT,
+        config.STREAM_QUEUE_SIZE, config.STREAM_MAX_FRAME_BYTES
+    ))
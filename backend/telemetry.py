@@ -0,0 +1,152 @@
+"""In-memory latency histograms and counters with Prometheus text export"""
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class Histogram:
+    """Cumulative-bucket histogram plus a window of recent samples for quantiles"""
+
+    def __init__(self, buckets, window=2048):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def quantiles(self, qs=(0.5, 0.95, 0.99)):
+        samples = sorted(self.recent)
+        if not samples:
+            return {f'p{int(q * 100)}': 0 for q in qs}
+        return {f'p{int(q * 100)}': samples[min(len(samples) - 1, int(q * len(samples)))] for q in qs}
+
+
+class Telemetry:
+    """Thread-safe registry of stage latencies, batch sizes and request counters"""
+
+    def __init__(self, prefix='space_station'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self._requests = {}
+        self._errors = {}
+
+    def reset(self):
+        """Drop everything recorded so far, e.g. between benchmark cases"""
+        with self._lock:
+            self._stages = {}
+            self._batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+            self._requests = {}
+            self._errors = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the enclosed block with a monotonic clock and record it under ``stage``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe_batch_size(self, size):
+        with self._lock:
+            self._batch_sizes.observe(size)
+
+    def count_request(self, method, path, status):
+        key = (method, path, str(status))
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if status >= 500:
+                self._errors[(method, path)] = self._errors.get((method, path), 0) + 1
+
+    def summary(self):
+        """Return per-stage p50/p95/p99 and counters as a JSON-friendly dict"""
+        with self._lock:
+            return {
+                'stages': {
+                    stage: {'count': h.count, 'avg': h.sum / h.count if h.count else 0, **h.quantiles()}
+                    for stage, h in self._stages.items()
+                },
+                'batch_size': {
+                    'count': self._batch_sizes.count,
+                    'avg': self._batch_sizes.sum / self._batch_sizes.count if self._batch_sizes.count else 0,
+                    **self._batch_sizes.quantiles()
+                },
+                'requests_total': sum(self._requests.values()),
+                'errors_total': sum(self._errors.values())
+            }
+
+    def render_prometheus(self, gauges=None, counters=None):
+        """Render all metrics in the Prometheus text exposition format.
+
+        ``gauges`` maps extra metric names to current values, e.g. queue depths;
+        ``counters`` maps names of running totals, exported with a ``_total`` suffix.
+        """
+        p = self.prefix
+        lines = []
+        with self._lock:
+            lines += [f'# HELP {p}_stage_seconds Latency of each detection pipeline stage',
+                      f'# TYPE {p}_stage_seconds histogram']
+            for stage, histogram in sorted(self._stages.items()):
+                lines += self._histogram_lines(f'{p}_stage_seconds', histogram, f'stage="{stage}"')
+
+            lines += [f'# HELP {p}_stage_seconds_quantile Recent-window latency quantiles per stage',
+                      f'# TYPE {p}_stage_seconds_quantile gauge']
+            for stage, histogram in sorted(self._stages.items()):
+                for name, value in histogram.quantiles().items():
+                    quantile = int(name[1:]) / 100
+                    lines.append(f'{p}_stage_seconds_quantile{{stage="{stage}",quantile="{quantile}"}} {value}')
+
+            lines += [f'# HELP {p}_batch_size Number of images per model call',
+                      f'# TYPE {p}_batch_size histogram']
+            lines += self._histogram_lines(f'{p}_batch_size', self._batch_sizes, '')
+
+            lines += [f'# HELP {p}_http_requests_total HTTP requests by route and status',
+                      f'# TYPE {p}_http_requests_total counter']
+            for (method, path, status), value in sorted(self._requests.items()):
+                lines.append(f'{p}_http_requests_total{{method="{method}",path="{path}",status="{status}"}} {value}')
+
+            lines += [f'# HELP {p}_http_errors_total HTTP requests that failed with a 5xx status',
+                      f'# TYPE {p}_http_errors_total counter']
+            for (method, path), value in sorted(self._errors.items()):
+                lines.append(f'{p}_http_errors_total{{method="{method}",path="{path}"}} {value}')
+
+        for name, value in (gauges or {}).items():
+            lines += [f'# TYPE {p}_{name} gauge', f'{p}_{name} {value}']
+        for name, value in (counters or {}).items():
+            lines += [f'# TYPE {p}_{name}_total counter', f'{p}_{name}_total {value}']
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _histogram_lines(name, histogram, labels):
+        sep = ',' if labels else ''
+        lines = []
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {histogram.count}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {histogram.sum}')
+        lines.append(f'{name}_count{suffix} {histogram.count}')
+        return lines
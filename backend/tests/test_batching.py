@@ -0,0 +1,85 @@
+import pytest
+
+from batching import MicroBatcher
+
+
+@pytest.fixture
+def make_batcher():
+    batchers = []
+
+    def make(process_batch, **kwargs):
+        batcher = MicroBatcher(process_batch, **kwargs)
+        batchers.append(batcher)
+        return batcher
+
+    yield make
+    for batcher in batchers:
+        batcher.shutdown(timeout=5)
+
+
+def test_concurrent_items_share_one_batch(make_batcher):
+    calls = []
+
+    def process(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = make_batcher(process, max_batch_size=4, max_wait_ms=200)
+    futures = [batcher.submit(i) for i in range(3)]
+
+    results = [future.result(timeout=5) for future in futures]
+    assert [result for result, _ in results] == [0, 2, 4]
+    assert calls == [[0, 1, 2]]
+    assert all(info['size'] == 3 for _, info in results)
+
+
+def test_batches_are_capped_at_max_batch_size(make_batcher):
+    sizes = []
+
+    def process(items):
+        sizes.append(len(items))
+        return items
+
+    batcher = make_batcher(process, max_batch_size=2, max_wait_ms=200)
+    futures = [batcher.submit(i) for i in range(5)]
+
+    assert [future.result(timeout=5)[0] for future in futures] == list(range(5))
+    assert max(sizes) <= 2
+    assert sum(sizes) == 5
+
+
+def test_exception_fails_every_future_in_the_batch(make_batcher):
+    def process(items):
+        raise RuntimeError('model crashed')
+
+    batcher = make_batcher(process, max_batch_size=4, max_wait_ms=100)
+    futures = [batcher.submit(i) for i in range(3)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match='model crashed'):
+            future.result(timeout=5)
+
+
+@pytest.mark.parametrize('process', [lambda items: items[:-1], lambda items: items + [None]])
+def test_result_count_mismatch_fails_instead_of_hanging(make_batcher, process):
+    batcher = make_batcher(process, max_batch_size=4, max_wait_ms=100)
+    futures = [batcher.submit(i) for i in range(3)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match='results for'):
+            future.result(timeout=5)
+
+
+def test_batcher_keeps_serving_after_a_failed_batch(make_batcher):
+    calls = []
+
+    def process(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise RuntimeError('transient')
+        return items
+
+    batcher = make_batcher(process, max_batch_size=1, max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        batcher.submit('a').result(timeout=5)
+    assert batcher.submit('b').result(timeout=5)[0] == 'b'
@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from benchmark import compare, flatten, latency_summary, parse_resolutions
+
+
+def report(p95, throughput, errors=0):
+    return {
+        'startup': {'time_to_ready_seconds': 2.0},
+        'detector': [{
+            'case': '1920x1080/5',
+            'latency_ms': {'p50': p95 / 2, 'p95': p95},
+            'stages_ms': {'inference': {'p95': p95 * 0.8}}
+        }],
+        'http': [{'concurrency': 4, 'throughput_rps': throughput, 'latency_ms': {'p95': p95}, 'errors': errors}]
+    }
+
+
+def test_flatten_marks_throughput_as_higher_is_better():
+    metrics = flatten(report(100.0, 50.0))
+
+    assert metrics['detector.1920x1080/5.latency_ms.p95'] == (100.0, False)
+    assert metrics['detector.1920x1080/5.inference_ms.p95'] == (80.0, False)
+    assert metrics['http.c4.throughput_rps'] == (50.0, True)
+    assert metrics['startup.time_to_ready_seconds'] == (2.0, False)
+
+
+def test_compare_flags_only_changes_beyond_the_threshold():
+    rows = {row['metric']: row for row in compare(report(100.0, 50.0), report(105.0, 40.0), threshold=0.1)}
+
+    # 5% slower is within the threshold; 20% less throughput is not
+    assert not rows['detector.1920x1080/5.latency_ms.p95']['regression']
+    assert rows['http.c4.throughput_rps']['regression']
+    assert rows['http.c4.throughput_rps']['change'] == pytest.approx(-0.2)
+
+
+def test_compare_handles_zero_baselines():
+    rows = {row['metric']: row for row in compare(report(100.0, 50.0), report(100.0, 50.0, errors=3))}
+
+    assert rows['http.c4.errors']['regression']
+    assert not any(row['regression'] for name, row in rows.items() if name != 'http.c4.errors')
+
+
+def test_compare_skips_metrics_missing_from_either_report():
+    candidate = report(100.0, 50.0)
+    del candidate['http']
+
+    assert not any(row['metric'].startswith('http.') for row in compare(report(100.0, 50.0), candidate))
+
+
+def test_latency_summary_and_resolutions():
+    summary = latency_summary([0.01, 0.02, 0.03])
+    assert summary['p50'] == 20.0
+    assert summary['max'] == 30.0
+    assert latency_summary([])['p95'] == 0
+    assert parse_resolutions('640x480,3840X2160') == [(640, 480), (3840, 2160)]
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import threading
+
+import pytest
+
+from bulk_infer import BulkInference, JsonLinesOutput, bounded_map, chunked, iter_image_paths
+from database import open_database
+
+
+class FakeImageStore:
+    @staticmethod
+    def hash_bytes(image_bytes):
+        return hashlib.sha256(image_bytes).hexdigest()
+
+
+class FakeModel:
+    version = 'v1'
+
+
+class FakeDetector:
+    """Decodes any file except ones starting with b'bad' and finds one ToolBox per image"""
+
+    def __init__(self, database):
+        self.db = database
+        self.image_store = FakeImageStore()
+        self.model = FakeModel()
+        self.calls = []
+
+    def preprocess_image(self, image_bytes, mode):
+        if image_bytes.startswith(b'bad'):
+            raise ValueError('Failed to process image')
+        return image_bytes, (1.0, 1.0)
+
+    def detect_images(self, images, confidence_thresholds, cache_keys, modes, scales, class_filters, model):
+        self.calls.append(len(images))
+        return [{
+            'model_version': model.version, 'mode': 'full', 'tiles': 1, 'total_objects': 1,
+            'class_counts': {'ToolBox': 1},
+            'detections': [{'class': 'ToolBox', 'confidence': 0.9, 'bbox': [0, 0, 1, 1]}]
+        } for _ in images]
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = open_database(str(tmp_path / 'bulk.db'))
+    with database.write() as conn:
+        conn.execute('''
+            CREATE TABLE detections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                image_path TEXT,
+                toolbox_count INTEGER,
+                oxygen_tank_count INTEGER,
+                fire_extinguisher_count INTEGER,
+                confidence_scores TEXT,
+                processing_time REAL,
+                image_hash TEXT,
+                model_version TEXT
+            )
+        ''')
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def images(tmp_path):
+    root = tmp_path / 'archive'
+    (root / 'b').mkdir(parents=True)
+    for name in ('a1.jpg', 'a2.PNG', 'b/b1.jpg', 'b/b2.jpg', 'notes.txt'):
+        (root / name).write_bytes(b'image ' + name.encode())
+    (root / 'b' / 'broken.jpg').write_bytes(b'bad image')
+    return root
+
+
+def test_iter_image_paths_walks_directories_and_globs(images):
+    names = [path[len(str(images)) + 1:] for path in iter_image_paths([str(images)])]
+    assert names == ['a1.jpg', 'a2.PNG', 'b/b1.jpg', 'b/b2.jpg', 'b/broken.jpg']
+    assert len(list(iter_image_paths([str(images / 'b' / '*.jpg')]))) == 3
+
+
+def test_bounded_map_keeps_order_and_stays_within_the_window():
+    from concurrent.futures import ThreadPoolExecutor
+
+    submitted = []
+    lock = threading.Lock()
+
+    def fn(item):
+        with lock:
+            submitted.append(item)
+        return item * 2
+
+    with ThreadPoolExecutor(4) as executor:
+        for consumed, result in enumerate(bounded_map(executor, fn, range(20), window=3)):
+            assert result == consumed * 2
+            assert len(submitted) <= consumed + 3
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_jsonl_output_drops_a_torn_line_and_skips_failed_rows_on_resume(tmp_path):
+    path = tmp_path / 'out.jsonl'
+    path.write_text(json.dumps({'path': 'a.jpg', 'error': None}) + '\n'
+                    + json.dumps({'path': 'b.jpg', 'error': 'Failed'}) + '\n'
+                    + '{"path": "c.j')
+
+    output = JsonLinesOutput(path)
+    assert output.processed() == {'a.jpg'}
+    output.write([{'path': 'd.jpg', 'error': None}])
+    output.close()
+    assert [json.loads(line)['path'] for line in path.read_text().splitlines()] == ['a.jpg', 'b.jpg', 'd.jpg']
+
+
+def run(database, images, output_path, paths=None):
+    output = JsonLinesOutput(output_path)
+    done = output.processed()
+    detector = FakeDetector(database)
+    bulk = BulkInference(detector, output, 0.5, batch_size=2, decode_threads=2, insert=True)
+    paths = [path for path in (paths or iter_image_paths([str(images)])) if path not in done]
+    return bulk.run(paths, progress_interval=3600), detector
+
+
+def test_run_writes_every_image_and_inserts_successes_once(database, images, tmp_path):
+    output_path = tmp_path / 'out.jsonl'
+    counts, detector = run(database, images, output_path)
+
+    assert (counts['processed'], counts['failed'], counts['inserted']) == (5, 1, 4)
+    assert max(detector.calls) <= 2
+    rows = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [row['path'].endswith('broken.jpg') for row in rows if row['error']] == [True]
+    assert database.fetch_one('SELECT COUNT(*) FROM detections')[0] == 4
+
+    # A resumed run only retries the failed image, and inserts nothing twice
+    counts, _ = run(database, images, output_path)
+    assert (counts['processed'], counts['inserted']) == (1, 0)
+    assert database.fetch_one('SELECT COUNT(*) FROM detections')[0] == 4
+
+
+def test_inserted_rows_use_the_detection_columns(database, images, tmp_path):
+    run(database, images, tmp_path / 'out.jsonl', paths=[str(images / 'a1.jpg')])
+
+    row = database.fetch_one('SELECT image_path, toolbox_count, confidence_scores, image_hash, model_version '
+                             'FROM detections')
+    # Images were not copied into the store, so the row does not link one
+    assert row == (str(images / 'a1.jpg'), 1, '[0.9]', None, 'v1')
@@ -0,0 +1,60 @@
+from contextlib import ExitStack
+
+import pytest
+
+from database import SQLiteDatabase, open_database
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = open_database(f"sqlite:///{tmp_path / 'app.db'}", pool_size=2, acquire_timeout=0.2)
+    with database.write() as conn:
+        conn.execute('CREATE TABLE items (name TEXT)')
+    yield database
+    database.close()
+
+
+def test_open_database_urls(tmp_path):
+    for url in (str(tmp_path / 'bare.db'), f"sqlite:///{tmp_path / 'url.db'}"):
+        database = open_database(url)
+        assert isinstance(database, SQLiteDatabase)
+        assert database.fetch_one('PRAGMA journal_mode')[0] == 'wal'
+        database.close()
+    with pytest.raises(ValueError):
+        open_database('postgres://localhost/detections')
+
+
+def test_write_commits_and_rolls_back(database):
+    with database.write() as conn:
+        conn.execute("INSERT INTO items VALUES ('kept')")
+    with pytest.raises(RuntimeError):
+        with database.write() as conn:
+            conn.execute("INSERT INTO items VALUES ('discarded')")
+            raise RuntimeError('abort')
+
+    assert database.fetch_all('SELECT name FROM items') == [('kept',)]
+
+
+def test_read_connections_are_read_only_and_reused(database):
+    with pytest.raises(database.Error):
+        with database.read() as conn:
+            conn.execute("INSERT INTO items VALUES ('nope')")
+    for _ in range(5):
+        database.fetch_all('SELECT name FROM items')
+
+    stats = database.stats()
+    assert stats['read_connections'] == 1
+    assert stats['idle_read_connections'] == 1
+
+
+def test_pool_is_bounded(database):
+    with ExitStack() as stack:
+        for _ in range(database.pool_size):
+            stack.enter_context(database.read())
+        with pytest.raises(TimeoutError):
+            database.fetch_one('SELECT 1')
+
+    stats = database.stats()
+    assert stats['read_connections'] == database.pool_size
+    assert stats['pool_waits'] == 1
+    assert database.fetch_one('SELECT 1') == (1,)
@@ -0,0 +1,69 @@
+import pytest
+
+from database import open_database
+from history import decode_cursor, encode_cursor, history_page
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = open_database(str(tmp_path / 'history.db'))
+    with database.write() as conn:
+        conn.execute('''
+            CREATE TABLE detections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME,
+                toolbox_count INTEGER,
+                oxygen_tank_count INTEGER,
+                fire_extinguisher_count INTEGER,
+                confidence_scores TEXT,
+                processing_time REAL,
+                image_hash TEXT
+            )
+        ''')
+        # Several rows share a timestamp, so the cursor must break ties by id
+        conn.executemany('''
+            INSERT INTO detections (timestamp, toolbox_count, oxygen_tank_count, fire_extinguisher_count)
+            VALUES (?, ?, ?, ?)
+        ''', [
+            ('2026-01-01 10:00:00', 1, 0, 0),
+            ('2026-01-01 10:00:00', 0, 1, 0),
+            ('2026-01-01 10:00:00', 0, 0, 1),
+            ('2026-01-01 11:00:00', 1, 1, 0),
+            ('2026-01-01 12:00:00', 0, 0, 0),
+        ])
+    yield database
+    database.close()
+
+
+def all_ids(database, limit, **filters):
+    ids, position = [], None
+    while True:
+        rows, cursor = history_page(database, limit, position=position, **filters)
+        ids += [row[0] for row in rows]
+        if cursor is None:
+            return ids
+        position = decode_cursor(cursor)
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor('2026-01-01 10:00:00', 7)) == ('2026-01-01 10:00:00', 7)
+    with pytest.raises(ValueError):
+        decode_cursor('not a cursor')
+
+
+@pytest.mark.parametrize('limit', [1, 2, 4, 5, 10])
+def test_pages_cover_every_row_once_newest_first(database, limit):
+    assert all_ids(database, limit) == [5, 4, 3, 2, 1]
+
+
+def test_last_full_page_has_no_cursor(database):
+    rows, cursor = history_page(database, 5)
+    assert len(rows) == 5
+    assert cursor is None
+
+
+def test_filters_by_time_range_and_class(database):
+    assert all_ids(database, 2, since='2026-01-01 10:30:00') == [5, 4]
+    assert all_ids(database, 2, until='2026-01-01 11:00:00') == [3, 2, 1]
+    assert all_ids(database, 1, classes=['ToolBox']) == [4, 1]
+    assert all_ids(database, 1, classes=['OxygenTank', 'FireExtinguisher']) == [4, 3, 2]
@@ -0,0 +1,88 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip('PIL')
+
+from database import open_database
+from image_store import ImageStore, compact
+
+JPEG = b'\xff\xd8\xff\xe0' + b'jpeg body'
+PNG = b'\x89PNG\r\n\x1a\n' + b'png body'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ImageStore(str(tmp_path / 'images'))
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = open_database(str(tmp_path / 'detections.db'))
+    with database.write() as conn:
+        conn.execute('''
+            CREATE TABLE detections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                image_data BLOB,
+                image_hash TEXT
+            )
+        ''')
+    yield database
+    database.close()
+
+
+def age(store, image_hash, seconds=3600):
+    past = time.time() - seconds
+    os.utime(store.path(image_hash), (past, past))
+
+
+def test_put_is_content_addressed(store):
+    image_hash = store.put(JPEG)
+
+    assert image_hash == ImageStore.hash_bytes(JPEG)
+    assert store.put(JPEG) == image_hash
+    assert store.path(image_hash).endswith(os.path.join(image_hash[:2], image_hash + '.jpg'))
+    assert store.path(store.put(PNG)).endswith('.png')
+    assert sorted(store.iter_hashes()) == sorted([image_hash, ImageStore.hash_bytes(PNG)])
+
+
+def test_invalid_hashes_never_resolve_to_paths(store):
+    store.put(JPEG)
+    assert store.path('../' * 10 + 'etc/passwd') is None
+    assert store.path('A' * 64) is None
+
+
+def test_delete_frees_the_file(store):
+    image_hash = store.put(JPEG)
+    assert store.delete(image_hash) == len(JPEG)
+    assert store.path(image_hash) is None
+
+
+def test_compact_migrates_blobs_in_chunks(database, store):
+    with database.write() as conn:
+        conn.executemany('INSERT INTO detections (image_data) VALUES (?)', [(JPEG,), (PNG,), (JPEG,)])
+
+    report = compact(database, store, chunk_size=2, vacuum=False)
+
+    assert report['migrated_blobs'] == 3
+    rows = database.fetch_all('SELECT image_data, image_hash FROM detections ORDER BY id')
+    assert rows == [(None, ImageStore.hash_bytes(JPEG)), (None, ImageStore.hash_bytes(PNG)),
+                    (None, ImageStore.hash_bytes(JPEG))]
+
+
+def test_compact_expires_old_references_and_deletes_orphans(database, store):
+    old_hash, new_hash, orphan_hash = store.put(JPEG), store.put(PNG), store.put(b'orphan')
+    recent_orphan_hash = store.put(b'still queued')
+    for image_hash in (old_hash, new_hash, orphan_hash):
+        age(store, image_hash)
+    with database.write() as conn:
+        conn.execute("INSERT INTO detections (timestamp, image_hash) VALUES (datetime('now', '-40 days'), ?)", (old_hash,))
+        conn.execute('INSERT INTO detections (image_hash) VALUES (?)', (new_hash,))
+
+    report = compact(database, store, retention_days=30)
+
+    assert report['expired_references'] == 1
+    assert report['deleted_images'] == 2
+    assert sorted(store.iter_hashes()) == sorted([new_hash, recent_orphan_hash])
@@ -0,0 +1,88 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+import inference_cache
+from inference_cache import InferenceCache
+
+
+def columns(boxes=1):
+    return {
+        'xyxy': np.zeros((boxes, 4), dtype=np.float32),
+        'confidence': np.full(boxes, 0.9, dtype=np.float32),
+        'class_id': np.zeros(boxes, dtype=np.int64)
+    }
+
+
+def gradient(width, height):
+    row = np.linspace(0, 255, width, dtype=np.uint8)
+    return np.repeat(np.tile(row, (height, 1))[:, :, None], 3, axis=2)
+
+
+def test_exact_keys_need_an_image_hash():
+    cache = InferenceCache(mode='exact')
+    assert cache.key('v1', image_hash='abc') == 'v1:abc'
+    assert cache.key('v1', image=gradient(64, 48)) is None
+    assert InferenceCache(mode='off').key('v1', image_hash='abc') is None
+
+
+def test_perceptual_keys_include_the_original_size():
+    cache = InferenceCache(mode='perceptual')
+    small = gradient(320, 240)
+
+    key = cache.key('v1', image=small, scale=(2.0, 2.0))
+    assert key.endswith(':640x480')
+    # The same picture at another resolution must not share cached boxes
+    assert key.split(':')[1] == cache.key('v1', image=gradient(640, 480)).split(':')[1]
+    assert key != cache.key('v1', image=small)
+
+
+def test_hits_only_at_or_above_the_stored_floor():
+    cache = InferenceCache()
+    result = columns()
+    cache.put('k', result, floor=0.25)
+
+    assert cache.get('k', 0.5) is result
+    assert cache.get('k', 0.1) is None
+    assert cache.get('missing', 0.5) is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = InferenceCache(max_entries=2)
+    cache.put('a', columns(), 0.05)
+    cache.put('b', columns(), 0.05)
+    cache.get('a', 0.5)
+    cache.put('c', columns(), 0.05)
+
+    assert cache.get('b', 0.5) is None
+    assert cache.get('a', 0.5) is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(inference_cache.time, 'monotonic', lambda: now[0])
+    cache = InferenceCache(ttl_seconds=10)
+    cache.put('k', columns(), 0.05)
+
+    now[0] += 11
+    assert cache.get('k', 0.5) is None
+    assert cache.stats()['expirations'] == 1
+    assert cache.stats()['entries'] == 0
+
+
+def test_byte_budget_is_enforced():
+    result = columns(100)
+    size = InferenceCache._estimate_size(result)
+    cache = InferenceCache(max_bytes=size * 2)
+    for key in 'abc':
+        cache.put(key, columns(100), 0.05)
+
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['bytes'] <= size * 2
+    tiny = InferenceCache(max_bytes=size - 1)
+    tiny.put('too big', result, 0.05)
+    assert tiny.stats()['entries'] == 0
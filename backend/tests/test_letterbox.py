@@ -0,0 +1,58 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from inference_backends import Letterbox
+
+
+def frame(width, height, value=200):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+def test_rect_pads_to_the_stride_only_for_uniform_batches():
+    letterbox = Letterbox(640, rect=True, stride=32)
+    assert letterbox.input_shape([frame(1920, 1080)] * 2) == (384, 640)
+    assert letterbox.input_shape([frame(1920, 1080), frame(1080, 1920)]) == (640, 640)
+    assert Letterbox(640).input_shape([frame(1920, 1080)]) == (640, 640)
+
+
+def test_prepare_normalizes_and_pads():
+    letterbox = Letterbox(640, rect=True)
+    batch, transforms = letterbox.prepare([frame(1920, 1080)])
+
+    assert batch.shape == (1, 3, 384, 640)
+    assert batch.dtype == np.float32
+    ratio, pad_x, pad_y = transforms[0]
+    assert (ratio, pad_x, pad_y) == (pytest.approx(1 / 3), 0, 12)
+    assert batch[0, :, 0, 0] == pytest.approx([114 / 255] * 3)
+    assert batch[0, :, 192, 320] == pytest.approx([200 / 255] * 3)
+
+
+def test_buffer_is_reused_up_to_max_batch():
+    letterbox = Letterbox(64, max_batch=2)
+    first, _ = letterbox.prepare([frame(64, 64)] * 2)
+    second, _ = letterbox.prepare([frame(32, 64)])
+    assert np.shares_memory(first, second)
+
+    # Oversized batches get their own array and do not grow the shared buffer
+    oversized, _ = letterbox.prepare([frame(64, 64)] * 3)
+    assert not np.shares_memory(oversized, second)
+    assert letterbox._buffer.size == 2 * 3 * 64 * 64
+
+
+def test_restore_maps_boxes_back_to_original_pixels():
+    letterbox = Letterbox(640, rect=True)
+    shape = (1080, 1920, 3)
+    _, (transform,) = letterbox.prepare([frame(1920, 1080)])
+    ratio, pad_x, pad_y = transform
+    original = np.array([[960, 540, 1200, 700]], dtype=np.float32)
+    letterboxed = original * ratio + np.array((pad_x, pad_y, pad_x, pad_y), dtype=np.float32)
+
+    restored = Letterbox.restore(letterboxed, transform, shape)
+    assert restored.dtype == np.float32
+    assert restored.tolist()[0] == pytest.approx(original.tolist()[0], abs=0.01)
+
+    # Boxes reaching into the padding are clipped to the image
+    clipped = Letterbox.restore(np.array([[-10, 0, 700, 400]], dtype=np.float32), transform, shape)
+    assert clipped.tolist()[0] == pytest.approx([0, 0, 1920, 1080])
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from model_registry import MANIFEST, ModelRegistry
+
+
+@pytest.fixture
+def weights(tmp_path):
+    path = tmp_path / 'runs' / 'best.pt'
+    path.parent.mkdir()
+    path.write_bytes(b'weights v1')
+    return path
+
+
+def test_register_copies_weights_into_a_new_version(tmp_path, weights):
+    registry = ModelRegistry(tmp_path / 'registry')
+    entry = registry.register(weights, metrics={'mAP_50': 0.8})
+
+    assert entry['version'] == 'v1'
+    # Later changes to the source file do not change the registered version
+    weights.write_bytes(b'weights v2')
+    with open(registry.path('v1'), 'rb') as f:
+        assert f.read() == b'weights v1'
+    assert registry.register(weights)['version'] == 'v2'
+    assert [e['version'] for e in registry.versions()] == ['v1', 'v2']
+    assert registry.get('v1')['metrics'] == {'mAP_50': 0.8}
+
+
+def test_register_rejects_duplicates_and_missing_weights(tmp_path, weights):
+    registry = ModelRegistry(tmp_path / 'registry')
+    registry.register(weights, version='prod')
+
+    with pytest.raises(ValueError):
+        registry.register(weights, version='prod')
+    with pytest.raises(FileNotFoundError):
+        registry.register(tmp_path / 'missing.pt')
+
+
+def test_deployment_is_persisted_in_the_manifest(tmp_path, weights):
+    root = tmp_path / 'registry'
+    registry = ModelRegistry(root)
+    assert registry.deployment() == {'active': None, 'candidate': None, 'split': 0.0, 'shadow': False}
+    registry.register(weights)
+    registry.register(weights)
+
+    registry.set_deployment('v1', candidate='v2', split=0.1, shadow=True)
+    assert ModelRegistry(root).deployment() == {'active': 'v1', 'candidate': 'v2', 'split': 0.1, 'shadow': True}
+    assert json.loads((root / MANIFEST).read_text())['active'] == 'v1'
+    with pytest.raises(KeyError):
+        registry.set_deployment('v9')
@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+import model_router
+from model_router import ModelRouter, ServingModel
+
+
+class FakeBackend:
+    names = {1: 'OxygenTank', 0: 'ToolBox'}
+    identity = 'best.pt'
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def predict(self, images, conf, classes=None):
+        return [conf] * len(images)
+
+    def close(self):
+        self.closed.set()
+
+
+def serving(version):
+    return ServingModel(FakeBackend(), version)
+
+
+def test_serving_model_identity_and_class_names():
+    model = serving('v1')
+    assert model.class_names == ['ToolBox', 'OxygenTank']
+    assert model.identity == 'v1|best.pt'
+    assert model.predict([None, None], 0.4) == [0.4, 0.4]
+
+
+def test_split_routes_to_the_candidate(monkeypatch):
+    router = ModelRouter()
+    active, candidate = serving('v1'), serving('v2')
+    router.deploy(active, candidate, split=0.3)
+
+    monkeypatch.setattr(model_router.random, 'random', lambda: 0.2)
+    assert router.route() == (candidate, None)
+    monkeypatch.setattr(model_router.random, 'random', lambda: 0.5)
+    assert router.route() == (active, None)
+    router.close()
+
+
+def test_shadow_serves_the_active_model(monkeypatch):
+    router = ModelRouter()
+    active, candidate = serving('v1'), serving('v2')
+    router.deploy(active, candidate, split=1.0, shadow=True)
+
+    monkeypatch.setattr(model_router.random, 'random', lambda: 0.0)
+    assert router.route() == (active, candidate)
+    router.close()
+
+
+def test_deploy_validates_split_and_retires_old_models():
+    router = ModelRouter(retire_delay=0)
+    old, new = serving('v1'), serving('v2')
+    router.deploy(old)
+    with pytest.raises(ValueError):
+        router.deploy(new, serving('v3'), split=1.5)
+
+    assert router.deploy(new) == [old]
+    assert old.backend.closed.wait(5)
+    assert not new.backend.closed.is_set()
+    router.close()
+
+
+def test_shadow_runs_are_dropped_when_the_queue_is_full():
+    router = ModelRouter(shadow_queue_size=1)
+    release = threading.Event()
+    first = router.run_shadow(lambda: release.wait(5))
+
+    assert router.run_shadow(lambda: None) is None
+    release.set()
+    assert first.result(timeout=5)
+    assert router.stats()['shadow_dropped'] == 1
+    router.close()
+
+
+def test_stats_compare_serving_and_shadow_runs():
+    router = ModelRouter()
+    router.record('v1', 0.1, 3)
+    router.record('v1', 0.3, 1)
+    router.record('v2', 0.2, 2, shadow=True, agrees=True)
+
+    by_key = {(m['version'], m['role']): m for m in router.stats()['models']}
+    assert by_key[('v1', 'serving')]['requests'] == 2
+    assert by_key[('v1', 'serving')]['objects_per_request'] == 2
+    assert by_key[('v1', 'serving')]['agreement'] is None
+    assert by_key[('v2', 'shadow')]['agreement'] == 1.0
+    router.close()
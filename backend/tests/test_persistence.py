@@ -0,0 +1,108 @@
+import threading
+from contextlib import contextmanager
+
+from database import open_database
+from persistence import DetectionWriter, record_training_result
+
+SCHEMA = '''
+    CREATE TABLE detections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        image_path TEXT,
+        toolbox_count INTEGER,
+        oxygen_tank_count INTEGER,
+        fire_extinguisher_count INTEGER,
+        confidence_scores TEXT,
+        processing_time REAL,
+        image_hash TEXT,
+        model_version TEXT
+    );
+    CREATE TABLE training_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        model_path TEXT,
+        epochs INTEGER,
+        mAP_50 REAL,
+        mAP_50_95 REAL,
+        precision REAL,
+        recall REAL,
+        training_time REAL,
+        config TEXT
+    );
+'''
+
+
+def make_database(tmp_path):
+    database = open_database(str(tmp_path / 'detections.db'))
+    with database.write() as conn:
+        conn.executescript(SCHEMA)
+    return database
+
+
+def detection_row(image_hash):
+    return (None, 1, 0, 2, '[]', 0.05, image_hash, 'v1')
+
+
+def test_close_flushes_every_queued_row(tmp_path):
+    database = make_database(tmp_path)
+    writer = DetectionWriter(database, max_batch_size=4, flush_interval_ms=50)
+    for i in range(10):
+        assert writer.submit(detection_row(f'hash{i}'))
+    writer.close(timeout=5)
+
+    assert database.fetch_one('SELECT COUNT(*) FROM detections')[0] == 10
+    stats = writer.stats()
+    assert stats['rows_written'] == 10
+    assert stats['flushes'] >= 3
+    database.close()
+
+
+def test_failed_batch_is_counted_and_the_writer_keeps_running(tmp_path):
+    database = make_database(tmp_path)
+    writer = DetectionWriter(database, max_batch_size=1, flush_interval_ms=0)
+    # Too few values to bind
+    writer.submit(('bad', 'row'))
+    writer.submit(detection_row('good'))
+    writer.close(timeout=5)
+
+    assert database.fetch_all('SELECT image_hash FROM detections') == [('good',)]
+    stats = writer.stats()
+    assert stats['rows_failed'] == 1
+    assert stats['rows_written'] == 1
+    database.close()
+
+
+class BlockedDatabase:
+    """Holds every write until ``release`` is set, so the queue fills up"""
+
+    Error = Exception
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    @contextmanager
+    def write(self):
+        self.release.wait(5)
+        yield self
+
+    def executemany(self, sql, rows):
+        pass
+
+
+def test_full_queue_drops_rows_under_the_drop_policy():
+    database = BlockedDatabase()
+    writer = DetectionWriter(database, max_queue_size=1, max_batch_size=1, flush_interval_ms=0, policy='drop')
+    # The writer thread takes at most one row, which blocks it; then the queue holds one more
+    results = [writer.submit(detection_row(f'hash{i}')) for i in range(5)]
+    dropped = writer.stats()['rows_dropped']
+    database.release.set()
+    writer.close(timeout=5)
+
+    assert results.count(False) == dropped >= 3
+
+
+def test_record_training_result_stores_missing_metrics_as_null(tmp_path):
+    database = make_database(tmp_path)
+    record_training_result(database, 'runs/trial_1', 10, {'mAP_50': 0.8}, 12.5, {'type': 'sweep_trial'})
+
+    row = database.fetch_one('SELECT model_path, epochs, mAP_50, mAP_50_95, recall, config FROM training_results')
+    assert row == ('runs/trial_1', 10, 0.8, None, None, '{"type": "sweep_trial"}')
+    database.close()
@@ -0,0 +1,94 @@
+import pytest
+
+from database import open_database
+from settings_store import SettingsStore, VersionConflict, parse_confidence_threshold, parse_detection_mode
+
+SCHEMA = '''
+    CREATE TABLE user_settings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        confidence_threshold REAL DEFAULT 0.5,
+        detection_mode TEXT DEFAULT 'all',
+        ui_preferences TEXT DEFAULT '{}',
+        version INTEGER DEFAULT 0,
+        updated_at DATETIME
+    );
+    CREATE TABLE user_settings_history (
+        version INTEGER PRIMARY KEY,
+        confidence_threshold REAL,
+        detection_mode TEXT,
+        ui_preferences TEXT,
+        updated_at DATETIME
+    );
+'''
+
+
+@pytest.fixture
+def database(tmp_path):
+    db = open_database(f"sqlite:///{tmp_path / 'settings.db'}")
+    with db.write() as conn:
+        conn.executescript(SCHEMA)
+    yield db
+    db.close()
+
+
+def test_update_bumps_version_and_archives_previous(database):
+    store = SettingsStore(database, history_limit=2)
+    store.update({'confidence_threshold': 0.3})
+    store.update({'detection_mode': 'ToolBox'})
+    settings = store.update({'ui_preferences': {'theme': 'dark'}})
+
+    assert settings['version'] == 3
+    assert settings['confidence_threshold'] == 0.3
+    assert settings['detection_mode'] == 'ToolBox'
+    assert [row['version'] for row in store.history()] == [2, 1]
+
+
+def test_stale_version_conflicts(database):
+    store = SettingsStore(database)
+    store.update({'confidence_threshold': 0.3}, expected_version=0)
+    with pytest.raises(VersionConflict):
+        store.update({'confidence_threshold': 0.4}, expected_version=0)
+    assert store.get()['confidence_threshold'] == 0.3
+
+
+@pytest.mark.parametrize('changes', [
+    {'ui_preferences': 'dark'},
+    {'ui_preferences': ['dark']},
+    {'confidence_threshold': 'high'},
+    {'confidence_threshold': True},
+    {'confidence_threshold': 1.5},
+    {'detection_mode': 3},
+])
+def test_invalid_update_is_rejected_before_writing(database, changes):
+    store = SettingsStore(database)
+    with pytest.raises(ValueError):
+        store.update(changes)
+
+    assert store.get() == SettingsStore(database).get()
+    assert store.version == 0
+    assert database.fetch_one('SELECT COUNT(*) FROM user_settings')[0] == 0
+
+
+def test_invalid_stored_preferences_do_not_break_reads(database):
+    with database.write() as conn:
+        conn.execute("INSERT INTO user_settings (id, ui_preferences, version) VALUES (1, '\"dark\"', 1)")
+    assert SettingsStore(database).get()['ui_preferences'] == {}
+
+
+def test_parse_detection_mode():
+    names = ['ToolBox', 'OxygenTank', 'FireExtinguisher']
+    assert parse_detection_mode('all', names) is None
+    assert parse_detection_mode('FireExtinguisher, ToolBox', names) == [0, 2]
+    with pytest.raises(ValueError):
+        parse_detection_mode('Wrench', names)
+    with pytest.raises(ValueError):
+        parse_detection_mode(['ToolBox'], names)
+
+
+def test_parse_confidence_threshold():
+    assert parse_confidence_threshold(None) is None
+    assert parse_confidence_threshold('0.25') == 0.25
+    assert parse_confidence_threshold(1) == 1.0
+    for value in ('high', '5.0', 'nan', -0.1, True, [0.5]):
+        with pytest.raises(ValueError):
+            parse_confidence_threshold(value)
@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('websockets')
+
+from streaming import StreamRegistry, StreamStats, _offer, _Rate, make_handler, registry
+
+
+class FakeWebSocket:
+    """Delivers ``messages`` to the handler, then stays open until ``replies`` messages were sent"""
+
+    def __init__(self, path, messages=(), replies=0):
+        self.path = path
+        self.messages = list(messages)
+        self.replies = replies
+        self.sent = []
+        self.closed = None
+
+    async def send(self, message):
+        self.sent.append(json.loads(message))
+
+    async def close(self, code=1000, reason=''):
+        self.closed = (code, reason)
+
+    async def __aiter__(self):
+        for message in self.messages:
+            yield message
+            # Let the processing task pick the frame up before the next one arrives
+            await asyncio.sleep(0.01)
+        for _ in range(500):
+            if len(self.sent) >= self.replies:
+                return
+            await asyncio.sleep(0.01)
+
+
+def serve(websocket, detect=lambda frame, threshold: {'threshold': threshold}):
+    asyncio.run(make_handler(detect)(websocket))
+    return websocket.sent
+
+
+def test_rate_is_smoothed_events_per_second():
+    rate = _Rate(smoothing=0.5)
+    for now in (0.0, 0.1, 0.2):
+        rate.tick(now)
+    assert rate.fps == pytest.approx(10.0)
+
+
+def test_full_queue_drops_the_oldest_frame():
+    frames, stats = asyncio.Queue(maxsize=1), StreamStats('cam')
+    _offer(frames, 'old', stats)
+    _offer(frames, 'new', stats)
+    assert frames.get_nowait() == 'new'
+    assert stats.dropped == 1
+
+
+def test_registry_lists_connected_streams():
+    streams, stats = StreamRegistry(), StreamStats('dock')
+    streams.add(stats)
+    assert [s['stream_id'] for s in streams.snapshot()] == ['dock']
+    streams.remove(stats)
+    assert streams.snapshot() == []
+
+
+def test_frames_without_a_threshold_use_the_stored_setting():
+    sent = serve(FakeWebSocket('/ws/stream/dock', [b'frame'], replies=1))
+
+    assert sent[0]['success']
+    assert sent[0]['results'] == {'threshold': None}
+    assert sent[0]['stream']['stream_id'] == 'dock'
+    assert registry.snapshot() == []
+
+
+def test_threshold_from_the_query_and_settings_messages():
+    websocket = FakeWebSocket('/ws/stream/dock?confidence_threshold=0.3',
+                              [b'frame', json.dumps({'confidence_threshold': 0.7}), b'frame'], replies=2)
+    sent = serve(websocket)
+
+    assert [reply['results']['threshold'] for reply in sent] == [0.3, 0.7]
+
+
+@pytest.mark.parametrize('value', ['high', '5.0', 'nan'])
+def test_invalid_query_threshold_closes_the_stream(value):
+    websocket = FakeWebSocket(f'/ws/stream/dock?confidence_threshold={value}', [b'frame'])
+    sent = serve(websocket)
+
+    assert len(sent) == 1 and not sent[0]['success']
+    assert websocket.closed[0] == 1008
+
+
+def test_invalid_settings_message_keeps_the_previous_threshold():
+    websocket = FakeWebSocket('/ws/stream/dock?confidence_threshold=0.3',
+                              [json.dumps({'confidence_threshold': 5}), b'frame'], replies=2)
+    sent = serve(websocket)
+
+    assert not sent[0]['success']
+    assert sent[1]['results'] == {'threshold': 0.3}
+
+
+def test_unknown_path_is_rejected():
+    websocket = FakeWebSocket('/other')
+    serve(websocket)
+    assert websocket.closed == (1008, 'Unknown path')
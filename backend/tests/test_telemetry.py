@@ -0,0 +1,41 @@
+from telemetry import Histogram, Telemetry
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [1, 2, 1]
+    assert histogram.count == 4
+    assert histogram.sum == 3.05
+    assert histogram.quantiles()['p50'] == 0.5
+
+
+def test_summary_counts_requests_and_errors():
+    telemetry = Telemetry()
+    telemetry.observe('inference', 0.2)
+    telemetry.count_request('POST', '/api/detect', 200)
+    telemetry.count_request('POST', '/api/detect', 500)
+
+    summary = telemetry.summary()
+    assert summary['stages']['inference']['count'] == 1
+    assert summary['requests_total'] == 2
+    assert summary['errors_total'] == 1
+
+
+def test_prometheus_export_types():
+    telemetry = Telemetry(prefix='test')
+    with telemetry.timer('decode'):
+        pass
+    telemetry.observe_batch_size(4)
+
+    text = telemetry.render_prometheus({'queue_depth': 3}, {'cache_hits': 7})
+    lines = text.splitlines()
+    assert '# TYPE test_stage_seconds histogram' in lines
+    assert 'test_stage_seconds_count{stage="decode"} 1' in lines
+    assert 'test_batch_size_bucket{le="4"} 1' in lines
+    assert '# TYPE test_queue_depth gauge' in lines
+    assert 'test_queue_depth 3' in lines
+    assert '# TYPE test_cache_hits_total counter' in lines
+    assert 'test_cache_hits_total 7' in lines
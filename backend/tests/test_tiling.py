@@ -0,0 +1,84 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from tiling import merge_tiles, nms, resolve_mode, tile_windows
+
+
+def test_resolve_mode():
+    assert resolve_mode('full', (4000, 6000, 3), 1920) == 'full'
+    assert resolve_mode('auto', (4000, 6000, 3), 1920) == 'tiled'
+    assert resolve_mode('auto', (480, 640, 3), 1920) == 'full'
+    with pytest.raises(ValueError):
+        resolve_mode('sliced', (480, 640, 3), 1920)
+
+
+def test_small_image_is_a_single_window():
+    assert tile_windows(500, 400, tile_size=640) == [(0, 0, 500, 400)]
+
+
+def test_windows_cover_the_image_and_stay_inside_it():
+    width, height = 1500, 900
+    windows = tile_windows(width, height, tile_size=640, overlap=0.2)
+
+    assert windows[-1] == (0, 0, width, height)
+    tiles = windows[:-1]
+    assert all(x1 - x0 == 640 and y1 - y0 == 640 for x0, y0, x1, y1 in tiles)
+    assert all(0 <= x0 and x1 <= width and 0 <= y0 and y1 <= height for x0, y0, x1, y1 in tiles)
+
+    covered = np.zeros((height, width), dtype=bool)
+    for x0, y0, x1, y1 in tiles:
+        covered[y0:y1, x0:x1] = True
+    assert covered.all()
+
+
+def test_nms_keeps_the_most_confident_overlapping_box():
+    xyxy = np.array([[0, 0, 100, 100], [5, 5, 105, 105], [300, 300, 400, 400]], dtype=np.float32)
+    confidence = np.array([0.6, 0.9, 0.8], dtype=np.float32)
+    class_id = np.zeros(3, dtype=np.int64)
+
+    assert nms(xyxy, confidence, class_id, metric='iou').tolist() == [1, 2]
+
+
+def test_nms_never_suppresses_across_classes():
+    xyxy = np.array([[0, 0, 100, 100], [0, 0, 100, 100]], dtype=np.float32)
+    confidence = np.array([0.9, 0.8], dtype=np.float32)
+    class_id = np.array([0, 1], dtype=np.int64)
+
+    assert nms(xyxy, confidence, class_id).tolist() == [0, 1]
+
+
+def test_ios_suppresses_a_seam_fragment_that_iou_keeps():
+    # A whole object and the sliver of it seen by the neighbouring tile
+    xyxy = np.array([[0, 0, 200, 100], [150, 0, 200, 100]], dtype=np.float32)
+    confidence = np.array([0.9, 0.7], dtype=np.float32)
+    class_id = np.zeros(2, dtype=np.int64)
+
+    assert nms(xyxy, confidence, class_id, metric='iou').tolist() == [0, 1]
+    assert nms(xyxy, confidence, class_id, metric='ios').tolist() == [0]
+
+
+def test_nms_handles_no_boxes_and_rejects_unknown_metrics():
+    empty = np.zeros((0, 4), dtype=np.float32)
+    assert nms(empty, np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)).size == 0
+    with pytest.raises(ValueError):
+        nms(np.ones((1, 4), dtype=np.float32), np.ones(1, dtype=np.float32), np.zeros(1, dtype=np.int64), metric='giou')
+
+
+def test_merge_tiles_shifts_boxes_into_image_coordinates():
+    def columns(boxes, confidences):
+        return {
+            'xyxy': np.array(boxes, dtype=np.float32).reshape(-1, 4),
+            'confidence': np.array(confidences, dtype=np.float32),
+            'class_id': np.zeros(len(confidences), dtype=np.int64)
+        }
+
+    windows = [(0, 0, 640, 640), (512, 0, 1152, 640)]
+    # The same object seen by both tiles, plus one only the second tile sees
+    merged = merge_tiles(
+        [columns([[520, 10, 600, 90]], [0.8]), columns([[8, 10, 88, 90], [300, 300, 350, 350]], [0.9, 0.5])],
+        windows
+    )
+
+    assert merged['confidence'].tolist() == pytest.approx([0.9, 0.5])
+    assert merged['xyxy'].tolist() == [[520, 10, 600, 90], [812, 300, 862, 350]]
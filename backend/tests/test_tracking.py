@@ -0,0 +1,90 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from tracking import IoUTracker, iou_matrix
+
+FRAME = (1920, 1080)
+
+
+def detection(bbox, class_name='ToolBox', confidence=0.8):
+    return {'class': class_name, 'bbox': bbox, 'confidence': confidence}
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+
+    assert iou_matrix(a, b)[0].tolist() == pytest.approx([1.0, 1 / 3, 0.0], abs=1e-6)
+
+
+def test_overlapping_boxes_continue_one_track():
+    tracker = IoUTracker(max_age=5.0, min_hits=2)
+    tracker.update([detection([100, 100, 200, 200], confidence=0.6)], 0.0, FRAME)
+    tracker.update([detection([110, 100, 210, 200], confidence=0.9)], 1.0, FRAME)
+
+    assert len(tracker.tracks) == 1
+    timeline, = tracker.flush()
+    assert timeline['hits'] == 2
+    assert timeline['duration'] == 1.0
+    assert timeline['max_confidence'] == 0.9
+    assert timeline['last_bbox'] == [110, 100, 210, 200]
+
+
+def test_classes_are_tracked_separately():
+    tracker = IoUTracker()
+    tracker.update([detection([100, 100, 200, 200], 'ToolBox')], 0.0, FRAME)
+    tracker.update([detection([100, 100, 200, 200], 'OxygenTank')], 1.0, FRAME)
+
+    assert sorted(track.class_name for track in tracker.tracks) == ['OxygenTank', 'ToolBox']
+
+
+def test_nearby_centroid_matches_without_overlap():
+    tracker = IoUTracker(iou_threshold=0.3, max_centroid_distance=0.1)
+    tracker.update([detection([100, 100, 140, 140])], 0.0, FRAME)
+    # Moved by one box width: no overlap, but close relative to the frame diagonal
+    tracker.update([detection([145, 100, 185, 140])], 1.0, FRAME)
+
+    assert len(tracker.tracks) == 1
+    assert tracker.tracks[0].hits == 2
+
+
+def test_stale_tracks_close_and_noise_is_dropped():
+    tracker = IoUTracker(max_age=2.0, min_hits=2)
+    tracker.update([detection([100, 100, 200, 200]), detection([800, 800, 900, 900])], 0.0, FRAME)
+    tracker.update([detection([100, 100, 200, 200])], 1.0, FRAME)
+
+    closed = tracker.update([], 4.0, FRAME)
+    # The single-hit track expires too, but is not reported
+    assert [timeline['hits'] for timeline in closed] == [2]
+    assert tracker.tracks == []
+
+
+def test_touch_extends_only_tracks_matched_on_the_last_inferred_frame():
+    tracker = IoUTracker(max_age=2.0)
+    tracker.update([detection([100, 100, 200, 200])], 0.0, FRAME)
+    tracker.touch(1.0)
+    tracker.touch(3.0)
+
+    # Kept open by the skipped frames, although the model misses the object once
+    assert tracker.update([], 3.5, FRAME) == []
+    tracker.touch(4.0)
+    assert tracker.tracks[0].last_seen == 3.0
+
+
+def test_removed_object_expires_while_frames_are_skipped():
+    tracker = IoUTracker(max_age=5.0, min_hits=2)
+    tracker.update([detection([100, 100, 200, 200])], 0.0, FRAME)
+    tracker.update([detection([100, 100, 200, 200])], 1.0, FRAME)
+
+    # The object is removed at 2s; the static scene is only inferred every 2s
+    closed = []
+    for step in range(10, 300):
+        timestamp = step / 5
+        if step % 10 == 0:
+            closed += tracker.update([], timestamp, FRAME)
+        else:
+            tracker.touch(timestamp)
+
+    assert [timeline['last_seen'] for timeline in closed] == [1.0]
+    assert tracker.tracks == []
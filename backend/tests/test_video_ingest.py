@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip('cv2')
+
+from video_ingest import check_job_options, check_source
+
+
+def test_check_source_allows_files_inside_the_video_directory(tmp_path):
+    video = tmp_path / 'dock.mp4'
+    video.write_bytes(b'')
+
+    check_source(str(video), str(tmp_path), [])
+    with pytest.raises(ValueError):
+        check_source(str(tmp_path / '..' / 'dock.mp4'), str(tmp_path), [])
+    with pytest.raises(ValueError):
+        check_source(str(tmp_path / 'missing.mp4'), str(tmp_path), [])
+
+
+def test_check_source_only_allows_enabled_schemes(tmp_path):
+    check_source('rtsp://camera.local/stream', str(tmp_path), ['rtsp'])
+    check_source('0', str(tmp_path), ['camera'])
+    with pytest.raises(ValueError):
+        check_source('http://camera.local/stream', str(tmp_path), ['rtsp'])
+    with pytest.raises(ValueError):
+        check_source('0', str(tmp_path), ['rtsp'])
+
+
+def test_check_job_options():
+    check_job_options()
+    check_job_options(frame_stride=3, motion_threshold=0.05, max_skip_seconds=1)
+
+
+@pytest.mark.parametrize('options', [
+    {'frame_stride': 0},
+    {'frame_stride': 2.5},
+    {'frame_stride': '5'},
+    {'frame_stride': True},
+    {'motion_threshold': 1.5},
+    {'motion_threshold': float('nan')},
+    {'max_skip_seconds': 0},
+    {'max_skip_seconds': float('inf')},
+    {'max_skip_seconds': 'soon'}
+])
+def test_check_job_options_rejects_bad_values(options):
+    with pytest.raises(ValueError):
+        check_job_options(**options)
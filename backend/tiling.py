@@ -0,0 +1,93 @@
+"""Sliced inference for high-resolution images.
+
+A large image is cut into overlapping ``tile_size`` windows (plus, optionally,
+the full frame for objects larger than a tile). All windows go through the
+model in one batch and the per-window boxes are shifted back to image
+coordinates and merged with class-aware NMS, so objects cut by a tile seam
+keep only their most confident box.
+"""
+import numpy as np
+
+MODES = ('full', 'tiled', 'auto')
+MERGE_METRICS = ('iou', 'ios')
+
+_EMPTY_INDICES = np.zeros(0, dtype=np.int64)
+
+
+def resolve_mode(mode, shape, auto_min_side):
+    """Resolve 'auto' to 'tiled' when the longest image side is at least ``auto_min_side``"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown detection mode: {mode}, expected one of {', '.join(MODES)}")
+    if mode == 'auto':
+        return 'tiled' if max(shape[:2]) >= auto_min_side else 'full'
+    return mode
+
+
+def _starts(length, tile_size, step):
+    if length <= tile_size:
+        return [0]
+    starts = list(range(0, length - tile_size, step))
+    # The last window is aligned to the edge instead of running past it
+    return starts + [length - tile_size]
+
+
+def tile_windows(width, height, tile_size=640, overlap=0.2, include_full_frame=True):
+    """Return ``(x0, y0, x1, y1)`` windows covering the image with ``overlap`` between neighbours"""
+    step = max(1, int(tile_size * (1 - overlap)))
+    windows = [
+        (x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height))
+        for y0 in _starts(height, tile_size, step)
+        for x0 in _starts(width, tile_size, step)
+    ]
+    if include_full_frame and len(windows) > 1:
+        windows.append((0, 0, width, height))
+    return windows
+
+
+def crop_windows(image, windows):
+    """Slice the windows out of ``image`` as views, without copying pixels"""
+    return [image[y0:y1, x0:x1] for x0, y0, x1, y1 in windows]
+
+
+def nms(xyxy, confidence, class_id, threshold=0.5, metric='ios'):
+    """Greedy class-aware NMS returning kept indices, most confident first.
+
+    ``metric='ios'`` (intersection over the smaller box) also suppresses the
+    partial box of an object cut by a seam, which plain IoU keeps because the
+    fragment is much smaller than the whole.
+    """
+    if not len(confidence):
+        return _EMPTY_INDICES
+    if metric not in MERGE_METRICS:
+        raise ValueError(f"Unknown merge metric: {metric}")
+
+    # Shift each class into its own coordinate range so boxes of different classes never overlap
+    boxes = xyxy + class_id[:, None] * (float(xyxy.max()) + 1)
+    areas = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    order = np.argsort(-confidence, kind='stable')
+    keep = []
+    while order.size:
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        inter = np.prod(np.clip(np.minimum(boxes[i, 2:], boxes[rest, 2:]) - np.maximum(boxes[i, :2], boxes[rest, :2]), 0, None), axis=1)
+        if metric == 'ios':
+            overlap = inter / (np.minimum(areas[i], areas[rest]) + 1e-9)
+        else:
+            overlap = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[overlap <= threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def merge_tiles(columns_list, windows, threshold=0.5, metric='ios'):
+    """Shift per-window columns into image coordinates and merge them with NMS"""
+    offsets = [np.array((x0, y0, x0, y0), dtype=np.float32) for x0, y0, _, _ in windows]
+    xyxy = np.concatenate([columns['xyxy'] + offset for columns, offset in zip(columns_list, offsets)])
+    confidence = np.concatenate([columns['confidence'] for columns in columns_list])
+    class_id = np.concatenate([columns['class_id'] for columns in columns_list])
+
+    keep = nms(xyxy, confidence, class_id, threshold, metric)
+    return {
+        'xyxy': xyxy[keep].astype(np.float32),
+        'confidence': confidence[keep],
+        'class_id': class_id[keep]
+    }
@@ -0,0 +1,126 @@
+"""Lightweight IoU/centroid tracker turning per-frame detections into presence timelines"""
+import itertools
+
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of two (N, 4) and (M, 4) xyxy arrays"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+class Track:
+    def __init__(self, track_id, class_name, bbox, confidence, timestamp):
+        self.track_id = track_id
+        self.class_name = class_name
+        self.bbox = bbox
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.last_matched = timestamp
+        self.hits = 1
+        self.max_confidence = confidence
+
+    def update(self, bbox, confidence, timestamp):
+        self.bbox = bbox
+        self.last_seen = timestamp
+        self.last_matched = timestamp
+        self.hits += 1
+        self.max_confidence = max(self.max_confidence, confidence)
+
+    def as_timeline(self):
+        return {
+            'track_id': self.track_id,
+            'class': self.class_name,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'duration': self.last_seen - self.first_seen,
+            'hits': self.hits,
+            'max_confidence': self.max_confidence,
+            'last_bbox': list(self.bbox)
+        }
+
+
+class IoUTracker:
+    """Greedy same-class matching by IoU, falling back to centroid distance.
+
+    A track whose box is not matched for ``max_age`` seconds is closed and
+    returned by ``update``/``flush`` as a presence timeline entry. Tracks
+    seen in fewer than ``min_hits`` inferred frames are discarded as noise.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_centroid_distance=0.1, max_age=5.0, min_hits=2):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.tracks = []
+        self.last_update = None
+        self._ids = itertools.count(1)
+
+    def update(self, detections, timestamp, frame_size):
+        """Match one frame's detections to tracks and return timelines of closed tracks"""
+        self.last_update = timestamp
+        unmatched = list(range(len(detections)))
+        diagonal = float(np.hypot(*frame_size))
+
+        for class_name in {d['class'] for d in detections}:
+            track_indices = [i for i, t in enumerate(self.tracks) if t.class_name == class_name]
+            det_indices = [i for i in unmatched if detections[i]['class'] == class_name]
+            if not track_indices or not det_indices:
+                continue
+
+            track_boxes = np.array([self.tracks[i].bbox for i in track_indices], dtype=np.float32)
+            det_boxes = np.array([detections[i]['bbox'] for i in det_indices], dtype=np.float32)
+            scores = iou_matrix(track_boxes, det_boxes)
+
+            # Boxes that don't overlap can still match if their centres are close
+            track_centres = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+            det_centres = (det_boxes[:, :2] + det_boxes[:, 2:]) / 2
+            distances = np.linalg.norm(track_centres[:, None] - det_centres[None], axis=2) / diagonal
+            near = (scores < self.iou_threshold) & (distances <= self.max_centroid_distance)
+            scores = np.where(near, self.iou_threshold * (1 - distances / self.max_centroid_distance), scores)
+            scores[(scores < self.iou_threshold) & ~near] = 0
+
+            while scores.max() > 0:
+                ti, di = np.unravel_index(scores.argmax(), scores.shape)
+                detection = detections[det_indices[di]]
+                self.tracks[track_indices[ti]].update(detection['bbox'], detection['confidence'], timestamp)
+                unmatched.remove(det_indices[di])
+                scores[ti, :] = 0
+                scores[:, di] = 0
+
+        for i in unmatched:
+            detection = detections[i]
+            self.tracks.append(Track(next(self._ids), detection['class'], detection['bbox'],
+                                     detection['confidence'], timestamp))
+
+        return self._expire(timestamp)
+
+    def touch(self, timestamp):
+        """Extend the tracks matched on the last inferred frame when a frame was skipped because nothing moved"""
+        # Tracks the model already missed stay unmatched until it runs again, so a removed object still expires
+        for track in self.tracks:
+            if track.last_matched == self.last_update:
+                track.last_seen = timestamp
+
+    def flush(self):
+        """Close every open track"""
+        closed = [t.as_timeline() for t in self.tracks if t.hits >= self.min_hits]
+        self.tracks = []
+        return closed
+
+    def _expire(self, timestamp):
+        closed, open_tracks = [], []
+        for track in self.tracks:
+            if timestamp - track.last_seen > self.max_age:
+                if track.hits >= self.min_hits:
+                    closed.append(track.as_timeline())
+            else:
+                open_tracks.append(track)
+        self.tracks = open_tracks
+        return closed
@@ -0,0 +1,406 @@
+"""Video file and live-feed ingestion with frame skipping and object tracking.
+
+Frames are decoded with OpenCV on a background thread. Only every
+``frame_stride``-th frame is considered, and a considered frame is only sent
+to the detector when it differs enough from the last inferred frame (or when
+``max_skip_seconds`` have passed since then). Detections are linked across
+inferred frames by ``IoUTracker`` and stored as one ``object_presence`` row
+per tracked object instead of one ``detections`` row per frame.
+
+Sources are video file paths, ``rtsp://``/``http://`` URLs (e.g. a local
+MJPEG stand-in) or a camera index such as ``0``.
+
+Usage: python video_ingest.py <source> [--stride N] [--motion-threshold F]
+"""
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+import config
+from tracking import IoUTracker
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+_LIVE_PREFIXES = ('rtsp://', 'rtmp://', 'http://', 'https://')
+
+PRESENCE_SQL = '''
+    INSERT INTO object_presence
+    (source, track_id, class_name, first_seen, last_seen, duration, hits, max_confidence, last_bbox)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def is_live_source(source):
+    return str(source).isdigit() or str(source).startswith(_LIVE_PREFIXES)
+
+
+def check_source(source, source_dir, schemes):
+    """Raise ValueError unless ``source`` is a file inside ``source_dir`` or uses an allowed scheme.
+
+    ``schemes`` lists URL schemes such as ``'rtsp'``, and ``'camera'`` for device indexes.
+    """
+    source = str(source)
+    if source.isdigit():
+        if 'camera' not in schemes:
+            raise ValueError('Camera sources are not enabled')
+        return
+    scheme = urlsplit(source).scheme.lower()
+    # One-letter schemes are Windows drive letters
+    if len(scheme) > 1:
+        if scheme not in schemes:
+            raise ValueError(f"Video source scheme '{scheme}' is not enabled")
+        return
+    path, directory = os.path.realpath(source), os.path.realpath(source_dir)
+    if os.path.commonpath([path, directory]) != directory:
+        raise ValueError(f'Video files must be inside {source_dir}')
+    if not os.path.isfile(path):
+        raise ValueError(f'Video file not found: {source}')
+
+
+def _is_number(value):
+    return not isinstance(value, bool) and isinstance(value, (int, float)) and math.isfinite(value)
+
+
+def check_job_options(frame_stride=None, motion_threshold=None, max_skip_seconds=None):
+    """Raise ValueError unless the given job options are usable; None keeps the configured default"""
+    if frame_stride is not None and (isinstance(frame_stride, bool) or not isinstance(frame_stride, int)
+                                     or frame_stride < 1):
+        raise ValueError('frame_stride must be a positive integer')
+    if motion_threshold is not None and not (_is_number(motion_threshold) and 0 <= motion_threshold <= 1):
+        raise ValueError('motion_threshold must be a fraction of pixels between 0 and 1')
+    if max_skip_seconds is not None and not (_is_number(max_skip_seconds) and max_skip_seconds > 0):
+        raise ValueError('max_skip_seconds must be a positive number of seconds')
+
+
+class FrameReader:
+    """Decode frames on a daemon thread into a bounded queue.
+
+    File sources block the decoder when the queue is full so no frame is
+    lost; live sources drop the oldest queued frame instead, so processing
+    always works on recent frames. Items are ``(index, timestamp, frame)``,
+    timestamps being media time for files and wall-clock time for live feeds.
+    Opening a network source can block for a long time, so it happens in
+    ``open()`` rather than in the constructor.
+    """
+
+    def __init__(self, source, queue_size=4):
+        self.source = source
+        self.live = is_live_source(source)
+        self.capture = None
+        self.fps = 0.0
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self._frames = queue.Queue(maxsize=max(1, queue_size))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='video-reader', daemon=True)
+
+    def open(self):
+        """Open the source and start decoding; raise ValueError if it cannot be opened"""
+        self.capture = cv2.VideoCapture(int(self.source) if str(self.source).isdigit() else str(self.source))
+        if not self.capture.isOpened():
+            raise ValueError(f'Cannot open video source: {self.source}')
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 0.0
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            for index in itertools.count():
+                if self._stop.is_set():
+                    break
+                ok, frame = self.capture.read()
+                if not ok:
+                    break
+                self.frames_read += 1
+                timestamp = time.time() if self.live else self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                self._put((index, timestamp, frame))
+        finally:
+            self.capture.release()
+            self._put(_END)
+
+    def _put(self, item):
+        while not self.live and not self._stop.is_set():
+            try:
+                self._frames.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        while True:
+            try:
+                self._frames.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._frames.get_nowait()
+                    self.frames_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def __iter__(self):
+        while True:
+            item = self._frames.get()
+            if item is _END:
+                return
+            yield item
+
+    def stop(self):
+        self._stop.set()
+
+
+class MotionGate:
+    """Decide whether a frame changed enough since the last inferred frame.
+
+    Frames are compared as blurred, downscaled grayscale images; a frame
+    passes when more than ``threshold`` of its pixels changed by more than
+    ``pixel_delta`` grey levels, or when ``max_skip_seconds`` have passed
+    since the last frame that passed.
+    """
+
+    def __init__(self, threshold=0.01, max_skip_seconds=2.0, width=160, pixel_delta=25):
+        self.threshold = threshold
+        self.max_skip_seconds = max_skip_seconds
+        self.width = width
+        self.pixel_delta = pixel_delta
+        self.reference = None
+        self.reference_time = None
+
+    def _signature(self, frame):
+        height = max(1, round(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame, timestamp):
+        """Return ``(should_infer, changed_fraction)`` and update the reference on a pass"""
+        signature = self._signature(frame)
+        if self.reference is None or self.threshold <= 0:
+            changed = 1.0
+        else:
+            changed = float(np.count_nonzero(cv2.absdiff(signature, self.reference) > self.pixel_delta)) / signature.size
+
+        stale = self.reference_time is None or timestamp - self.reference_time >= self.max_skip_seconds
+        if changed > self.threshold or stale:
+            self.reference = signature
+            self.reference_time = timestamp
+            return True, changed
+        return False, changed
+
+
+class IngestStats:
+    def __init__(self):
+        self.started_at = time.time()
+        self.finished_at = None
+        self.frames_considered = 0
+        self.frames_inferred = 0
+        self.frames_skipped = 0
+        self.tracks_closed = 0
+        self.inference_time = 0.0
+
+    def snapshot(self, reader=None):
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        frames_read = reader.frames_read if reader else 0
+        return {
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'frames_read': frames_read,
+            'frames_dropped': reader.frames_dropped if reader else 0,
+            'frames_considered': self.frames_considered,
+            'frames_inferred': self.frames_inferred,
+            'frames_skipped': self.frames_skipped,
+            'inference_ratio': self.frames_inferred / frames_read if frames_read else 0,
+            'tracks_closed': self.tracks_closed,
+            'read_fps': frames_read / elapsed if elapsed > 0 else 0,
+            'avg_inference_time': self.inference_time / self.frames_inferred if self.frames_inferred else 0
+        }
+
+
+def save_timelines(database, source, timelines):
+    """Insert closed track timelines as ``object_presence`` rows"""
+    if not timelines:
+        return
+    with database.write() as conn:
+        conn.executemany(PRESENCE_SQL, [(
+            str(source), t['track_id'], t['class'], t['first_seen'], t['last_seen'],
+            t['duration'], t['hits'], t['max_confidence'], json.dumps(t['last_bbox'])
+        ) for t in timelines])
+
+
+def ingest(reader, detect, confidence_threshold, tracker, gate, frame_stride=1,
+           on_timelines=None, stop_event=None, stats=None):
+    """Run gated detection and tracking over a ``FrameReader`` until it ends or is stopped.
+
+    ``detect(rgb_image, confidence_threshold)`` returns an API result with
+    ``detections``. Closed timelines are passed to ``on_timelines``.
+    """
+    stats = stats or IngestStats()
+    on_timelines = on_timelines or (lambda timelines: None)
+    frame_stride = max(1, int(frame_stride))
+
+    def emit(timelines):
+        if timelines:
+            stats.tracks_closed += len(timelines)
+            on_timelines(timelines)
+
+    for index, timestamp, frame in reader:
+        if stop_event is not None and stop_event.is_set():
+            reader.stop()
+            break
+        if index % frame_stride:
+            continue
+
+        stats.frames_considered += 1
+        should_infer, _ = gate.check(frame, timestamp)
+        if not should_infer:
+            # Nothing moved, so every object seen on the last inferred frame is still there
+            stats.frames_skipped += 1
+            tracker.touch(timestamp)
+            continue
+
+        start = time.perf_counter()
+        results = detect(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), confidence_threshold)
+        stats.inference_time += time.perf_counter() - start
+        stats.frames_inferred += 1
+        emit(tracker.update(results['detections'], timestamp, (frame.shape[1], frame.shape[0])))
+
+    emit(tracker.flush())
+    stats.finished_at = time.time()
+    return stats
+
+
+def make_tracker():
+    return IoUTracker(
+        iou_threshold=config.TRACK_IOU_THRESHOLD,
+        max_centroid_distance=config.TRACK_MAX_CENTROID_DISTANCE,
+        max_age=config.TRACK_MAX_AGE_SECONDS,
+        min_hits=config.TRACK_MIN_HITS
+    )
+
+
+def make_gate(motion_threshold=None, max_skip_seconds=None):
+    return MotionGate(
+        threshold=config.VIDEO_MOTION_THRESHOLD if motion_threshold is None else motion_threshold,
+        max_skip_seconds=config.VIDEO_MAX_SKIP_SECONDS if max_skip_seconds is None else max_skip_seconds
+    )
+
+
+class VideoJobManager:
+    """Background ingestion jobs started from the HTTP API"""
+
+    def __init__(self, detect, database, max_jobs=4):
+        self.detect = detect
+        self.database = database
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+
+    def start(self, source, confidence_threshold=0.5, frame_stride=None, motion_threshold=None,
+              max_skip_seconds=None):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job['state'] == 'running')
+            if running >= self.max_jobs:
+                raise RuntimeError(f'Too many running video jobs, maximum is {self.max_jobs}')
+
+        reader = FrameReader(source, config.VIDEO_QUEUE_SIZE)
+        job = {
+            'id': next(self._ids),
+            'source': str(source),
+            'state': 'running',
+            'error': None,
+            'frame_stride': frame_stride or config.VIDEO_FRAME_STRIDE,
+            'confidence_threshold': confidence_threshold,
+            'reader': reader,
+            'stats': IngestStats(),
+            'stop': threading.Event()
+        }
+        gate = make_gate(motion_threshold, max_skip_seconds)
+
+        def run():
+            try:
+                reader.open()
+                ingest(reader, self.detect, confidence_threshold, make_tracker(), gate,
+                       frame_stride=job['frame_stride'],
+                       on_timelines=lambda timelines: save_timelines(self.database, source, timelines),
+                       stop_event=job['stop'], stats=job['stats'])
+                job['state'] = 'stopped' if job['stop'].is_set() else 'finished'
+            except Exception as e:
+                logger.exception('Video ingestion failed', extra={'fields': {'source': str(source)}})
+                reader.stop()
+                job.update(state='failed', error=str(e))
+            logger.info('Video ingestion ended', extra={'fields': {
+                'job': job['id'], 'state': job['state'], **job['stats'].snapshot(reader)
+            }})
+
+        with self._lock:
+            self._jobs[job['id']] = job
+        threading.Thread(target=run, name=f"video-job-{job['id']}", daemon=True).start()
+        return self.describe(job)
+
+    def stop(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job['stop'].set()
+        job['reader'].stop()
+        return self.describe(job)
+
+    def describe(self, job):
+        return {
+            'id': job['id'],
+            'source': job['source'],
+            'state': job['state'],
+            'error': job['error'],
+            'frame_stride': job['frame_stride'],
+            'confidence_threshold': job['confidence_threshold'],
+            'stats': job['stats'].snapshot(job['reader'])
+        }
+
+    def snapshot(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [self.describe(job) for job in jobs]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ingest a video file or live feed into presence timelines')
+    parser.add_argument('source', help='Video file, rtsp:// or http:// URL, or camera index')
+    parser.add_argument('--confidence', type=float, default=0.5)
+    parser.add_argument('--stride', type=int, default=config.VIDEO_FRAME_STRIDE, help='Consider every Nth frame')
+    parser.add_argument('--motion-threshold', type=float, default=config.VIDEO_MOTION_THRESHOLD,
+                        help='Changed-pixel fraction that triggers inference, 0 infers every considered frame')
+    parser.add_argument('--max-skip-seconds', type=float, default=config.VIDEO_MAX_SKIP_SECONDS)
+    parser.add_argument('--db', default=config.DATABASE_URL, help='Database URL or SQLite path')
+    parser.add_argument('--dry-run', action='store_true', help='Print timelines instead of storing them')
+    args = parser.parse_args()
+
+    from app import detect_frame
+    from database import open_database
+
+    database = open_database(args.db)
+
+    def report(timelines):
+        for t in timelines:
+            print(f"  - #{t['track_id']} {t['class']}: {t['first_seen']:.1f}s → {t['last_seen']:.1f}s "
+                  f"({t['hits']} hits, max conf {t['max_confidence']:.2f})")
+        if not args.dry_run:
+            save_timelines(database, args.source, timelines)
+
+    print(f"🎥 Ingesting {args.source} (stride {args.stride}, motion threshold {args.motion_threshold})")
+    reader = FrameReader(args.source, config.VIDEO_QUEUE_SIZE).open()
+    stats = ingest(reader, detect_frame, args.confidence, make_tracker(),
+                   make_gate(args.motion_threshold, args.max_skip_seconds),
+                   frame_stride=args.stride, on_timelines=report)
+    summary = stats.snapshot(reader)
+    print(f"✅ {summary['frames_read']} frames read, {summary['frames_inferred']} inferred "
+          f"({summary['inference_ratio']:.1%}), {summary['tracks_closed']} presence timelines")
@@ -0,0 +1,218 @@
+"""Pool of inference worker processes, each holding its own model copy"""
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+
+def _worker_main(worker_id, kind, weights, options, warmup, tasks, results):
+    """Load the model and serve predict tasks until a ``None`` sentinel arrives"""
+    # Pin math libraries before they are imported so workers don't oversubscribe cores
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(options['threads'])
+
+    from inference_backends import load_backend_with_fallback, warm_up
+
+    try:
+        backend = load_backend_with_fallback(kind, weights, **options)
+        warm_up(backend, **warmup)
+    except Exception as e:
+        results.put(('failed', worker_id, None, repr(e)))
+        return
+    results.put(('ready', worker_id, None, {
+        'names': backend.names, 'identity': backend.identity, 'kind': backend.kind, 'pid': os.getpid()
+    }))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, images, conf, classes = task
+        results.put(('started', worker_id, task_id, None))
+        try:
+            results.put(('result', worker_id, task_id, backend.predict(images, conf, classes)))
+        except Exception as e:
+            results.put(('error', worker_id, task_id, repr(e)))
+
+
+class InferencePool:
+    """Dispatch predict calls to N worker processes through a shared task queue.
+
+    The pool exposes the same ``names``/``identity``/``kind``/``predict``
+    interface as a single backend, so the detector can use either. Workers
+    pull tasks from one queue, which balances load; a collector thread
+    resolves futures from the result queue and a monitor thread restarts
+    workers that die, failing the task they were running.
+    """
+
+    def __init__(self, workers, kind, weights, imgsz=640, threads=0, artifact=None, fallback=None,
+                 warmup_runs=0, warmup_batch_size=1, start_timeout=300, monitor_interval=1.0):
+        self.kind = kind
+        self.weights = weights
+        self.size = max(1, int(workers))
+        threads = threads or max(1, (os.cpu_count() or 1) // self.size)
+        self.options = {'imgsz': imgsz, 'threads': threads, 'artifact': artifact, 'fallback': fallback}
+        # Each worker warms its own model before reporting ready
+        self.warmup = {'runs': warmup_runs, 'batch_size': warmup_batch_size}
+        self.monitor_interval = monitor_interval
+
+        self._ctx = multiprocessing.get_context('spawn')
+        self._tasks = self._ctx.Queue()
+        # SimpleQueue writes synchronously, so a 'started' message is never lost if the worker crashes
+        self._results = self._ctx.SimpleQueue()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._task_ids = itertools.count()
+        self._closing = False
+        self._ready = threading.Condition(self._lock)
+        self._workers = {}
+
+        self.names = {}
+        self.identity = None
+
+        for worker_id in range(self.size):
+            self._start_worker(worker_id)
+
+        self._collector = threading.Thread(target=self._collect, name='inference-pool-collector', daemon=True)
+        self._collector.start()
+        self._wait_ready(start_timeout)
+        self._monitor = threading.Thread(target=self._watch, name='inference-pool-monitor', daemon=True)
+        self._monitor.start()
+
+    def _start_worker(self, worker_id):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.kind, self.weights, self.options, self.warmup, self._tasks, self._results),
+            name=f'inference-worker-{worker_id}',
+            daemon=True
+        )
+        process.start()
+        previous = self._workers.get(worker_id, {})
+        self._workers[worker_id] = {
+            'process': process,
+            'state': 'starting',
+            'started_at': time.time(),
+            'task': None,
+            'completed': previous.get('completed', 0),
+            'errors': previous.get('errors', 0),
+            'restarts': previous.get('restarts', -1) + 1,
+            'last_active': previous.get('last_active')
+        }
+
+    def _wait_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        with self._ready:
+            while not any(w['state'] == 'ready' for w in self._workers.values()):
+                if all(w['state'] == 'failed' for w in self._workers.values()):
+                    raise RuntimeError('All inference workers failed to start')
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f'No inference worker became ready within {timeout}s')
+                self._ready.wait(remaining)
+        logger.info('Inference pool ready', extra={'fields': {
+            'workers': self.size, 'threads_per_worker': self.options['threads'], 'backend': self.kind
+        }})
+
+    def submit(self, images, conf, classes=None):
+        """Queue a predict task and return a future for its columns"""
+        future = Future()
+        task_id = next(self._task_ids)
+        with self._lock:
+            if self._closing:
+                raise RuntimeError('Inference pool is shut down')
+            self._pending[task_id] = future
+        self._tasks.put((task_id, images, conf, classes))
+        return future
+
+    def predict(self, images, conf, classes=None):
+        return self.submit(images, conf, classes).result()
+
+    def _collect(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                return
+            kind, worker_id, task_id, payload = message
+            with self._lock:
+                worker = self._workers[worker_id]
+                if kind == 'ready':
+                    worker.update(state='ready', pid=payload['pid'])
+                    self.names = self.names or payload['names']
+                    self.identity = self.identity or f"pool:{payload['identity']}"
+                    self._ready.notify_all()
+                elif kind == 'failed':
+                    worker.update(state='failed', error=payload)
+                    self._ready.notify_all()
+                elif kind == 'started':
+                    worker['task'] = task_id
+                else:
+                    worker['task'] = None
+                    worker['last_active'] = time.time()
+                    future = self._pending.pop(task_id, None)
+                    if kind == 'result':
+                        worker['completed'] += 1
+                    else:
+                        worker['errors'] += 1
+            if kind == 'result' and future is not None:
+                future.set_result(payload)
+            elif kind == 'error' and future is not None:
+                future.set_exception(RuntimeError(f'Inference worker {worker_id} failed: {payload}'))
+
+    def _watch(self):
+        while not self._closing:
+            time.sleep(self.monitor_interval)
+            with self._lock:
+                if self._closing:
+                    return
+                dead = [(worker_id, w) for worker_id, w in self._workers.items()
+                        if w['state'] == 'ready' and not w['process'].is_alive()]
+                lost = [self._pending.pop(w['task'], None) for _, w in dead if w['task'] is not None]
+                for worker_id, worker in dead:
+                    logger.error('Inference worker died, restarting', extra={'fields': {
+                        'worker': worker_id, 'exitcode': worker['process'].exitcode
+                    }})
+                    self._start_worker(worker_id)
+            for future in lost:
+                if future is not None:
+                    future.set_exception(RuntimeError('Inference worker died while running the task'))
+
+    def health(self):
+        """Per-worker state, pid, current task and counters"""
+        with self._lock:
+            return [{
+                'worker': worker_id,
+                'state': w['state'] if w['process'].is_alive() or w['state'] == 'failed' else 'dead',
+                'pid': w['process'].pid,
+                'busy': w['task'] is not None,
+                'completed': w['completed'],
+                'errors': w['errors'],
+                'restarts': w['restarts'],
+                'uptime': time.time() - w['started_at'],
+                'last_active': w['last_active']
+            } for worker_id, w in sorted(self._workers.items())]
+
+    def close(self, timeout=10):
+        """Let workers finish queued tasks, then stop them"""
+        with self._lock:
+            if self._closing:
+                return
+            self._closing = True
+        for _ in self._workers:
+            self._tasks.put(None)
+        deadline = time.monotonic() + timeout
+        for worker in self._workers.values():
+            worker['process'].join(max(0.0, deadline - time.monotonic()))
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+        self._results.put(None)
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for future in pending:
+            future.set_exception(RuntimeError('Inference pool is shut down'))
@@ -121,12 +121,12 @@ export class DetectorComponent implements OnInit {
     if (!this.selectedFile) return;
 
     try {
-      const base64Image = await this.fileToBase64(this.selectedFile);
+      // Send the file as multipart so the image is not base64-inflated
+      const formData = new FormData();
+      formData.append('image', this.selectedFile);
+      formData.append('confidence_threshold', '0.05'); // Always use 5% threshold
       
-      const response: any = await this.http.post('http://127.0.0.1:5000/api/detect', {
-        image: base64Image,
-        confidence_threshold: 0.05 // Always use 5% threshold
-      }).toPromise();
+      const response: any = await this.http.post('http://127.0.0.1:5000/api/detect', formData).toPromise();
 
       if (response.success) {
         console.log('Detection response:', response.results);
@@ -337,15 +337,6 @@ export class DetectorComponent implements OnInit {
     }
   }
 
-  fileToBase64(file: File): Promise<string> {
-    return new Promise((resolve, reject) => {
-      const reader = new FileReader();
-      reader.readAsDataURL(file);
-      reader.onload = () => resolve(reader.result as string);
-      reader.onerror = error => reject(error);
-    });
-  }
-
   loadSettings() {
     this.http.get('http://127.0.0.1:5000/api/settings').subscribe((response: any) => {
       if (response.success) {
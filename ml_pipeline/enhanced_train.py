@@ -1,4 +1,5 @@
 import os
+import sys
 import yaml
 from ultralytics import YOLO
 from pathlib import Path
@@ -83,8 +84,9 @@ def train_space_station_model():
         model_path = results.save_dir / "weights" / "best.pt"
         print(f"📁 Best model saved at: {model_path}")
         
-        # Update backend configuration
-        update_backend_model_path(str(model_path))
+        # Publish to the backend model registry
+        metrics = getattr(results, 'results_dict', None) or {}
+        register_trained_model(str(model_path), {k: float(v) for k, v in metrics.items()})
         
         return str(model_path)
         
@@ -92,24 +94,21 @@ def train_space_station_model():
         print(f"❌ Training failed: {e}")
         return None
 
-def update_backend_model_path(model_path: str):
-    """Update backend to use the trained model"""
-    backend_app_path = Path("../backend/app.py")
+def register_trained_model(model_path: str, metrics=None):
+    """Register the trained weights as a new version in the backend model registry"""
+    backend_dir = Path(__file__).resolve().parent.parent / "backend"
+    sys.path.insert(0, str(backend_dir))
+    import config
+    from model_registry import ModelRegistry
     
-    if backend_app_path.exists():
-        with open(backend_app_path, 'r') as f:
-            content = f.read()
-        
-        # Update the model path in the backend
-        updated_content = content.replace(
-            'model_path="runs/train/space_station_latest/weights/best.pt"',
-            f'model_path="{model_path}"'
-        )
-        
-        with open(backend_app_path, 'w') as f:
-            f.write(updated_content)
-        
-        print(f"✅ Backend updated to use trained model: {model_path}")
+    entry = ModelRegistry(config.MODEL_REGISTRY_DIR).register(model_path, metrics=metrics)
+    print(f"✅ Registered trained model as {entry['version']}")
+    print("🔄 Deploy it to the running backend without a restart:")
+    print(f"   curl -X POST http://127.0.0.1:5000/api/admin/models/deploy "
+          f"-H 'Content-Type: application/json' -H \"X-Admin-Token: $ADMIN_TOKEN\" -d '{{\"active\": \"{entry['version']}\"}}'")
+    print(f"   or try it on 10% of traffic first with "
+          f"'{{\"candidate\": \"{entry['version']}\", \"split\": 0.1}}'")
+    return entry
 
 if __name__ == "__main__":
     print("🎯 Space Station Object Detection Model Training")
@@ -127,6 +126,6 @@ if __name__ == "__main__":
     if model_path:
         print("\n Training completed!")
         print(f"📁 Model saved at: {model_path}")
-        print("🔄 Restart your backend to use the trained model")
+        print("🔄 Deploy the registered version with POST /api/admin/models/deploy")
     else:
         print("\n❌ Training failed. Check your dataset and try again.")
\ No newline at end of file
@@ -0,0 +1,228 @@
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "backend"))
+
+from database import open_database  # noqa: E402
+from inference_backends import OnnxRuntimeBackend, export_model  # noqa: E402
+from persistence import record_training_result  # noqa: E402
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp')
+# Safety-critical classes whose recall must not regress after quantization
+SAFETY_CLASSES = ('FireExtinguisher', 'OxygenTank')
+
+
+def resolve_split_dir(data_yaml: Path, split: str) -> Path:
+    """Resolve the image directory of a split the way ultralytics does"""
+    with open(data_yaml, 'r') as f:
+        data_config = yaml.safe_load(f)
+
+    root = Path(data_config.get('path') or data_yaml.parent)
+    if not root.is_absolute():
+        root = data_yaml.parent / root
+    split_dir = Path(data_config[split])
+    return split_dir if split_dir.is_absolute() else root / split_dir
+
+
+def sample_images(image_dir: Path, count: int, seed: int = 0):
+    """Pick a reproducible random subset of images for calibration"""
+    paths = sorted(p for p in image_dir.rglob('*') if p.suffix.lower() in IMAGE_SUFFIXES)
+    random.Random(seed).shuffle(paths)
+    return paths[:count]
+
+
+def load_rgb(path: Path):
+    return cv2.cvtColor(cv2.imread(str(path)), cv2.COLOR_BGR2RGB)
+
+
+class CalibrationReader:
+    """Feed letterboxed calibration images to ONNX Runtime, preprocessed like the backend"""
+
+    def __init__(self, paths, input_name, preprocessor):
+        self.paths = iter(paths)
+        self.input_name = input_name
+        self.preprocessor = preprocessor
+
+    def get_next(self):
+        path = next(self.paths, None)
+        if path is None:
+            return None
+        batch, _ = self.preprocessor.prepare([load_rgb(path)])
+        return {self.input_name: batch}
+
+
+def head_nodes_to_exclude(model):
+    """Keep the Detect head's box decoding (DFL, concat, sigmoid) in FP32"""
+    indices = [int(m.group(1)) for m in (re.match(r'/model\.(\d+)/', n.name) for n in model.graph.node) if m]
+    if not indices:
+        return []
+    head_prefix = f"/model.{max(indices)}/"
+    decode_ops = {'Softmax', 'Sigmoid', 'Concat', 'Split', 'Sub', 'Add', 'Div', 'Mul', 'Transpose', 'Reshape'}
+    return [n.name for n in model.graph.node if n.name.startswith(head_prefix) and n.op_type in decode_ops]
+
+
+def quantize_int8(fp32_path: Path, int8_path: Path, calibration_paths, imgsz: int, per_channel: bool = True):
+    """Statically quantize an ONNX model to INT8 (QDQ) with calibration images"""
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    prepared_path = fp32_path.with_name(fp32_path.stem + '_prep.onnx')
+    quant_pre_process(str(fp32_path), str(prepared_path))
+
+    model = onnx.load(str(prepared_path))
+    reader = CalibrationReader(
+        calibration_paths,
+        model.graph.input[0].name,
+        OnnxRuntimeBackend(fp32_path, imgsz=imgsz)
+    )
+    quantize_static(
+        str(prepared_path),
+        str(int8_path),
+        reader,
+        quant_format=QuantFormat.QDQ,
+        per_channel=per_channel,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=CalibrationMethod.MinMax,
+        nodes_to_exclude=head_nodes_to_exclude(model)
+    )
+    os.remove(prepared_path)
+
+    # Carry over the ultralytics metadata (names, imgsz) the backend reads
+    source = onnx.load(str(fp32_path))
+    quantized = onnx.load(str(int8_path))
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, str(int8_path))
+    return int8_path
+
+
+def evaluate(model_path: Path, data_yaml: Path, imgsz: int):
+    """Validate a model with ultralytics and return overall and per-class metrics"""
+    from ultralytics import YOLO
+
+    metrics = YOLO(str(model_path), task='detect').val(data=str(data_yaml), imgsz=imgsz, batch=1,
+                                                       device='cpu', plots=False, verbose=False)
+    per_class = {}
+    for i, class_index in enumerate(metrics.box.ap_class_index):
+        precision, recall, ap50, ap = metrics.box.class_result(i)
+        per_class[metrics.names[int(class_index)]] = {
+            'precision': float(precision), 'recall': float(recall), 'mAP_50': float(ap50), 'mAP_50_95': float(ap)
+        }
+    return {
+        'mAP_50': float(metrics.box.map50),
+        'mAP_50_95': float(metrics.box.map),
+        'precision': float(metrics.box.mp),
+        'recall': float(metrics.box.mr),
+        'per_class': per_class
+    }
+
+
+def measure_latency(model_path: Path, image_paths, imgsz: int, threads: int = 0, warmup: int = 3):
+    """Median and p95 single-image latency through the ONNX Runtime backend"""
+    backend = OnnxRuntimeBackend(model_path, imgsz=imgsz, threads=threads)
+    images = [load_rgb(p) for p in image_paths]
+    for image in images[:warmup]:
+        backend.predict([image], 0.25)
+
+    timings = []
+    for image in images:
+        start = time.perf_counter()
+        backend.predict([image], 0.25)
+        timings.append(time.perf_counter() - start)
+    return {'p50': float(np.percentile(timings, 50)), 'p95': float(np.percentile(timings, 95))}
+
+
+def record_report(db_path: Path, int8_path: Path, report: dict, quantization_time: float):
+    """Store the INT8 result in training_results with the full comparison as its config.
+
+    The ``int8_ptq`` type keeps the evaluation out of /api/metrics, which reports the deployed model.
+    """
+    database = open_database(str(db_path))
+    try:
+        record_training_result(database, str(int8_path), None, report['int8'], quantization_time,
+                               {'type': 'int8_ptq', **report})
+    finally:
+        database.close()
+
+
+def run_quantization(weights: Path, data_yaml: Path, imgsz: int, calibration_size: int, split: str,
+                     latency_images: int, db_path: Path, max_recall_drop: float):
+    print(f"✅ Quantizing {weights} with data from {data_yaml}")
+    start = time.perf_counter()
+
+    fp32_path = Path(export_model(str(weights), 'onnxruntime', imgsz))
+    calibration_paths = sample_images(resolve_split_dir(data_yaml, split), calibration_size)
+    if not calibration_paths:
+        print(f"❌ No calibration images found in the '{split}' split")
+        return None
+    print(f"📊 Calibrating on {len(calibration_paths)} '{split}' images")
+
+    int8_path = quantize_int8(fp32_path, weights.with_name(weights.stem + '_int8.onnx'), calibration_paths, imgsz)
+    quantization_time = time.perf_counter() - start
+    print(f"📁 INT8 model saved at: {int8_path}")
+
+    latency_paths = sample_images(resolve_split_dir(data_yaml, 'val'), latency_images, seed=1)
+    report = {}
+    for name, path in (('fp32', fp32_path), ('int8', int8_path)):
+        report[name] = {
+            **evaluate(path, data_yaml, imgsz),
+            'latency': measure_latency(path, latency_paths, imgsz),
+            'size_mb': os.path.getsize(path) / 1e6,
+            'path': str(path)
+        }
+
+    report['speedup_p50'] = report['fp32']['latency']['p50'] / max(report['int8']['latency']['p50'], 1e-9)
+    report['recall_drop'] = {
+        cls: report['fp32']['per_class'].get(cls, {}).get('recall', 0) - report['int8']['per_class'].get(cls, {}).get('recall', 0)
+        for cls in SAFETY_CLASSES
+    }
+    report['safety_ok'] = all(drop <= max_recall_drop for drop in report['recall_drop'].values())
+
+    print("📋 Accuracy vs latency:")
+    for name in ('fp32', 'int8'):
+        r = report[name]
+        print(f"  - {name}: mAP50={r['mAP_50']:.3f} mAP50-95={r['mAP_50_95']:.3f} "
+              f"p50={r['latency']['p50'] * 1000:.1f}ms size={r['size_mb']:.1f}MB")
+    print(f"  - speedup: {report['speedup_p50']:.2f}x, safety recall drop: {report['recall_drop']}")
+
+    if db_path.exists():
+        record_report(db_path, int8_path, report, quantization_time)
+        print(f"✅ Report stored in training_results ({db_path})")
+    else:
+        print(f"⚠️  Database not found at {db_path}, report not stored")
+
+    if not report['safety_ok']:
+        print(f"❌ Recall on {', '.join(SAFETY_CLASSES)} dropped by more than {max_recall_drop}, do not deploy the INT8 model")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='INT8 post-training quantization for the detector')
+    parser.add_argument('--weights', type=Path, required=True, help='Trained best.pt')
+    parser.add_argument('--data', type=Path, required=True, help='data.yaml or yolo_params.yaml')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--calibration-size', type=int, default=200, help='Number of calibration images')
+    parser.add_argument('--split', default='train', help='Split to draw calibration images from')
+    parser.add_argument('--latency-images', type=int, default=50, help='Validation images used for timing')
+    parser.add_argument('--db', type=Path, default=REPO_ROOT / 'backend' / 'database' / 'space_station.db')
+    parser.add_argument('--max-recall-drop', type=float, default=0.02,
+                        help='Largest tolerated recall drop on safety-critical classes')
+    args = parser.parse_args()
+
+    report = run_quantization(args.weights, args.data, args.imgsz, args.calibration_size, args.split,
+                              args.latency_images, args.db, args.max_recall_drop)
+    if report is None or not report['safety_ok']:
+        sys.exit(1)
+    print(f"\n🔄 Serve it with INFERENCE_BACKEND=onnxruntime INFERENCE_ARTIFACT={args.weights.with_name(args.weights.stem + '_int8.onnx')}")
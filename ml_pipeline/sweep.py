@@ -0,0 +1,294 @@
+"""Hyperparameter sweeps over train_fixed.py, run as concurrent CPU trials.
+
+Trials come from a search space by grid, random sampling or successive
+halving. They run in a process pool sized to the available cores, and each
+trial gets an equal share of the threads, so trials do not oversubscribe the
+machine. Every finished trial is stored in ``training_results`` as a
+``sweep_trial``, which /api/metrics does not report as the deployed model.
+The summary ranks configs by mAP50 per CPU-hour.
+
+A search space maps a train_fixed.py argument to a list of values, or to a
+``{low, high, log}`` range for random sampling and halving:
+
+    lr0: {low: 0.0001, high: 0.01, log: true}
+    optimizer: [AdamW, SGD]
+
+Usage:
+    python ml_pipeline/sweep.py --strategy random --trials 8 --epochs 10
+    python ml_pipeline/sweep.py --strategy halving --trials 16 --min-epochs 2 --max-epochs 18 --eta 3
+    python ml_pipeline/sweep.py --strategy grid --space space.yaml
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "backend"))
+
+from database import open_database  # noqa: E402
+from persistence import record_training_result  # noqa: E402
+
+SEARCH_KEYS = ('epochs', 'mosaic', 'optimizer', 'momentum', 'lr0', 'lrf', 'single_cls')
+DEFAULT_SPACE = {
+    'lr0': {'low': 1e-4, 'high': 1e-2, 'log': True},
+    'lrf': {'low': 1e-4, 'high': 1e-1, 'log': True},
+    'momentum': {'low': 0.2, 'high': 0.95},
+    'mosaic': [0.0, 0.5, 1.0],
+    'optimizer': ['AdamW', 'SGD']
+}
+THREAD_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+METRIC_KEYS = {
+    'mAP_50': 'metrics/mAP50(B)',
+    'mAP_50_95': 'metrics/mAP50-95(B)',
+    'precision': 'metrics/precision(B)',
+    'recall': 'metrics/recall(B)'
+}
+
+
+def load_space(path):
+    """Read a search space from YAML (or JSON) and check its keys"""
+    if path is None:
+        return dict(DEFAULT_SPACE)
+    with open(path, 'r') as f:
+        space = yaml.safe_load(f) or {}
+    unknown = set(space) - set(SEARCH_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown search keys: {', '.join(sorted(unknown))}; expected {', '.join(SEARCH_KEYS)}")
+    return space
+
+
+def grid(space):
+    """Every combination of the listed values"""
+    ranges = [key for key, values in space.items() if not isinstance(values, list)]
+    if ranges:
+        raise ValueError(f"Grid search needs lists of values, got ranges for: {', '.join(ranges)}")
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+
+def sample(space, rng):
+    """Draw one config: a choice from each list, a uniform (or log-uniform) value from each range"""
+    params = {}
+    for key, values in space.items():
+        if isinstance(values, list):
+            params[key] = rng.choice(values)
+        elif values.get('log'):
+            params[key] = math.exp(rng.uniform(math.log(values['low']), math.log(values['high'])))
+        else:
+            params[key] = rng.uniform(values['low'], values['high'])
+    return params
+
+
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def init_worker(threads):
+    # Set before torch is imported in the worker so BLAS pools get the same size
+    for var in THREAD_VARS:
+        os.environ[var] = str(threads)
+
+
+def run_trial(job, threads, project):
+    """Train one trial in a pool worker and return its metrics"""
+    import torch
+
+    torch.set_num_threads(threads)
+    sys.path.insert(0, str(REPO_ROOT))
+    from train_fixed import train
+
+    name = f"trial_{job['trial']}_r{job['rung']}"
+    result = {**job, 'name': name, 'threads': threads, 'status': 'ok', 'error': None}
+    start = time.perf_counter()
+    try:
+        model = train(epochs=job['epochs'], weights=job.get('weights'), workers=min(2, threads),
+                      project=str(project), name=name, **job['params'])
+        trainer = model.trainer
+        result.update({key: float(trainer.metrics.get(metric, 0.0)) for key, metric in METRIC_KEYS.items()})
+        result['best'] = str(trainer.best) if Path(trainer.best).exists() else str(trainer.last)
+        result['last'] = str(trainer.last)
+    except Exception as e:
+        result.update(status='failed', error=repr(e), **{key: None for key in METRIC_KEYS})
+    result['training_time'] = time.perf_counter() - start
+    return result
+
+
+def record_trial(database, sweep_id, result):
+    """Store one trial in training_results with its params and cost as the config.
+
+    Failed trials keep NULL metrics. The ``sweep_trial`` type keeps trials out of
+    /api/metrics, which reports the deployed model.
+    """
+    record_training_result(database, result.get('best'), result['total_epochs'], result, result['training_time'], {
+        'type': 'sweep_trial',
+        'sweep_id': sweep_id,
+        'trial': result['trial'],
+        'rung': result['rung'],
+        'params': result['params'],
+        'threads': result['threads'],
+        'cpu_hours': result['cpu_hours'],
+        'status': result['status'],
+        'error': result['error']
+    })
+
+
+class Sweep:
+    def __init__(self, parallel, threads, project: Path, db_path: Path, sweep_id):
+        self.parallel = parallel
+        self.threads = threads
+        self.project = project
+        self.database = open_database(str(db_path)) if db_path.exists() else None
+        self.sweep_id = sweep_id
+        self.results = {}
+        # spawn keeps torch thread pools from being forked half-initialized
+        self.executor = ProcessPoolExecutor(parallel, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=init_worker, initargs=(threads,))
+
+    def run_rung(self, jobs):
+        """Run a set of trials concurrently and return their results as they were submitted"""
+        futures = {self.executor.submit(run_trial, job, self.threads, self.project): job for job in jobs}
+        finished = {}
+        for future in as_completed(futures):
+            result = future.result()
+            previous = self.results.get(result['trial'], {})
+            result['total_epochs'] = previous.get('total_epochs', 0) + result['epochs']
+            result['cpu_hours'] = previous.get('cpu_hours', 0.0) + result['training_time'] * self.threads / 3600
+            self.results[result['trial']] = finished[result['trial']] = result
+            if self.database is not None:
+                record_trial(self.database, self.sweep_id, result)
+
+            if result['status'] == 'ok':
+                print(f"✅ trial {result['trial']} rung {result['rung']} ({result['total_epochs']} epochs): "
+                      f"mAP50={result['mAP_50']:.3f} in {result['training_time'] / 60:.1f} min")
+            else:
+                print(f"❌ trial {result['trial']} rung {result['rung']} failed after "
+                      f"{result['training_time'] / 60:.1f} min: {result['error']}")
+        return [finished[job['trial']] for job in jobs]
+
+    def run(self, configs, epochs):
+        # A grid over epochs sets them per config
+        jobs = [{'trial': i, 'rung': 0, 'epochs': params.get('epochs', epochs),
+                 'params': {k: v for k, v in params.items() if k != 'epochs'}} for i, params in enumerate(configs)]
+        self.run_rung(jobs)
+
+    def run_halving(self, configs, min_epochs, max_epochs, eta):
+        """Successive halving: train all configs briefly, continue the best 1/eta for eta times the epochs"""
+        jobs = [{'trial': i, 'rung': 0, 'epochs': min_epochs, 'params': params} for i, params in enumerate(configs)]
+        budget = min_epochs
+        rung = 0
+        while jobs:
+            results = self.run_rung(jobs)
+            if budget >= max_epochs:
+                break
+            ranked = sorted((r for r in results if r['status'] == 'ok'), key=lambda r: r['mAP_50'], reverse=True)
+            survivors = ranked[:max(1, len(ranked) // eta)] if ranked else []
+            print(f"📊 Rung {rung}: keeping {len(survivors)} of {len(results)} trials")
+
+            next_budget = min(max_epochs, budget * eta)
+            rung += 1
+            # Survivors continue from their last checkpoint for the extra epochs only
+            jobs = [{'trial': r['trial'], 'rung': rung, 'epochs': next_budget - budget,
+                     'params': r['params'], 'weights': r['last']} for r in survivors]
+            budget = next_budget
+
+    def summary(self, top):
+        trials = []
+        for result in self.results.values():
+            if result['status'] != 'ok':
+                continue
+            trials.append({
+                'trial': result['trial'],
+                'params': result['params'],
+                'epochs': result['total_epochs'],
+                'mAP_50': result['mAP_50'],
+                'mAP_50_95': result['mAP_50_95'],
+                'cpu_hours': result['cpu_hours'],
+                'mAP_50_per_cpu_hour': result['mAP_50'] / max(result['cpu_hours'], 1e-9),
+                'weights': result['best']
+            })
+        trials.sort(key=lambda t: t['mAP_50_per_cpu_hour'], reverse=True)
+        return {
+            'sweep_id': self.sweep_id,
+            'parallel': self.parallel,
+            'threads_per_trial': self.threads,
+            'trials': len(self.results),
+            'failed': sum(r['status'] != 'ok' for r in self.results.values()),
+            'cpu_hours': sum(r['cpu_hours'] for r in self.results.values()),
+            'best_mAP_50': max(trials, key=lambda t: t['mAP_50']) if trials else None,
+            'best_per_cpu_hour': trials[:top]
+        }
+
+    def close(self):
+        self.executor.shutdown()
+        if self.database is not None:
+            self.database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Parallel hyperparameter sweep over train_fixed.py')
+    parser.add_argument('--strategy', choices=('grid', 'random', 'halving'), default='random')
+    parser.add_argument('--space', type=Path, help='YAML search space (default: lr0, lrf, momentum, mosaic, optimizer)')
+    parser.add_argument('--trials', type=int, default=8, help='Configs to sample for random and halving')
+    parser.add_argument('--epochs', type=int, default=10, help='Epochs per trial for grid and random')
+    parser.add_argument('--min-epochs', type=int, default=2, help='Epochs of the first halving rung')
+    parser.add_argument('--max-epochs', type=int, default=18, help='Epochs of the last halving rung')
+    parser.add_argument('--eta', type=int, default=3, help='Halving keeps 1/eta of the trials per rung')
+    parser.add_argument('--parallel', type=int, help='Concurrent trials (default: a quarter of the cores)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--top', type=int, default=5, help='Configs listed in the summary')
+    parser.add_argument('--project', type=Path, default=REPO_ROOT / 'runs' / 'sweep')
+    parser.add_argument('--output', type=Path, help='Summary JSON (default: <project>/<sweep_id>/summary.json)')
+    parser.add_argument('--db', type=Path, default=REPO_ROOT / 'backend' / 'database' / 'space_station.db')
+    args = parser.parse_args()
+
+    space = load_space(args.space)
+    if 'epochs' in space and args.strategy == 'halving':
+        parser.error('halving controls epochs itself; remove epochs from the search space')
+    rng = random.Random(args.seed)
+    configs = grid(space) if args.strategy == 'grid' else [sample(space, rng) for _ in range(args.trials)]
+
+    cores = available_cores()
+    parallel = max(1, min(args.parallel or cores // 4, len(configs)))
+    threads = max(1, cores // parallel)
+    sweep_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    project = args.project / sweep_id
+    print(f"✅ Sweep {sweep_id}: {len(configs)} {args.strategy} trials, {parallel} at a time with {threads} threads each")
+    if not args.db.exists():
+        print(f"⚠️  Database not found at {args.db}, trials not stored")
+
+    sweep = Sweep(parallel, threads, project, args.db, sweep_id)
+    try:
+        if args.strategy == 'halving':
+            sweep.run_halving(configs, args.min_epochs, args.max_epochs, args.eta)
+        else:
+            sweep.run(configs, args.epochs)
+    finally:
+        sweep.close()
+
+    summary = sweep.summary(args.top)
+    output = args.output or project / 'summary.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\n📋 Best configs by mAP50 per CPU-hour ({summary['cpu_hours']:.2f} CPU-hours total):")
+    for t in summary['best_per_cpu_hour']:
+        print(f"  - trial {t['trial']}: {t['mAP_50_per_cpu_hour']:.3f} mAP50/CPU-h "
+              f"(mAP50={t['mAP_50']:.3f}, {t['cpu_hours']:.2f} CPU-h, {t['epochs']} epochs) {t['params']}")
+    if summary['best_mAP_50']:
+        print(f"🏆 Highest mAP50: trial {summary['best_mAP_50']['trial']} ({summary['best_mAP_50']['mAP_50']:.3f}) "
+              f"at {summary['best_mAP_50']['weights']}")
+    print(f"📁 Summary saved at: {output}")
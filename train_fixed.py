@@ -11,6 +11,46 @@ from ultralytics import YOLO
 import os
 import sys
 
+def train(epochs=EPOCHS, mosaic=MOSAIC, optimizer=OPTIMIZER, momentum=MOMENTUM, lr0=LR0, lrf=LRF,
+          single_cls=SINGLE_CLS, weights=None, batch=8, workers=2, project=None, name=None):
+    """Train on yolo_params.yaml on the CPU and return the YOLO model, whose trainer holds the metrics"""
+    this_dir = os.path.dirname(os.path.abspath(__file__))
+    model = YOLO(weights or os.path.join(this_dir, "yolov8s.pt"))
+    
+    model.train(
+        data=os.path.join(this_dir, "yolo_params.yaml"),
+        epochs=epochs,
+        device='cpu',  # Changed from device=0 to device='cpu'
+        single_cls=single_cls,
+        mosaic=mosaic,
+        optimizer=optimizer,
+        lr0=lr0,
+        lrf=lrf,
+        momentum=momentum,
+        batch=batch,  # Reduced batch size for CPU
+        workers=workers,  # Reduced workers for CPU
+        project=project,
+        name=name,
+        exist_ok=name is not None,
+        patience=3,  # Stop early if no improvement for 3 epochs
+        save_period=2,  # Save every 2 epochs
+        augment=True,  # Enable data augmentation
+        mixup=0.1,  # Add mixup augmentation
+        copy_paste=0.1,  # Add copy-paste augmentation
+        hsv_h=0.015,  # HSV hue augmentation
+        hsv_s=0.7,  # HSV saturation augmentation
+        hsv_v=0.4,  # HSV value augmentation
+        degrees=10.0,  # Rotation augmentation
+        translate=0.1,  # Translation augmentation
+        scale=0.5,  # Scale augmentation
+        fliplr=0.5,  # Horizontal flip probability
+        flipud=0.0,  # Vertical flip probability
+        perspective=0.0,  # Perspective transformation
+        shear=0.0,  # Shear transformation
+        close_mosaic=10  # Close mosaic in last 10 epochs
+    )
+    return model
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     # epochs
@@ -32,34 +72,12 @@ if __name__ == '__main__':
     this_dir = os.path.dirname(__file__)
     os.chdir(this_dir)
     
-    model = YOLO(os.path.join(this_dir, "yolov8s.pt"))
-    
-    results = model.train(
-        data=os.path.join(this_dir, "yolo_params.yaml"),
+    train(
         epochs=args.epochs,
-        device='cpu',  # Changed from device=0 to device='cpu'
-        single_cls=args.single_cls,
         mosaic=args.mosaic,
         optimizer=args.optimizer,
+        momentum=args.momentum,
         lr0=args.lr0,
         lrf=args.lrf,
-        momentum=args.momentum,
-        batch=8,  # Reduced batch size for CPU
-        workers=2,  # Reduced workers for CPU
-        patience=3,  # Stop early if no improvement for 3 epochs
-        save_period=2,  # Save every 2 epochs
-        augment=True,  # Enable data augmentation
-        mixup=0.1,  # Add mixup augmentation
-        copy_paste=0.1,  # Add copy-paste augmentation
-        hsv_h=0.015,  # HSV hue augmentation
-        hsv_s=0.7,  # HSV saturation augmentation
-        hsv_v=0.4,  # HSV value augmentation
-        degrees=10.0,  # Rotation augmentation
-        translate=0.1,  # Translation augmentation
-        scale=0.5,  # Scale augmentation
-        fliplr=0.5,  # Horizontal flip probability
-        flipud=0.0,  # Vertical flip probability
-        perspective=0.0,  # Perspective transformation
-        shear=0.0,  # Shear transformation
-        close_mosaic=10  # Close mosaic in last 10 epochs
-    )
\ No newline at end of file
+        single_cls=args.single_cls
+    )